@@ -80,13 +80,14 @@ You will provide the user a list of 1-hour free slots in their calendar that mee
 2. Time of the slot (morning, afternoon, evening). If not specified assume it is in the morning.
 3. Timeline (when the slots should be, e.g. within the week, within the month, etc). Assume within the next 3 days if not specified.
 
-Do not provide slots when user is on Holiday, do not provide slots for non business hours. 
+find_free_slots already leaves out the user's all-day events, out-of-office time and public holidays, so there is no need
+to read the events to check for them. Do not provide slots for non business hours.
 
 Provide only 5 slots maximum. Prioritise earlier slots over later slots, but not more than 2 slots on the same day.
 
 """
     ),
-    tools=[tools.get_upcoming_events, tools.find_free_slots],
+    tools=[tools.find_free_slots],
 )
 
 cancel_todays_meeting_agent = Agent(
@@ -130,6 +131,11 @@ Use the tools at your disposal to find a suitable time to move a meeting.
 4. If the user is the organizer reschedule the event, move the event to the new time
 5. If the user is not the organizer, decline the event and propose the new time in a comment
 
+Always pass the event's calendarId as calendar_id when rescheduling or declining it, as it may not be on the primary calendar.
+
+If the meeting needs a room, pass the candidate slots to find_available_rooms with the number of attendees, and only
+propose slots that have a room.
+
 """
     ),
     tools=[
@@ -138,6 +144,7 @@ Use the tools at your disposal to find a suitable time to move a meeting.
         tools.decline_event,
         tools.reschedule_event,
         tools.get_now,
+        tools.find_available_rooms,
            ],
 )
 
@@ -156,7 +163,29 @@ You can also help arrange for meetings with multiple attendees. If a user asks t
 2. Propose a maximum of 3 slots to the users and seek their confirmation
 3. Set a calendar entry for the user and add the attendees.
 
+Free slots for several users fall within everyone's working hours, each in their own time zone. If the user mentions when an
+attendee works, their time zone or their working days, pass it as attendee_working_hours; it is remembered for later.
+
+If the meeting needs a room, check the candidate slots with find_available_rooms and propose slots together with a free room.
+Book the room by adding its email as an attendee.
+
+To set up several related meetings at once, such as an interview loop or an onboarding series, use schedule_meetings.
+Propose the times it finds, and once the user confirms, call it again with create_events to book them all.
+
+For a recurring meeting, such as a weekly 1:1, use find_recurring_slots to find times that are free every week, rather than
+checking each week separately.
+
+To find a past or future event by what it is about, who was there or when, such as "when did I last meet Brad?" or
+"find my dentist appointment", use search_events rather than reading through listed events.
+
+To book trainings, webinars or appointments the user was emailed about, use find_events_in_email. Propose the events it
+finds, and once the user confirms, book each with set_calendar_entry using the arguments the candidate comes with.
+
 Always check todays date, do not book meetings before now, or meetings more than 6 months into the future.
+
+Events and free time come from all the calendars in use, not just the primary one. If the user asks which calendars
+are checked, or wants to include or leave out a calendar, use list_calendars and select_calendars. Public holidays only
+block free time when the user's holiday calendar is in use.
 """
     ),
     tools=[
@@ -166,7 +195,14 @@ Always check todays date, do not book meetings before now, or meetings more than
         tools.set_calendar_entry,
         tools.add_attendees_to_event,
         tools.find_free_slots_for_multiple_users,
-        tools.get_now
+        tools.get_now,
+        tools.list_calendars,
+        tools.select_calendars,
+        tools.find_available_rooms,
+        tools.find_recurring_slots,
+        tools.schedule_meetings,
+        tools.search_events,
+        tools.find_events_in_email,
     ],
     sub_agents=[move_meeting_agent]
 )
@@ -15,34 +15,82 @@
 # mypy: disable-error-code="attr-defined,arg-type"
 import logging
 import os
+import threading
 from typing import Any
 
 import vertexai
-from google.adk.artifacts import GcsArtifactService, InMemoryArtifactService
-from google.cloud import logging as google_cloud_logging
 from vertexai.agent_engines.templates.adk import AdkApp
 
 from julian_gregory.agent import app as adk_app
+from julian_gregory.app_utils.log_writer import BatchLogWriter, CloudLoggingSink
+from julian_gregory.app_utils.sampling import install_tail_sampling
 from julian_gregory.app_utils.telemetry import setup_telemetry
 from julian_gregory.app_utils.typing import Feedback
+from julian_gregory.app_utils.warmup import warm_up
+from julian_gregory.notifications import start_webhook_receiver
+
+# How long register_feedback waits for the background Cloud Logging client
+LOGGER_READY_TIMEOUT_SECONDS = 30
 
 
 class AgentEngineApp(AdkApp):
     def set_up(self) -> None:
-        """Initialize the agent engine app with logging and telemetry."""
+        """Initialize the agent engine app with logging and telemetry.
+
+        The Cloud Logging client is created and the warm-up runs on background
+        threads so that they do not hold up the first request on a freshly
+        scaled-out replica.
+        """
         vertexai.init()
+        # Only sets environment variables, which AdkApp.set_up reads when it
+        # builds the tracer provider, so it has to finish before that.
         setup_telemetry()
+        self._logger = None
+        self._logger_ready = threading.Event()
+        threading.Thread(
+            target=self._init_logger, name="cloud-logging-init", daemon=True
+        ).start()
+        self.feedback_writer = BatchLogWriter(
+            sink=CloudLoggingSink(lambda: self.logger),
+            max_batch_size=int(os.environ.get("FEEDBACK_BATCH_SIZE", "50")),
+            flush_interval_seconds=float(
+                os.environ.get("FEEDBACK_FLUSH_INTERVAL_SECONDS", "5")
+            ),
+            max_queue_size=int(os.environ.get("FEEDBACK_QUEUE_SIZE", "1000")),
+        )
         super().set_up()
+        install_tail_sampling()
         logging.basicConfig(level=logging.INFO)
-        logging_client = google_cloud_logging.Client()
-        self.logger = logging_client.logger(__name__)
         if gemini_location:
             os.environ["GOOGLE_CLOUD_LOCATION"] = gemini_location
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+        self.webhook_receiver = start_webhook_receiver()
+
+    def _init_logger(self) -> None:
+        """Create the Cloud Logging client, importing the library on first use."""
+        try:
+            from google.cloud import logging as google_cloud_logging
+
+            logging_client = google_cloud_logging.Client()
+            self._logger = logging_client.logger(__name__)
+        except Exception:
+            logging.exception("Failed to initialise the Cloud Logging client")
+        finally:
+            self._logger_ready.set()
+
+    @property
+    def logger(self) -> Any:
+        """The Cloud Logging logger, waiting for the background init if needed."""
+        if not self._logger_ready.wait(timeout=LOGGER_READY_TIMEOUT_SECONDS):
+            raise RuntimeError("Cloud Logging client is not ready")
+        if self._logger is None:
+            raise RuntimeError("Cloud Logging client failed to initialise")
+        return self._logger
 
     def register_feedback(self, feedback: dict[str, Any]) -> None:
-        """Collect and log feedback."""
+        """Collect feedback and queue it for the background log writer."""
         feedback_obj = Feedback.model_validate(feedback)
-        self.logger.log_struct(feedback_obj.model_dump(), severity="INFO")
+        self.feedback_writer.write(feedback_obj.model_dump())
 
     def register_operations(self) -> dict[str, list[str]]:
         """Registers the operations of the Agent."""
@@ -51,11 +99,21 @@ class AgentEngineApp(AdkApp):
         return operations
 
 
+def build_artifact_service() -> Any:
+    """Build the artifact service, importing the backend only at set-up time."""
+    if logs_bucket_name:
+        from google.adk.artifacts import GcsArtifactService
+
+        return GcsArtifactService(bucket_name=logs_bucket_name)
+
+    from google.adk.artifacts import InMemoryArtifactService
+
+    return InMemoryArtifactService()
+
+
 gemini_location = os.environ.get("GOOGLE_CLOUD_LOCATION")
 logs_bucket_name = os.environ.get("LOGS_BUCKET_NAME")
 agent_engine = AgentEngineApp(
     app=adk_app,
-    artifact_service_builder=lambda: GcsArtifactService(bucket_name=logs_bucket_name)
-    if logs_bucket_name
-    else InMemoryArtifactService(),
+    artifact_service_builder=build_artifact_service,
 )
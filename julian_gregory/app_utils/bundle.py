@@ -0,0 +1,230 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import ast
+import compileall
+import datetime
+import json
+import logging
+import os
+import py_compile
+import shutil
+import subprocess
+import sys
+
+import click
+
+from julian_gregory.app_utils.importtime import parse_importtime
+
+BUNDLE_DIR = ".bundle"
+MANIFEST_FILE = "startup_manifest.json"
+# Never shipped: caches, tests and docs
+PRUNED_DIRS = {"__pycache__", "tests", ".pytest_cache", ".mypy_cache", ".ruff_cache"}
+PRUNED_SUFFIXES = (".pyc", ".pyo", ".md", ".DS_Store")
+# Slowest modules listed in the manifest
+MANIFEST_TOP_MODULES = 50
+
+
+def _module_files(package_dir: str) -> dict[str, str]:
+    """Map every module under a package directory to its file, e.g. {"pkg.sub": "pkg/sub.py"}."""
+    base = os.path.dirname(os.path.abspath(package_dir))
+    modules = {}
+    for root, dirs, files in os.walk(package_dir):
+        dirs[:] = [d for d in dirs if d not in PRUNED_DIRS]
+        for name in files:
+            if not name.endswith(".py"):
+                continue
+            path = os.path.join(root, name)
+            parts = os.path.relpath(os.path.abspath(path), base)[: -len(".py")].split(os.sep)
+            if parts[-1] == "__init__":
+                parts = parts[:-1]
+            modules[".".join(parts)] = path
+    return modules
+
+
+def _imported_names(path: str, module: str, is_package: bool) -> set[str]:
+    """Every module name an import statement in the file could refer to, including function-level imports."""
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), filename=path)
+    package = module if is_package else module.rpartition(".")[0]
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = package.rsplit(".", node.level - 1)[0] if node.level > 1 else package
+                base = f"{base}.{node.module}" if node.module else base
+            else:
+                base = node.module or ""
+            names.add(base)
+            # "from pkg import sub" may import the submodule pkg.sub
+            names.update(f"{base}.{alias.name}" for alias in node.names)
+    return names
+
+
+def find_reachable_modules(source_packages: list[str], entrypoint_module: str) -> set[str]:
+    """Modules of the source packages that the entrypoint can import, directly or transitively."""
+    modules = {}
+    for package in source_packages:
+        modules.update(_module_files(package))
+    init_files = {module for module, path in modules.items() if path.endswith("__init__.py")}
+
+    reachable = set()
+    pending = [entrypoint_module]
+    while pending:
+        module = pending.pop()
+        # Importing a.b.c runs a/__init__.py and a/b/__init__.py first
+        parts = module.split(".")
+        for candidate in (".".join(parts[:i]) for i in range(1, len(parts) + 1)):
+            if candidate in modules and candidate not in reachable:
+                reachable.add(candidate)
+                pending.extend(_imported_names(modules[candidate], candidate, candidate in init_files))
+    return reachable
+
+
+def measure_startup(bundle_dir: str, entrypoint_module: str, entrypoint_object: str) -> dict:
+    """Import the entrypoint from the bundle in a fresh interpreter and summarise the import times."""
+    env = {**os.environ, "PYTHONPATH": os.path.abspath(bundle_dir), "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {entrypoint_module}; {entrypoint_module}.{entrypoint_object}"],
+        cwd=bundle_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    if result.returncode != 0:
+        logging.warning(f"Could not import {entrypoint_module} to record import times")
+        return {"error": result.stderr[-2000:]}
+
+    rows = parse_importtime(result.stderr)
+    packages = {name for name in os.listdir(bundle_dir) if os.path.isdir(os.path.join(bundle_dir, name))}
+    total_us = next((cumulative for name, _, cumulative in rows if name == entrypoint_module), 0)
+    return {
+        "total_import_ms": total_us / 1000,
+        "bundled_modules_self_ms": sum(self_us for name, self_us, _ in rows if name.split(".")[0] in packages) / 1000,
+        "modules_imported": len(rows),
+        "slowest_modules": [
+            {"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+            for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:MANIFEST_TOP_MODULES]
+        ],
+    }
+
+
+def build_bundle(
+    source_packages: list[str],
+    entrypoint_module: str,
+    entrypoint_object: str,
+    output_dir: str = BUNDLE_DIR,
+    measure: bool = True,
+) -> dict:
+    """Copy the source packages into output_dir, pruned and pre-compiled, and write the startup manifest.
+
+    Python modules the entrypoint can never import (deploy scripts, tooling)
+    are dropped, other files are kept. Bytecode is compiled as unchecked-hash
+    .pyc files, which stay valid after Agent Engine unpacks the archive with
+    new mtimes, so replicas skip compilation when their Python version matches
+    the one used here.
+    """
+    reachable = find_reachable_modules(source_packages, entrypoint_module)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+
+    pruned = []
+    for package in source_packages:
+        modules = {os.path.abspath(path): module for module, path in _module_files(package).items()}
+        package_root = os.path.dirname(os.path.abspath(package))
+        for root, dirs, files in os.walk(package):
+            pruned.extend(os.path.join(root, d) for d in dirs if d in PRUNED_DIRS and d != "__pycache__")
+            dirs[:] = [d for d in dirs if d not in PRUNED_DIRS]
+            for name in files:
+                path = os.path.abspath(os.path.join(root, name))
+                module = modules.get(path)
+                if name.endswith(PRUNED_SUFFIXES) or (module is not None and module not in reachable):
+                    pruned.append(os.path.join(root, name))
+                    continue
+                target = os.path.join(output_dir, os.path.relpath(path, package_root))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(path, target)
+
+    compiled = compileall.compile_dir(
+        output_dir,
+        quiet=1,
+        invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+    )
+    if not compiled:
+        raise RuntimeError(f"Compiling the bundle in {output_dir} failed")
+
+    manifest = {
+        "entrypoint": f"{entrypoint_module}:{entrypoint_object}",
+        "python_version": f"{sys.version_info.major}.{sys.version_info.minor}",
+        "created": datetime.datetime.now().isoformat(),
+        "modules": sorted(reachable),
+        "pruned": sorted(pruned),
+    }
+    if measure:
+        manifest["startup"] = measure_startup(output_dir, entrypoint_module, entrypoint_object)
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    logging.info(f"Bundle written to {output_dir}, pruned {len(pruned)} files")
+    return manifest
+
+
+@click.command()
+@click.option(
+    "--source-packages",
+    multiple=True,
+    default=["./julian_gregory"],
+    help="Source packages to bundle. Can be specified multiple times",
+)
+@click.option(
+    "--entrypoint-module",
+    default="julian_gregory.agent_engine_app",
+    help="Python module path for the agent entrypoint",
+)
+@click.option(
+    "--entrypoint-object",
+    default="agent_engine",
+    help="Name of the agent instance at module level",
+)
+@click.option(
+    "--output-dir",
+    default=BUNDLE_DIR,
+    help=f"Directory to write the bundle to (default: {BUNDLE_DIR})",
+)
+@click.option(
+    "--measure/--no-measure",
+    default=True,
+    help="Import the entrypoint from the bundle to record import times in the manifest",
+)
+def bundle(
+    source_packages: tuple[str, ...],
+    entrypoint_module: str,
+    entrypoint_object: str,
+    output_dir: str,
+    measure: bool,
+) -> None:
+    """Build a pruned, pre-compiled bundle of the source packages."""
+    logging.basicConfig(level=logging.INFO)
+    manifest = build_bundle(list(source_packages), entrypoint_module, entrypoint_object, output_dir, measure)
+    click.echo(f"📦 Bundled {len(manifest['modules'])} modules into {output_dir}, pruned {len(manifest['pruned'])} files")
+    startup = manifest.get("startup", {})
+    if "total_import_ms" in startup:
+        click.echo(f"⏱️  Entrypoint import: {startup['total_import_ms']:.0f}ms, slowest modules:")
+        for row in startup["slowest_modules"][:10]:
+            click.echo(f"  {row['cumulative_ms']:10.1f} ms  {row['module']}")
+
+
+if __name__ == "__main__":
+    bundle()
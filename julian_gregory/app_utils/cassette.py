@@ -0,0 +1,298 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import base64
+import binascii
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+
+# Free-text fields that can hold names or meeting details. Values are replaced
+# with filler of the same length so payload sizes stay realistic.
+SCRUBBED_TEXT_FIELDS = frozenset({
+    "summary", "description", "location", "displayName", "name", "given_name",
+    "family_name", "picture", "hangoutLink", "htmlLink", "comment",
+})
+# Email text, with its letters replaced but its digits and punctuation kept, so
+# the dates and times in it still scan on replay
+SCRUBBED_MESSAGE_FIELDS = frozenset({"snippet"})
+SCRUBBED_SECRET_FIELDS = frozenset({"access_token", "refresh_token", "id_token", "client_secret"})
+# Base64url message text, e.g. Gmail's body.data, re-encoded with its letters replaced
+SCRUBBED_BASE64_FIELDS = frozenset({"data", "raw"})
+# Response headers worth keeping, everything else is dropped to keep cassettes small
+KEPT_HEADERS = ("content-type",)
+
+_EMAIL = re.compile(r"([A-Za-z0-9._%+-]+)(@|%40)([A-Za-z0-9.-]+\.[A-Za-z]{2,})")
+_AUTHORIZATION = re.compile(r"(?im)^(authorization:\s*).*$")
+# Query strings and form-encoded bodies, such as an OAuth refresh
+_TOKEN_PARAM = re.compile(r"\b((?:" + "|".join(sorted(SCRUBBED_SECRET_FIELDS | {"key"})) + r")=)[^&\s]+")
+_LETTER = re.compile(r"[^\W\d_]")
+_BATCH_RESPONSE_ID = re.compile(r"<response-[^+>]+\+")
+_BATCH_REQUEST_ID = re.compile(r"Content-ID: <([^+>]+)\+\d+>")
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when no recorded interaction matches a request."""
+
+
+def scrub_email(match: re.Match) -> str:
+    local, at, domain = match.groups()
+    if domain.endswith("example.com"):
+        return match.group(0)
+    # Stable pseudonyms keep requests matching their recorded responses
+    digest = hashlib.sha256(f"{local}@{domain}".lower().encode()).hexdigest()[:10]
+    return f"user-{digest}{at}example.com"
+
+
+def scrub_text(text: str) -> str:
+    text = _AUTHORIZATION.sub(r"\1REDACTED", text)
+    text = _TOKEN_PARAM.sub(r"\1REDACTED", text)
+    return _EMAIL.sub(scrub_email, text)
+
+
+def scrub_message_text(text: str) -> str:
+    return _LETTER.sub("x", text)
+
+
+def _scrub_base64(data: str) -> str:
+    try:
+        text = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)).decode("utf-8", errors="replace")
+    except (binascii.Error, ValueError):
+        return "x" * len(data)
+    scrubbed = base64.urlsafe_b64encode(scrub_message_text(text).encode("utf-8")).decode("ascii")
+    return scrubbed if data.endswith("=") else scrubbed.rstrip("=")
+
+
+def scrub_json(value: Any) -> Any:
+    if isinstance(value, dict):
+        if set(value) == {"name", "value"} and isinstance(value["value"], str):
+            # A message header: its name is how it's looked up, its value is the subject, sender and so on
+            return {"name": value["name"], "value": scrub_message_text(value["value"])}
+        scrubbed = {}
+        for key, item in value.items():
+            if key in SCRUBBED_SECRET_FIELDS:
+                scrubbed[key] = "REDACTED"
+            elif key in SCRUBBED_TEXT_FIELDS and isinstance(item, str):
+                scrubbed[key] = "x" * len(item)
+            elif key in SCRUBBED_MESSAGE_FIELDS and isinstance(item, str):
+                scrubbed[key] = scrub_message_text(item)
+            elif key in SCRUBBED_BASE64_FIELDS and isinstance(item, str):
+                scrubbed[key] = _scrub_base64(item)
+            else:
+                # Keys can be emails too, e.g. the calendars of a freebusy response
+                scrubbed[scrub_text(key)] = scrub_json(item)
+        return scrubbed
+    if isinstance(value, list):
+        return [scrub_json(item) for item in value]
+    if isinstance(value, str):
+        return scrub_text(value)
+    return value
+
+
+def scrub_body(body: str | None, content_type: str) -> Any:
+    """Returns the scrubbed body, as a JSON value when it parses as one so it's stored compactly."""
+    if not body:
+        return None
+    if "json" in content_type:
+        try:
+            return scrub_json(json.loads(body))
+        except ValueError:
+            pass
+    if content_type.startswith("multipart/"):
+        return _scrub_multipart(body)
+    return scrub_text(body)
+
+
+def _scrub_multipart(body: str) -> str:
+    # Batch parts are "<part headers>\r\n\r\n<HTTP headers>\r\n\r\n<JSON>", scrub each JSON payload
+    def scrub_part(part: str) -> str:
+        head, separator, payload = part.rpartition("\r\n\r\n")
+        if not separator:
+            head, separator, payload = part.rpartition("\n\n")
+        stripped = payload.strip()
+        if stripped.startswith(("{", "[")):
+            try:
+                payload = json.dumps(scrub_json(json.loads(stripped))) + payload[len(payload.rstrip()):]
+            except ValueError:
+                pass
+        return scrub_text(head) + separator + payload
+
+    lines = body.split("\n", 1)
+    boundary = lines[0].strip()
+    if not boundary.startswith("--"):
+        return scrub_text(body)
+    return boundary.join(scrub_part(part) if part.strip() not in ("", "--") else part for part in body.split(boundary))
+
+
+class Cassette:
+    """Recorded Google API interactions, stored as one JSON object per line (gzipped if the path ends in .gz).
+
+    In "record" mode every interaction is appended as it happens. In "replay"
+    mode requests are answered from the file: first by an unused interaction
+    with the same method, URL and body, otherwise by the next unused one for
+    the same method and path, so calls whose timeMin/timeMax differ from the
+    recording still replay in order. `timing_scale` multiplies the recorded
+    latency (0 replays instantly).
+    """
+
+    def __init__(self, path: str, mode: str = "replay", timing_scale: float = 1.0) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode {mode!r}, expected 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.timing_scale = timing_scale
+        self.interactions: list[dict[str, Any]] = []
+        self._used: set[int] = set()
+        self._lock = threading.Lock()
+        if mode == "replay":
+            with self._open("rt") as f:
+                self.interactions = [json.loads(line) for line in f if line.strip()]
+        else:
+            # Start a fresh recording
+            with self._open("wt"):
+                pass
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode, encoding="utf-8")
+        return open(self.path, mode.replace("t", ""), encoding="utf-8")
+
+    def record(self, method: str, uri: str, body: str | None, request_content_type: str,
+               response: httplib2.Response, content: bytes, elapsed: float) -> None:
+        response_content_type = response.get("content-type", "")
+        interaction = {
+            "method": method,
+            "uri": scrub_text(uri),
+            "request": scrub_body(_decode(body), request_content_type),
+            "status": response.status,
+            "headers": {key: response[key] for key in KEPT_HEADERS if key in response},
+            "response": scrub_body(_decode(content), response_content_type),
+            "elapsed_ms": round(elapsed * 1000, 1),
+        }
+        line = json.dumps(interaction, separators=(",", ":")) + "\n"
+        with self._lock:
+            # Reopened per write so a crash still leaves a usable cassette
+            with self._open("at") as f:
+                f.write(line)
+
+    def play(self, method: str, uri: str, body: str | None, request_content_type: str) -> tuple[httplib2.Response, bytes]:
+        uri = scrub_text(uri)
+        request = scrub_body(_decode(body), request_content_type)
+        path = urlsplit(uri).path
+        with self._lock:
+            index = self._find(lambda i: i["method"] == method and i["uri"] == uri and i["request"] == request)
+            if index is None:
+                index = self._find(lambda i: i["method"] == method and urlsplit(i["uri"]).path == path)
+            if index is None:
+                raise CassetteMissError(f"No recorded interaction for {method} {uri} in {self.path}")
+            self._used.add(index)
+        interaction = self.interactions[index]
+
+        if self.timing_scale:
+            time.sleep(interaction["elapsed_ms"] / 1000 * self.timing_scale)
+        content = interaction["response"]
+        if content is None:
+            content = ""
+        elif not isinstance(content, str):
+            content = json.dumps(content)
+        elif interaction["headers"].get("content-type", "").startswith("multipart/"):
+            content = _rewrite_batch_ids(content, _decode(body) or "")
+        response = httplib2.Response({"status": interaction["status"], **interaction["headers"]})
+        return response, content.encode("utf-8")
+
+    def _find(self, predicate) -> int | None:
+        for index, interaction in enumerate(self.interactions):
+            if index not in self._used and predicate(interaction):
+                return index
+        return None
+
+
+def _decode(value: str | bytes | None) -> str | None:
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+def _rewrite_batch_ids(content: str, request_body: str) -> str:
+    # googleapiclient matches batch responses to requests by a per-batch random Content-ID prefix
+    match = _BATCH_REQUEST_ID.search(request_body)
+    if not match:
+        return content
+    return _BATCH_RESPONSE_ID.sub(f"<response-{match.group(1)}+", content)
+
+
+class RecordingHttp(httplib2.Http):
+    """httplib2.Http that records every request it sends into a cassette."""
+
+    def __init__(self, cassette: Cassette, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        start = time.perf_counter()
+        response, content = super().request(uri, method, body, headers, *args, **kwargs)
+        self.cassette.record(method, uri, body, _content_type(headers), response, content, time.perf_counter() - start)
+        return response, content
+
+
+class ReplayHttp(httplib2.Http):
+    """httplib2.Http that answers every request from a cassette without touching the network."""
+
+    def __init__(self, cassette: Cassette, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        return self.cassette.play(method, uri, body, _content_type(headers))
+
+
+def _content_type(headers: dict | None) -> str:
+    for key, value in (headers or {}).items():
+        if key.lower() == "content-type":
+            return value
+    return ""
+
+
+@functools.cache
+def get_cassette(path: str, mode: str, timing_scale: float) -> Cassette:
+    """Returns the process-wide cassette, so every service built by the tools shares one recording."""
+    logging.info(f"Google API cassette {path} in {mode} mode")
+    return Cassette(path, mode, timing_scale)
+
+
+def cassette_http(credentials) -> httplib2.Http | None:
+    """Returns the HTTP transport for GOOGLE_API_CASSETTE, or None when no cassette is configured.
+
+    GOOGLE_API_CASSETTE_MODE is "replay" (default) or "record", and
+    GOOGLE_API_CASSETTE_TIMING_SCALE (default 1.0) scales replayed latency.
+    """
+    path = os.environ.get("GOOGLE_API_CASSETTE")
+    if not path:
+        return None
+    mode = os.environ.get("GOOGLE_API_CASSETTE_MODE", "replay").lower()
+    timing_scale = float(os.environ.get("GOOGLE_API_CASSETTE_TIMING_SCALE", "1.0"))
+    cassette = get_cassette(path, mode, timing_scale)
+    if mode == "record":
+        return AuthorizedHttp(credentials, http=RecordingHttp(cassette))
+    return ReplayHttp(cassette)
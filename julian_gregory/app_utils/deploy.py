@@ -13,22 +13,31 @@
 # limitations under the License.
 
 import asyncio
+import contextlib
 import datetime
+import hashlib
 import importlib
 import inspect
 import json
 import logging
 import os
+import shutil
+import time
 import warnings
+from collections.abc import Iterator
 from typing import Any
 
 import click
 import google.auth
 import vertexai
+from click.core import ParameterSource
 from dotenv import dotenv_values
 from vertexai._genai import _agent_engines_utils
 from vertexai._genai.types import AgentEngine, AgentEngineConfig
 
+from julian_gregory.app_utils.bundle import BUNDLE_DIR, build_bundle
+from julian_gregory.app_utils.sizing import read_sizing_file
+
 # Suppress google-cloud-storage version compatibility warning
 warnings.filterwarnings(
     "ignore", category=FutureWarning, module="google.cloud.aiplatform"
@@ -95,9 +104,100 @@ def load_env_file(env_file_path: str | None, app_directory: str) -> dict[str, st
     return filtered_vars
 
 
+# Files that change between runs without changing what gets deployed
+IGNORED_SOURCE_DIRS = {"__pycache__", ".pytest_cache", ".mypy_cache", ".ruff_cache"}
+IGNORED_SOURCE_SUFFIXES = (".pyc", ".pyo", ".DS_Store")
+
+
+def hash_source_packages(source_packages: list[str]) -> str:
+    """Hash the relative paths and contents of every file in the source packages."""
+    digest = hashlib.sha256()
+    for package in sorted(source_packages):
+        paths = [package] if os.path.isfile(package) else []
+        for root, dirs, files in os.walk(package):
+            dirs[:] = sorted(d for d in dirs if d not in IGNORED_SOURCE_DIRS)
+            paths.extend(
+                os.path.join(root, name)
+                for name in sorted(files)
+                if not name.endswith(IGNORED_SOURCE_SUFFIXES)
+            )
+        for path in paths:
+            digest.update(os.path.relpath(path, os.path.dirname(package.rstrip("/"))).encode())
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """Hash a file's contents, or return an empty string if it doesn't exist."""
+    if not os.path.exists(path):
+        return ""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def hash_config(config: dict[str, Any]) -> str:
+    """Hash env vars and deployment settings independently of key order."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def plan_deployment(
+    previous_hashes: dict[str, str] | None,
+    content_hashes: dict[str, str],
+    exists: bool,
+    force: bool = False,
+) -> str:
+    """Decide how to deploy: "create", "skip", "update_code" or "update".
+
+    "update_code" is used when only the source changed, so the update leaves
+    the requirements and deployment settings untouched and Agent Engine can
+    reuse the installed dependencies.
+    """
+    if not exists:
+        return "create"
+    if force or not previous_hashes:
+        return "update"
+    changed = {key for key, value in content_hashes.items() if previous_hashes.get(key) != value}
+    if not changed:
+        return "skip"
+    if changed == {"source"}:
+        return "update_code"
+    return "update"
+
+
+def read_deployment_metadata(metadata_file: str = "deployment_metadata.json") -> dict[str, Any]:
+    """Read the metadata of the last deployment, or {} if there is none."""
+    if not os.path.exists(metadata_file):
+        return {}
+    with open(metadata_file) as f:
+        return json.load(f)
+
+
+class PhaseTimer:
+    """Times the phases of a deployment and prints a breakdown."""
+
+    def __init__(self) -> None:
+        self.timings: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def report(self) -> None:
+        click.echo("\n⏱️  Deployment timing:")
+        for name, seconds in self.timings.items():
+            click.echo(f"  {name:<22} {seconds:8.1f}s")
+        click.echo(f"  {'total':<22} {sum(self.timings.values()):8.1f}s")
+
+
 def write_deployment_metadata(
     remote_agent: Any,
     metadata_file: str = "deployment_metadata.json",
+    content_hashes: dict[str, str] | None = None,
 ) -> None:
     """Write deployment metadata to file."""
     metadata = {
@@ -105,6 +205,7 @@ def write_deployment_metadata(
         "deployment_target": "agent_engine",
         "is_a2a": False,
         "deployment_timestamp": datetime.datetime.now().isoformat(),
+        "content_hashes": content_hashes or {},
     }
 
     with open(metadata_file, "w") as f:
@@ -232,6 +333,24 @@ def print_deployment_success(
     default=1,
     help="Number of worker processes (default: 1)",
 )
+@click.option(
+    "--force",
+    is_flag=True,
+    default=False,
+    help="Deploy everything even if the content hashes match the last deployment",
+)
+@click.option(
+    "--bundle",
+    is_flag=True,
+    default=False,
+    help=f"Upload a pruned, pre-compiled bundle of the source packages (built in {BUNDLE_DIR}/)",
+)
+@click.option(
+    "--sizing-file",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Scaling settings written by app_utils.sizing; options passed on the command line take precedence",
+)
 def deploy_agent_engine_app(
     project: str | None,
     location: str,
@@ -251,11 +370,34 @@ def deploy_agent_engine_app(
     memory: str,
     container_concurrency: int,
     num_workers: int,
+    force: bool,
+    bundle: bool,
+    sizing_file: str | None,
 ) -> AgentEngine:
-    """Deploy the agent engine app to Vertex AI."""
+    """Deploy the agent engine app to Vertex AI.
+
+    Content hashes of the source packages, requirements and configuration are
+    stored in deployment_metadata.json. Unchanged deployments are skipped and
+    source-only changes update the code without touching the rest of the spec.
+    """
 
     logging.basicConfig(level=logging.INFO)
     logging.getLogger("httpx").setLevel(logging.WARNING)
+    timer = PhaseTimer()
+
+    if sizing_file:
+        ctx = click.get_current_context()
+        sizing = {
+            key: value
+            for key, value in read_sizing_file(sizing_file).items()
+            if ctx.get_parameter_source(key) == ParameterSource.DEFAULT
+        }
+        logging.info(f"Applying {sorted(sizing)} from {sizing_file}")
+        min_instances = sizing.get("min_instances", min_instances)
+        max_instances = sizing.get("max_instances", max_instances)
+        container_concurrency = sizing.get("container_concurrency", container_concurrency)
+        cpu = str(sizing.get("cpu", cpu))
+        num_workers = sizing.get("num_workers", num_workers)
 
     # Determine app directory from entrypoint module (e.g., "app.agent_engine_app" -> "app")
     app_directory = entrypoint_module.split(".")[0]
@@ -313,69 +455,145 @@ def deploy_agent_engine_app(
 
     source_packages_list = list(source_packages)
 
-    # Initialize vertexai client
-    client = vertexai.Client(
-        project=project,
-        location=location,
-    )
-    vertexai.init(project=project, location=location)
-
-    # Add agent garden labels if configured
-
-    # Dynamically import the agent instance to generate class_methods
-    logging.info(f"Importing {entrypoint_module}.{entrypoint_object}")
-    module = importlib.import_module(entrypoint_module)
-    agent_instance = getattr(module, entrypoint_object)
-
-    # If the agent_instance is a coroutine, await it to get the actual instance
-    if inspect.iscoroutine(agent_instance):
-        logging.info(f"Detected coroutine, awaiting {entrypoint_object}...")
-        agent_instance = asyncio.run(agent_instance)
-    # Generate class methods spec from register_operations
-    class_methods_list = generate_class_methods_from_agent(agent_instance)
-
-    config = AgentEngineConfig(
-        display_name=display_name,
-        description=description,
-        source_packages=source_packages_list,
-        entrypoint_module=entrypoint_module,
-        entrypoint_object=entrypoint_object,
-        class_methods=class_methods_list,
-        env_vars=env_vars,
-        service_account=service_account,
-        requirements_file=requirements_file,
-        labels=labels_dict,
-        min_instances=min_instances,
-        max_instances=max_instances,
-        resource_limits={"cpu": cpu, "memory": memory},
-        container_concurrency=container_concurrency,
-        agent_framework="google-adk",
-    )
-
-    # Check if an agent with this name already exists
-    existing_agents = list(client.agent_engines.list())
-    matching_agents = [
-        agent
-        for agent in existing_agents
-        if agent.api_resource.display_name == display_name
-    ]
+    with timer.phase("hash"):
+        content_hashes = {
+            "source": hash_config(
+                {"files": hash_source_packages(source_packages_list), "bundle": bundle}
+            ),
+            "requirements": hash_file(requirements_file),
+            "config": hash_config(
+                {
+                    "display_name": display_name,
+                    "description": description,
+                    "entrypoint_module": entrypoint_module,
+                    "entrypoint_object": entrypoint_object,
+                    "env_vars": env_vars,
+                    "service_account": service_account,
+                    "labels": labels_dict,
+                    "min_instances": min_instances,
+                    "max_instances": max_instances,
+                    "resource_limits": {"cpu": cpu, "memory": memory},
+                    "container_concurrency": container_concurrency,
+                }
+            ),
+        }
+
+    with timer.phase("list_agents"):
+        # Initialize vertexai client
+        client = vertexai.Client(
+            project=project,
+            location=location,
+        )
+        vertexai.init(project=project, location=location)
+
+        # Check if an agent with this name already exists
+        existing_agents = list(client.agent_engines.list())
+        matching_agents = [
+            agent
+            for agent in existing_agents
+            if agent.api_resource.display_name == display_name
+        ]
+
+    # Hashes only count if they were recorded for the agent we're about to update
+    previous_metadata = read_deployment_metadata()
+    previous_hashes = None
+    if matching_agents and previous_metadata.get("remote_agent_engine_id") == matching_agents[0].api_resource.name:
+        previous_hashes = previous_metadata.get("content_hashes")
+    plan = plan_deployment(previous_hashes, content_hashes, bool(matching_agents), force)
+
+    if plan == "skip":
+        click.echo(f"\n✅ No changes since the last deployment of {display_name}, skipping upload (use --force to redeploy)")
+        timer.report()
+        return matching_agents[0]
+
+    with timer.phase("import_agent"):
+        # Dynamically import the agent instance to generate class_methods
+        logging.info(f"Importing {entrypoint_module}.{entrypoint_object}")
+        module = importlib.import_module(entrypoint_module)
+        agent_instance = getattr(module, entrypoint_object)
+
+        # If the agent_instance is a coroutine, await it to get the actual instance
+        if inspect.iscoroutine(agent_instance):
+            logging.info(f"Detected coroutine, awaiting {entrypoint_object}...")
+            agent_instance = asyncio.run(agent_instance)
+        # Generate class methods spec from register_operations
+        class_methods_list = generate_class_methods_from_agent(agent_instance)
+
+    upload_dir = "."
+    if bundle:
+        with timer.phase("bundle"):
+            os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project)
+            manifest = build_bundle(
+                source_packages_list, entrypoint_module, entrypoint_object
+            )
+            # The SDK archives paths relative to the working directory, so the
+            # upload runs from the bundle and the packages sit at its top level.
+            upload_dir = BUNDLE_DIR
+            source_packages_list = [
+                os.path.basename(os.path.normpath(package))
+                for package in source_packages_list
+            ]
+            # The requirements file is looked up inside the uploaded archive
+            requirements_file = os.path.relpath(requirements_file)
+            bundled_requirements = os.path.join(BUNDLE_DIR, requirements_file)
+            if not os.path.exists(bundled_requirements):
+                os.makedirs(os.path.dirname(bundled_requirements) or BUNDLE_DIR, exist_ok=True)
+                shutil.copy2(requirements_file, bundled_requirements)
+        startup = manifest.get("startup", {})
+        if "total_import_ms" in startup:
+            click.echo(f"📦 Bundle entrypoint import: {startup['total_import_ms']:.0f}ms")
+
+    if plan == "update_code":
+        # Fields left unset are left out of the update mask, so the requirements,
+        # scaling and resource settings of the running agent are kept.
+        config = AgentEngineConfig(
+            source_packages=source_packages_list,
+            entrypoint_module=entrypoint_module,
+            entrypoint_object=entrypoint_object,
+            class_methods=class_methods_list,
+            # Passed unchanged, otherwise the SDK resets the telemetry env var
+            env_vars=env_vars,
+            agent_framework="google-adk",
+        )
+    else:
+        config = AgentEngineConfig(
+            display_name=display_name,
+            description=description,
+            source_packages=source_packages_list,
+            entrypoint_module=entrypoint_module,
+            entrypoint_object=entrypoint_object,
+            class_methods=class_methods_list,
+            env_vars=env_vars,
+            service_account=service_account,
+            requirements_file=requirements_file,
+            labels=labels_dict,
+            min_instances=min_instances,
+            max_instances=max_instances,
+            resource_limits={"cpu": cpu, "memory": memory},
+            container_concurrency=container_concurrency,
+            agent_framework="google-adk",
+        )
 
     # Deploy the agent (create or update)
-    if matching_agents:
+    if plan == "update_code":
+        click.echo(f"\n📝 Only the source changed, updating the code of: {display_name}")
+    elif matching_agents:
         click.echo(f"\n📝 Updating existing agent: {display_name}")
     else:
         click.echo(f"\n🚀 Creating new agent: {display_name}")
 
     click.echo("🚀 Deploying to Vertex AI Agent Engine (this can take 3-5 minutes)...")
-    if matching_agents:
-        remote_agent = client.agent_engines.update(
-            name=matching_agents[0].api_resource.name, config=config
-        )
-    else:
-        remote_agent = client.agent_engines.create(config=config)
-
-    write_deployment_metadata(remote_agent)
+    with timer.phase("upload_and_build"), contextlib.chdir(upload_dir):
+        if matching_agents:
+            remote_agent = client.agent_engines.update(
+                name=matching_agents[0].api_resource.name, config=config
+            )
+        else:
+            remote_agent = client.agent_engines.create(config=config)
+
+    write_deployment_metadata(remote_agent, content_hashes=content_hashes)
     print_deployment_success(remote_agent, location, project)
+    timer.report()
 
     return remote_agent
 
@@ -0,0 +1,182 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+# Markers passed through the queue to the worker thread
+_FLUSH = object()
+_STOP = object()
+
+
+class InMemorySink:
+    """Sink that keeps every batch in memory, for tests."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[dict[str, Any]]] = []
+
+    def __call__(self, entries: list[dict[str, Any]]) -> None:
+        self.batches.append(entries)
+
+    @property
+    def entries(self) -> list[dict[str, Any]]:
+        return [entry for batch in self.batches for entry in batch]
+
+
+class CloudLoggingSink:
+    """Sink that writes each batch to Cloud Logging in a single API call."""
+
+    def __init__(self, logger_factory: Callable[[], Any], severity: str = "INFO") -> None:
+        # A factory so the logger can still be initialising when the writer starts
+        self.logger_factory = logger_factory
+        self.severity = severity
+
+    def __call__(self, entries: list[dict[str, Any]]) -> None:
+        batch = self.logger_factory().batch()
+        for entry in entries:
+            batch.log_struct(entry, severity=self.severity)
+        batch.commit()
+
+
+class BatchLogWriter:
+    """Writes log entries from a background thread in batches.
+
+    Entries are buffered in a bounded queue and handed to `sink` once
+    `max_batch_size` entries are pending, `flush_interval_seconds` have passed
+    since the first pending entry, or on flush()/close(). When the queue is
+    full, write() waits up to `block_timeout_seconds` for space and then drops
+    the entry, counting it in `dropped`. Entries written once close() has
+    started are dropped and counted the same way.
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[list[dict[str, Any]]], None],
+        max_batch_size: int = 50,
+        flush_interval_seconds: float = 5.0,
+        max_queue_size: int = 1000,
+        block_timeout_seconds: float = 0.0,
+    ) -> None:
+        self.sink = sink
+        self.max_batch_size = max_batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.block_timeout_seconds = block_timeout_seconds
+        self.dropped = 0
+        self.failed = 0
+        self._counter_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="batch-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, entry: dict[str, Any]) -> bool:
+        """Queue an entry, returning False if it was dropped."""
+        if self._closed:
+            self._count_dropped()
+            logging.warning(f"Log writer closed, dropped entry ({self.dropped} dropped so far)")
+            return False
+        try:
+            if self.block_timeout_seconds > 0:
+                self._queue.put(entry, timeout=self.block_timeout_seconds)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            self._count_dropped()
+            logging.warning(f"Log queue full, dropped entry ({self.dropped} dropped so far)")
+            return False
+        # close() may have stopped the worker while the entry was being queued
+        if self._closed and not self._thread.is_alive():
+            return not self._drain()
+        return True
+
+    def _count_dropped(self, count: int = 1) -> None:
+        with self._counter_lock:
+            self.dropped += count
+
+    def _drain(self) -> int:
+        """Drop the entries left in the queue after the worker stopped, returning how many there were."""
+        count = 0
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            count += 1
+        if count:
+            self._count_dropped(count)
+            logging.warning(f"Log writer closed, dropped {count} entries queued during shutdown")
+        return count
+
+    def flush(self) -> None:
+        """Block until every entry queued so far has been handed to the sink."""
+        if self._closed:
+            return
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self) -> None:
+        """Flush pending entries and stop the worker thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._drain()
+        atexit.unregister(self.close)
+
+    def _run(self) -> None:
+        batch: list[dict[str, Any]] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                # The oldest pending entry has waited flush_interval_seconds
+                self._write_batch(batch)
+                batch, deadline = [], None
+                continue
+
+            if item is _FLUSH or item is _STOP:
+                self._write_batch(batch)
+                batch, deadline = [], None
+                self._queue.task_done()
+                if item is _STOP:
+                    return
+                continue
+
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval_seconds
+            if len(batch) >= self.max_batch_size:
+                self._write_batch(batch)
+                batch, deadline = [], None
+
+    def _write_batch(self, batch: list[dict[str, Any]]) -> None:
+        if not batch:
+            return
+        try:
+            self.sink(batch)
+        except Exception:
+            self.failed += len(batch)
+            logging.exception(f"Failed to write {len(batch)} log entries")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
@@ -0,0 +1,28 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Runs the ADK CLI locally with LOCAL_TELEMETRY_EXPORTER applied.
+
+    uv run -m julian_gregory.app_utils.playground web . --port 8501
+
+Tracing is set up here rather than when the package is imported, so tests,
+subprocesses and Agent Engine keep their own providers. ADK adds its span
+processors to the provider configured here.
+"""
+from google.adk.cli.cli_tools_click import main
+
+from julian_gregory.app_utils.telemetry import setup_local_tracing
+
+if __name__ == "__main__":
+    setup_local_tracing()
+    main()
@@ -0,0 +1,140 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from opentelemetry import context, trace
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor, TracerProvider
+from opentelemetry.trace import StatusCode
+
+_TRACE_ID_LIMIT = 1 << 64
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """Decides per trace, once its local root span ends, whether to export it.
+
+    Traces containing an error or whose root span took at least
+    `slow_trace_ms` are always kept. Other traces are kept for
+    `sample_ratio` of trace IDs, the same rule as TraceIdRatioBased, so the
+    decision is consistent across services. Spans are buffered until the
+    decision, for at most `max_pending_traces` traces.
+    """
+
+    def __init__(
+        self,
+        delegate: SpanProcessor,
+        sample_ratio: float,
+        slow_trace_ms: float,
+        max_pending_traces: int = 1000,
+    ) -> None:
+        self.delegate = delegate
+        self.sample_ratio = sample_ratio
+        self.slow_trace_ns = slow_trace_ms * 1_000_000
+        self.max_pending_traces = max_pending_traces
+        self.dropped_traces = 0
+        self._pending: OrderedDict[int, list[ReadableSpan]] = OrderedDict()
+        # Spans that end after their root follow the decision already taken
+        self._decisions: OrderedDict[int, bool] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span, parent_context: context.Context | None = None) -> None:
+        self.delegate.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        trace_id = span.context.trace_id
+        with self._lock:
+            keep = self._decisions.get(trace_id)
+            if keep is not None:
+                spans = [span]
+            else:
+                pending = self._pending.setdefault(trace_id, [])
+                pending.append(span)
+                if span.parent is not None and not span.parent.is_remote:
+                    self._evict_pending()
+                    return
+                spans = self._pending.pop(trace_id)
+                keep = self._should_keep(trace_id, span, spans)
+                self._decisions[trace_id] = keep
+                if len(self._decisions) > self.max_pending_traces:
+                    self._decisions.popitem(last=False)
+
+        if keep:
+            for pending_span in spans:
+                self.delegate.on_end(pending_span)
+
+    def _should_keep(self, trace_id: int, root: ReadableSpan, spans: list[ReadableSpan]) -> bool:
+        if any(s.status.status_code == StatusCode.ERROR for s in spans):
+            return True
+        if root.end_time - root.start_time >= self.slow_trace_ns:
+            return True
+        return (trace_id & (_TRACE_ID_LIMIT - 1)) < self.sample_ratio * _TRACE_ID_LIMIT
+
+    def _evict_pending(self) -> None:
+        # Roots that never end locally would otherwise grow the buffer forever
+        while len(self._pending) > self.max_pending_traces:
+            self._pending.popitem(last=False)
+            self.dropped_traces += 1
+
+    def shutdown(self) -> None:
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.delegate.force_flush(timeout_millis)
+
+
+def install_tail_sampling() -> bool:
+    """Wrap the export processors of the global tracer provider in tail sampling.
+
+    Must run after AdkApp.set_up has configured the provider. Uses the
+    TELEMETRY_* settings applied by setup_telemetry and does nothing when
+    every trace would be kept anyway.
+    """
+    if os.environ.get("TELEMETRY_SAMPLING_MODE", "tail") != "tail":
+        return False
+    sample_ratio = float(os.environ.get("TELEMETRY_SAMPLE_RATIO", "1.0"))
+    if sample_ratio >= 1.0:
+        return False
+
+    tracer_provider = trace.get_tracer_provider()
+    if not isinstance(tracer_provider, TracerProvider):
+        logging.info("Tail sampling skipped, no SDK tracer provider is configured")
+        return False
+
+    slow_trace_ms = float(os.environ.get("TELEMETRY_SLOW_TRACE_MS", "10000"))
+    # The multi-processor object is shared with every tracer already handed
+    # out, so swapping its children applies to existing tracers too. These
+    # are private to the SDK, so a release that changes them only costs the
+    # sampling, not the set-up.
+    active_span_processor = getattr(tracer_provider, "_active_span_processor", None)
+    if not (
+        isinstance(getattr(active_span_processor, "_span_processors", None), tuple)
+        and hasattr(active_span_processor, "_lock")
+    ):
+        logging.warning(
+            "Tail sampling skipped, this OpenTelemetry SDK doesn't expose its span "
+            "processors; every trace is exported (TELEMETRY_SAMPLING_MODE=head samples instead)"
+        )
+        return False
+    with active_span_processor._lock:
+        active_span_processor._span_processors = tuple(
+            TailSamplingSpanProcessor(processor, sample_ratio, slow_trace_ms)
+            for processor in active_span_processor._span_processors
+        )
+    logging.info(
+        f"Tail sampling enabled: errors and traces over {slow_trace_ms:.0f}ms, "
+        f"otherwise {sample_ratio:.0%}"
+    )
+    return True
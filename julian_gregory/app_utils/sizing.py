@@ -0,0 +1,380 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import bisect
+import dataclasses
+import datetime
+import json
+import logging
+import math
+
+import click
+
+SIZING_FILE = "deployment_sizing.json"
+# deploy.py options a sizing file may set
+DEPLOY_SETTINGS = ("min_instances", "max_instances", "container_concurrency", "cpu", "num_workers")
+# Percentile of the queueing delay added to the service-time p95
+WAIT_PERCENTILE = 0.95
+
+
+@dataclasses.dataclass
+class ServiceProfile:
+    """Per-turn service times measured at one or more container concurrencies."""
+
+    # (concurrency, mean seconds, p95 seconds), sorted by concurrency and not empty
+    points: list[tuple[int, float, float]]
+    # CPU seconds per turn, None when unknown
+    cpu_seconds_per_request: float | None = None
+
+    def service_time(self, concurrency: int) -> tuple[float, float]:
+        """(mean, p95) service time at a concurrency, interpolated between the measured points."""
+        if concurrency <= self.points[0][0]:
+            return self.points[0][1:]
+        if concurrency >= self.points[-1][0]:
+            return self.points[-1][1:]
+        index = bisect.bisect_left([point[0] for point in self.points], concurrency)
+        lower, upper = self.points[index - 1], self.points[index]
+        fraction = (concurrency - lower[0]) / (upper[0] - lower[0])
+        return tuple(low + (high - low) * fraction for low, high in zip(lower[1:], upper[1:]))
+
+    @property
+    def max_concurrency(self) -> int:
+        """Highest measured concurrency; contention beyond it is unknown."""
+        return self.points[-1][0]
+
+
+def profile_from_load_reports(reports: list[dict]) -> ServiceProfile:
+    """Build a profile from tests/load/agent_load.py reports, one per tested concurrency."""
+    points = {}
+    cpu_per_request = []
+    for report in reports:
+        concurrency = report["config"]["concurrency"]
+        service = report.get("service_time_ms")
+        if service is None:
+            # Older reports: the mean without admission wait, and the full turn p95
+            breakdown = report["mean_turn_breakdown_ms"]
+            service = {
+                "mean": sum(breakdown.values()) - breakdown.get("admission_wait", 0.0),
+                "p95": report["turn_latency_ms"]["p95"],
+            }
+        points[concurrency] = (concurrency, service["mean"] / 1000, service["p95"] / 1000)
+        if report.get("turns"):
+            cpu_per_request.append(report["cpu_ms_per_session"] * report["config"]["sessions"] / report["turns"] / 1000)
+    if not points:
+        raise ValueError("No load reports to size from")
+    return ServiceProfile(
+        points=sorted(points.values()),
+        cpu_seconds_per_request=max(cpu_per_request) if cpu_per_request else None,
+    )
+
+
+def histogram_percentile(bounds: list[float], counts: list[int], percentile: float) -> float:
+    """Percentile of an explicit-bucket histogram, interpolated linearly within the bucket.
+
+    counts has one more entry than bounds; the last counts everything above
+    the highest bound and is reported as that bound.
+    """
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = percentile * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= rank:
+            if index == len(bounds):
+                return bounds[-1]
+            low = bounds[index - 1] if index else 0.0
+            return low + (bounds[index] - low) * (rank - seen) / count
+        seen += count
+    return bounds[-1]
+
+
+def profile_from_histograms(histograms: list[dict], cpu_seconds_per_request: float | None = None) -> ServiceProfile:
+    """Build a profile from recorded latency histograms.
+
+    Each histogram is {"bounds_ms": [...], "counts": [...], "concurrency": n},
+    the explicit-bucket layout of Cloud Monitoring and OpenTelemetry. They
+    should measure request processing, without time spent queued for a slot.
+    """
+    points = {}
+    for histogram in histograms:
+        bounds, counts = histogram["bounds_ms"], histogram["counts"]
+        if len(counts) != len(bounds) + 1:
+            raise ValueError("A histogram needs one more count than bounds (the overflow bucket)")
+        if counts[-1]:
+            logging.warning(f"{counts[-1]} requests above {bounds[-1]}ms are counted as {bounds[-1]}ms")
+        midpoints = [(low + high) / 2 for low, high in zip([0.0, *bounds], bounds)] + [bounds[-1]]
+        mean = sum(m * c for m, c in zip(midpoints, counts)) / (sum(counts) or 1)
+        concurrency = histogram.get("concurrency", 1)
+        points[concurrency] = (concurrency, mean / 1000, histogram_percentile(bounds, counts, 0.95) / 1000)
+    if not points:
+        raise ValueError("No histograms to size from")
+    return ServiceProfile(points=sorted(points.values()), cpu_seconds_per_request=cpu_seconds_per_request)
+
+
+def erlang_c(servers: int, offered_load: float) -> float:
+    """Probability that an arrival waits in an M/M/c queue (Erlang C).
+
+    offered_load is arrival rate × mean service time. Uses the Erlang B
+    recursion, which stays stable for large server counts.
+    """
+    if offered_load <= 0:
+        return 0.0
+    if offered_load >= servers:
+        return 1.0
+    inverse_b = 1.0
+    for k in range(1, servers + 1):
+        inverse_b = 1.0 + inverse_b * k / offered_load
+    blocking = 1.0 / inverse_b
+    return servers * blocking / (servers - offered_load * (1.0 - blocking))
+
+
+def predict(
+    profile: ServiceProfile,
+    request_rate: float,
+    instances: int,
+    concurrency: int,
+    cores: float,
+) -> dict:
+    """Predict latency and utilisation with each instance as an M/M/c queue of `concurrency` slots.
+
+    Requests are assumed to spread evenly over the instances. The p95 is the
+    service-time p95 plus the p95 of the time spent waiting for a slot.
+    """
+    mean, p95 = profile.service_time(concurrency)
+    arrival_rate = request_rate / instances
+    capacity = concurrency / mean
+    wait_probability = erlang_c(concurrency, arrival_rate * mean)
+    if arrival_rate >= capacity:
+        wait_p95 = math.inf
+    elif wait_probability > 1 - WAIT_PERCENTILE:
+        # P(wait > t) = P(wait) * exp(-(cμ - λ) t)
+        wait_p95 = math.log(wait_probability / (1 - WAIT_PERCENTILE)) / (capacity - arrival_rate)
+    else:
+        wait_p95 = 0.0
+    cpu_utilisation = None
+    if profile.cpu_seconds_per_request is not None:
+        cpu_utilisation = arrival_rate * profile.cpu_seconds_per_request / cores
+    return {
+        "p95_ms": (p95 + wait_p95) * 1000,
+        "service_time_p95_ms": p95 * 1000,
+        "wait_p95_ms": wait_p95 * 1000,
+        "wait_probability": wait_probability,
+        "slot_utilisation": arrival_rate / capacity,
+        "cpu_utilisation": cpu_utilisation,
+    }
+
+
+def instances_needed(
+    profile: ServiceProfile,
+    request_rate: float,
+    concurrency: int,
+    cores: float,
+    target_p95_ms: float,
+    max_cpu_utilisation: float,
+    max_instances: int = 1000,
+) -> tuple[int, dict] | None:
+    """The fewest instances that meet the p95 target and CPU ceiling at a concurrency, or None."""
+    mean, p95 = profile.service_time(concurrency)
+    if p95 * 1000 > target_p95_ms:
+        return None
+    # Every instance must at least keep up with its share of the traffic
+    instances = max(1, math.ceil(request_rate * mean / concurrency))
+    while instances <= max_instances:
+        prediction = predict(profile, request_rate, instances, concurrency, cores)
+        cpu_utilisation = prediction["cpu_utilisation"]
+        if prediction["p95_ms"] <= target_p95_ms and (cpu_utilisation is None or cpu_utilisation <= max_cpu_utilisation):
+            return instances, prediction
+        instances += 1
+    return None
+
+
+def recommend(
+    profile: ServiceProfile,
+    request_rate: float,
+    target_p95_ms: float,
+    cpu: str = "4",
+    num_workers: int = 1,
+    max_concurrency: int = 40,
+    max_cpu_utilisation: float = 0.6,
+    min_request_rate: float = 0.0,
+    headroom: float = 1.5,
+) -> dict:
+    """Recommend container concurrency and min/max instances for a peak request rate and p95 target.
+
+    The concurrency that needs the fewest instances at the peak rate wins,
+    the lowest predicted p95 breaks ties. Concurrencies above the highest
+    measured one aren't considered, as their contention is unknown. A worker process runs Python on one
+    core at a time, so an instance has min(cpu, num_workers) usable cores.
+    max_instances adds headroom for bursts and autoscaling lag on top of the
+    peak; min_instances covers min_request_rate and is at least 1, which
+    keeps a warm replica.
+    """
+    cores = min(float(cpu), num_workers)
+    max_concurrency = min(max_concurrency, profile.max_concurrency)
+    best = None
+    for concurrency in range(1, max_concurrency + 1):
+        sized = instances_needed(profile, request_rate, concurrency, cores, target_p95_ms, max_cpu_utilisation)
+        if sized is None:
+            continue
+        instances, prediction = sized
+        if best is None or (instances, prediction["p95_ms"]) < (best[1], best[2]["p95_ms"]):
+            best = (concurrency, instances, prediction)
+    if best is None:
+        fastest = min(profile.service_time(c)[1] for c in range(1, max_concurrency + 1)) * 1000
+        if fastest > target_p95_ms:
+            raise ValueError(f"A p95 of {target_p95_ms:.0f}ms can't be met: the service time alone has a p95 of at least {fastest:.0f}ms")
+        raise ValueError(f"A p95 of {target_p95_ms:.0f}ms at {request_rate:g} turns/s can't be met with up to 1000 instances")
+
+    concurrency, instances, prediction = best
+    min_instances = 1
+    if min_request_rate > 0:
+        sized = instances_needed(profile, min_request_rate, concurrency, cores, target_p95_ms, max_cpu_utilisation)
+        min_instances = max(1, sized[0] if sized else instances)
+    return {
+        "container_concurrency": concurrency,
+        "min_instances": min(min_instances, instances),
+        "max_instances": max(math.ceil(instances * headroom), min_instances),
+        "cpu": cpu,
+        "num_workers": num_workers,
+        "instances_at_peak": instances,
+        "prediction": prediction,
+    }
+
+
+def read_sizing_file(path: str) -> dict:
+    """The deploy.py settings of a sizing file."""
+    with open(path) as f:
+        sizing = json.load(f)
+    return {key: sizing[key] for key in DEPLOY_SETTINGS if key in sizing}
+
+
+@click.command()
+@click.option(
+    "--load-report",
+    "load_reports",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON report of tests/load/agent_load.py. Pass one per tested --concurrency to model contention",
+)
+@click.option(
+    "--histogram",
+    "histograms",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help='Recorded latency histogram: {"bounds_ms": [...], "counts": [...], "concurrency": n}',
+)
+@click.option("--target-p95-ms", type=float, required=True, help="Target p95 turn latency")
+@click.option("--request-rate", type=float, required=True, help="Peak turns per second to size for")
+@click.option(
+    "--min-request-rate",
+    type=float,
+    default=0.0,
+    help="Turns per second min_instances should serve without scaling (default: 0, one warm instance)",
+)
+@click.option("--cpu", default="4", help="CPU limit per instance (default: 4)")
+@click.option("--num-workers", type=int, default=1, help="Worker processes per instance (default: 1)")
+@click.option(
+    "--cpu-ms-per-request",
+    type=float,
+    default=None,
+    help="CPU time per turn, overrides the load reports (needed to model CPU with --histogram)",
+)
+@click.option("--max-concurrency", type=int, default=40, help="Highest container concurrency to consider (default: 40)")
+@click.option(
+    "--max-cpu-utilisation",
+    type=float,
+    default=0.6,
+    help="CPU utilisation ceiling per instance at peak (default: 0.6)",
+)
+@click.option("--headroom", type=float, default=1.5, help="max_instances as a multiple of the instances needed at peak (default: 1.5)")
+@click.option("--output", default=SIZING_FILE, help=f"Sizing file to write (default: {SIZING_FILE})")
+def sizing(
+    load_reports: tuple[str, ...],
+    histograms: tuple[str, ...],
+    target_p95_ms: float,
+    request_rate: float,
+    min_request_rate: float,
+    cpu: str,
+    num_workers: int,
+    cpu_ms_per_request: float | None,
+    max_concurrency: int,
+    max_cpu_utilisation: float,
+    headroom: float,
+    output: str,
+) -> None:
+    """Recommend deployment sizing from load-test results or latency histograms.
+
+    Writes a sizing file for `deploy.py --sizing-file`.
+    """
+    logging.basicConfig(level=logging.INFO)
+    if bool(load_reports) == bool(histograms):
+        raise click.UsageError("Pass either --load-report or --histogram")
+
+    def read(paths: tuple[str, ...]) -> list[dict]:
+        documents = []
+        for path in paths:
+            with open(path) as f:
+                documents.append(json.load(f))
+        return documents
+
+    if load_reports:
+        profile = profile_from_load_reports(read(load_reports))
+    else:
+        profile = profile_from_histograms(read(histograms))
+    if cpu_ms_per_request is not None:
+        profile.cpu_seconds_per_request = cpu_ms_per_request / 1000
+    if profile.cpu_seconds_per_request is None:
+        logging.warning("No CPU time per turn, sizing on latency alone")
+
+    try:
+        recommendation = recommend(
+            profile,
+            request_rate,
+            target_p95_ms,
+            cpu=cpu,
+            num_workers=num_workers,
+            max_concurrency=max_concurrency,
+            max_cpu_utilisation=max_cpu_utilisation,
+            min_request_rate=min_request_rate,
+            headroom=headroom,
+        )
+    except ValueError as error:
+        raise click.ClickException(str(error)) from error
+
+    recommendation["inputs"] = {
+        "load_reports": list(load_reports),
+        "histograms": list(histograms),
+        "target_p95_ms": target_p95_ms,
+        "request_rate": request_rate,
+        "min_request_rate": min_request_rate,
+        "service_time_points": profile.points,
+        "cpu_seconds_per_request": profile.cpu_seconds_per_request,
+    }
+    recommendation["created"] = datetime.datetime.now().isoformat()
+    with open(output, "w") as f:
+        json.dump(recommendation, f, indent=2)
+
+    prediction = recommendation["prediction"]
+    click.echo(f"📐 {request_rate:g} turns/s at p95 ≤ {target_p95_ms:.0f}ms needs {recommendation['instances_at_peak']} instances "
+               f"at container concurrency {recommendation['container_concurrency']}")
+    click.echo(f"  predicted p95 {prediction['p95_ms']:.0f}ms (service {prediction['service_time_p95_ms']:.0f}ms + "
+               f"wait {prediction['wait_p95_ms']:.0f}ms), slots {prediction['slot_utilisation']:.0%} busy"
+               + (f", CPU {prediction['cpu_utilisation']:.0%}" if prediction["cpu_utilisation"] is not None else ""))
+    click.echo(f"\nWritten to {output}, deploy with:\n  uv run -m julian_gregory.app_utils.deploy --sizing-file={output} "
+               f"# --min-instances={recommendation['min_instances']} --max-instances={recommendation['max_instances']} "
+               f"--container-concurrency={recommendation['container_concurrency']} --cpu={cpu} --num-workers={num_workers}")
+
+
+if __name__ == "__main__":
+    sizing()
@@ -11,19 +11,107 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import contextlib
+import functools
 import logging
 import os
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+from opentelemetry import metrics, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+tracer = trace.get_tracer("julian_gregory")
+meter = metrics.get_meter("julian_gregory")
+
+tool_duration = meter.create_histogram(
+    "julian_gregory.tool.duration",
+    unit="ms",
+    description="Duration of agent tool calls",
+)
+google_api_duration = meter.create_histogram(
+    "julian_gregory.google_api.duration",
+    unit="ms",
+    description="Duration of Google API requests, including retries",
+)
+google_api_response_size = meter.create_histogram(
+    "julian_gregory.google_api.response_size",
+    unit="By",
+    description="Size of Google API response bodies",
+)
+credentials_refresh_duration = meter.create_histogram(
+    "julian_gregory.credentials.refresh.duration",
+    unit="ms",
+    description="Duration of OAuth credential refreshes",
+)
+
+
+# Defaults applied by TELEMETRY_PROFILE. Anything already set in the
+# environment wins. OTEL_BSP_* tune the batch span processor that exports to
+# Cloud Trace; the TELEMETRY_* sampling settings are read by
+# julian_gregory.app_utils.sampling once the tracer provider exists.
+TELEMETRY_PROFILES = {
+    "full": {
+        "TELEMETRY_SAMPLING_MODE": "tail",
+        "TELEMETRY_SAMPLE_RATIO": "1.0",
+        "TELEMETRY_SLOW_TRACE_MS": "10000",
+        "OTEL_BSP_MAX_QUEUE_SIZE": "2048",
+        "OTEL_BSP_MAX_EXPORT_BATCH_SIZE": "512",
+        "OTEL_BSP_SCHEDULE_DELAY": "5000",
+    },
+    "low_overhead": {
+        "TELEMETRY_SAMPLING_MODE": "tail",
+        "TELEMETRY_SAMPLE_RATIO": "0.1",
+        "TELEMETRY_SLOW_TRACE_MS": "15000",
+        "OTEL_BSP_MAX_QUEUE_SIZE": "8192",
+        "OTEL_BSP_MAX_EXPORT_BATCH_SIZE": "1024",
+        "OTEL_BSP_SCHEDULE_DELAY": "15000",
+    },
+}
 
 
 def setup_telemetry() -> str | None:
-    """Configure OpenTelemetry and GenAI telemetry with GCS upload."""
+    """Configure OpenTelemetry and GenAI telemetry with GCS upload.
+
+    TELEMETRY_PROFILE selects "full" (default), "low_overhead" (10% of
+    ordinary traces, larger and less frequent export batches, no GenAI
+    completion upload) or "off" (Agent Engine telemetry disabled).
+    """
+    profile = os.environ.get("TELEMETRY_PROFILE", "full")
+    if profile == "off":
+        logging.info("Telemetry disabled (TELEMETRY_PROFILE=off)")
+        os.environ["GOOGLE_CLOUD_AGENT_ENGINE_ENABLE_TELEMETRY"] = "false"
+        return None
+    if profile not in TELEMETRY_PROFILES:
+        raise ValueError(f"Unknown TELEMETRY_PROFILE: {profile}")
+
     os.environ.setdefault("GOOGLE_CLOUD_AGENT_ENGINE_ENABLE_TELEMETRY", "true")
+    for key, value in TELEMETRY_PROFILES[profile].items():
+        os.environ.setdefault(key, value)
+
+    # Head sampling drops unsampled traces before any span is recorded, which
+    # is cheapest but can't keep errors or slow turns. Tail sampling records
+    # everything and decides per trace at export time.
+    if os.environ["TELEMETRY_SAMPLING_MODE"] == "head":
+        os.environ.setdefault("OTEL_TRACES_SAMPLER", "parentbased_traceidratio")
+        os.environ.setdefault(
+            "OTEL_TRACES_SAMPLER_ARG", os.environ["TELEMETRY_SAMPLE_RATIO"]
+        )
+    logging.info(
+        f"Telemetry profile {profile}: {os.environ['TELEMETRY_SAMPLING_MODE']} sampling "
+        f"at {os.environ['TELEMETRY_SAMPLE_RATIO']}"
+    )
 
     bucket = os.environ.get("LOGS_BUCKET_NAME")
     capture_content = os.environ.get(
         "OTEL_INSTRUMENTATION_GENAI_CAPTURE_MESSAGE_CONTENT", "false"
     )
-    if bucket and capture_content != "false":
+    if profile == "low_overhead":
+        logging.info("Prompt-response logging disabled by the low_overhead profile")
+    elif bucket and capture_content != "false":
         logging.info(
             "Prompt-response logging enabled - mode: NO_CONTENT (metadata only, no prompts/responses)"
         )
@@ -49,3 +137,150 @@ def setup_telemetry() -> str | None:
         )
 
     return bucket
+
+
+def traced_tool(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap an agent tool in a span and record its duration.
+
+    functools.wraps keeps the signature and docstring that ADK uses to build
+    the tool declaration.
+    """
+    attributes = {"julian_gregory.tool": func.__name__}
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        status = "ok"
+        start = time.perf_counter()
+        with tracer.start_as_current_span(
+            f"tool {func.__name__}", attributes=attributes
+        ) as span:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                status = "error"
+                span.record_exception(e)
+                span.set_status(Status(StatusCode.ERROR, str(e)))
+                raise
+            finally:
+                tool_duration.record(
+                    (time.perf_counter() - start) * 1000,
+                    {**attributes, "status": status},
+                )
+
+    return wrapper
+
+
+class TracedHttpRequest(HttpRequest):
+    """HttpRequest that traces every execute() call.
+
+    Pass it as `requestBuilder` when building a service. Each call records the
+    API method, HTTP status, response size and number of retries.
+    """
+
+    def execute(self, http: Any = None, num_retries: int = 0) -> Any:
+        attributes = {
+            "google_api.method": self.methodId or "",
+            "http.request.method": self.method,
+        }
+        result = {"status": 0, "bytes": 0, "retries": 0}
+
+        sleep = self._sleep
+        postproc = self.postproc
+
+        def counting_sleep(seconds: float) -> None:
+            # googleapiclient sleeps once before every retry
+            result["retries"] += 1
+            sleep(seconds)
+
+        def measuring_postproc(resp: Any, content: Any) -> Any:
+            result["status"] = resp.status
+            result["bytes"] = len(content or b"")
+            return postproc(resp, content)
+
+        self._sleep = counting_sleep
+        self.postproc = measuring_postproc
+        start = time.perf_counter()
+        with tracer.start_as_current_span(
+            f"google_api {self.methodId}", kind=SpanKind.CLIENT, attributes=attributes
+        ) as span:
+            try:
+                return super().execute(http=http, num_retries=num_retries)
+            except HttpError as e:
+                result["status"] = e.resp.status
+                result["bytes"] = len(e.content or b"")
+                span.set_status(Status(StatusCode.ERROR, f"HTTP {e.resp.status}"))
+                raise
+            finally:
+                self._sleep = sleep
+                self.postproc = postproc
+                span.set_attribute("http.response.status_code", result["status"])
+                span.set_attribute("http.response.body.size", result["bytes"])
+                span.set_attribute("google_api.retries", result["retries"])
+                metric_attributes = {**attributes, "status": result["status"]}
+                google_api_duration.record(
+                    (time.perf_counter() - start) * 1000, metric_attributes
+                )
+                google_api_response_size.record(result["bytes"], metric_attributes)
+
+
+@contextlib.contextmanager
+def traced_credentials_refresh() -> Iterator[None]:
+    """Trace an OAuth credential refresh."""
+    status = "ok"
+    start = time.perf_counter()
+    with tracer.start_as_current_span("credentials refresh") as span:
+        try:
+            yield
+        except Exception as e:
+            status = "error"
+            span.record_exception(e)
+            span.set_status(Status(StatusCode.ERROR, str(e)))
+            raise
+        finally:
+            credentials_refresh_duration.record(
+                (time.perf_counter() - start) * 1000, {"status": status}
+            )
+
+
+def setup_local_tracing(exporter: str | None = None) -> None:
+    """Export spans and metrics locally, e.g. when running `make playground`.
+
+    `exporter` defaults to LOCAL_TELEMETRY_EXPORTER: "console" prints to
+    stdout, "otlp" sends to the collector at OTEL_EXPORTER_OTLP_ENDPOINT.
+    Does nothing when unset, so Agent Engine keeps its own providers.
+    """
+    exporter = exporter or os.environ.get("LOCAL_TELEMETRY_EXPORTER")
+    if not exporter:
+        return
+
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    if exporter == "console":
+        from opentelemetry.sdk.metrics.export import ConsoleMetricExporter
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        span_exporter: Any = ConsoleSpanExporter()
+        metric_exporter: Any = ConsoleMetricExporter()
+    elif exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
+            OTLPMetricExporter,
+        )
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        span_exporter = OTLPSpanExporter()
+        metric_exporter = OTLPMetricExporter()
+    else:
+        raise ValueError(f"Unknown LOCAL_TELEMETRY_EXPORTER: {exporter}")
+
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    trace.set_tracer_provider(tracer_provider)
+    metrics.set_meter_provider(
+        MeterProvider(metric_readers=[PeriodicExportingMetricReader(metric_exporter)])
+    )
+    logging.info(f"Local telemetry export enabled ({exporter})")
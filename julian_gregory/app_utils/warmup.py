@@ -0,0 +1,122 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import os
+import time
+from collections.abc import Callable
+from zoneinfo import ZoneInfo
+
+from julian_gregory import helper_funcs
+
+# Discovery documents used by the tools, see helper_funcs.build_service
+DISCOVERY_DOCUMENTS = [("calendar", "v3"), ("gmail", "v1"), ("oauth2", "v2")]
+
+# Zones loaded up front so the first slot search doesn't pay for reading tzdata
+COMMON_TIME_ZONES = [
+    "UTC",
+    "America/Los_Angeles",
+    "America/Denver",
+    "America/Chicago",
+    "America/New_York",
+    "America/Sao_Paulo",
+    "Europe/London",
+    "Europe/Paris",
+    "Europe/Berlin",
+    "Asia/Kolkata",
+    "Asia/Singapore",
+    "Asia/Kuala_Lumpur",
+    "Asia/Tokyo",
+    "Australia/Sydney",
+]
+
+OAUTH_HOST = "https://oauth2.googleapis.com"
+
+
+def warm_discovery_documents() -> None:
+    """Parse the bundled discovery documents into the helper_funcs cache."""
+    for service_name, version in DISCOVERY_DOCUMENTS:
+        helper_funcs.get_discovery_document(
+            service_name, version, helper_funcs.api_root_url(service_name)
+        )
+
+
+def warm_time_zones() -> None:
+    """Load the common zones into the ZoneInfo cache."""
+    extra_zones = [
+        zone.strip()
+        for zone in os.environ.get("WARMUP_TIME_ZONES", "").split(",")
+        if zone.strip()
+    ]
+    for zone in COMMON_TIME_ZONES + extra_zones:
+        ZoneInfo(zone)
+
+
+def warm_model_clients() -> None:
+    """Instantiate the API client of every model object shared by the agent tree."""
+    from julian_gregory.agent import root_agent
+
+    pending = [root_agent]
+    seen = set()
+    while pending:
+        agent = pending.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        # String models are resolved to a fresh object per call, so only model
+        # instances hold a client worth warming up.
+        model = getattr(agent, "model", None)
+        if hasattr(model, "api_client"):
+            _ = model.api_client
+        pending.extend(agent.sub_agents)
+        pending.extend(
+            tool.agent for tool in getattr(agent, "tools", []) if hasattr(tool, "agent")
+        )
+
+
+def warm_connections() -> None:
+    """Open the pooled connection used for OAuth token refreshes."""
+    helper_funcs.refresh_session.head(OAUTH_HOST, timeout=5)
+
+
+def warm_up() -> dict[str, float]:
+    """Preload discovery documents, time zones, model clients and optionally connections.
+
+    Controlled by WARMUP_ENABLED (default "true") and WARMUP_CONNECTIONS
+    (default "false"). Failures are logged and never stop the app from
+    starting. Returns the duration of each phase in milliseconds.
+    """
+    if os.environ.get("WARMUP_ENABLED", "true").lower() == "false":
+        logging.info("Warm-up disabled (WARMUP_ENABLED=false)")
+        return {}
+
+    phases: list[tuple[str, Callable[[], None]]] = [
+        ("discovery_documents", warm_discovery_documents),
+        ("time_zones", warm_time_zones),
+        ("model_clients", warm_model_clients),
+    ]
+    if os.environ.get("WARMUP_CONNECTIONS", "false").lower() == "true":
+        phases.append(("connections", warm_connections))
+
+    timings = {}
+    for name, phase in phases:
+        start = time.perf_counter()
+        try:
+            phase()
+        except Exception:
+            logging.warning(f"Warm-up phase {name} failed", exc_info=True)
+        timings[name] = (time.perf_counter() - start) * 1000
+        logging.info(f"Warm-up phase {name} took {timings[name]:.1f}ms")
+
+    logging.info(f"Warm-up finished in {sum(timings.values()):.1f}ms")
+    return timings
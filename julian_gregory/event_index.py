@@ -0,0 +1,265 @@
+"""
+A per-user SQLite index of calendar events for range, attendee and text queries.
+
+Each calendar in use is synced with events.list: a full sync the first time,
+then incremental syncs with the nextSyncToken the API hands back, which return
+only what changed since, deleted events included. A sync token the API no
+longer accepts (410 Gone) starts that calendar's full sync again. A full sync
+only reads the EVENT_INDEX_WINDOW_DAYS before and after now, rather than the
+calendar's whole history and every instance of series that never end; once
+less than half the window lies ahead, the calendar is synced in full again. Start times
+and attendee emails have ordinary indexes, and summaries, descriptions and
+locations an FTS5 full-text index, so a question like "when did I last meet
+Brad?" reads a handful of rows instead of months of events.
+
+A calendar marked dirty, by a push notification (see notifications.py), is
+synced on the next search however recently it was synced before.
+
+The databases live in EVENT_INDEX_DIR, one file per user.
+"""
+import datetime
+import functools
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections.abc import Collection
+
+from googleapiclient.errors import HttpError
+
+from .time_utils import to_epoch, to_isoformat
+
+DEFAULT_EVENT_INDEX_DIR = os.path.join(tempfile.gettempdir(), "julian_gregory_event_index")
+# Searches within this many seconds of the last sync use the index as it is
+DEFAULT_SYNC_INTERVAL_SECONDS = 30
+# A full sync indexes the events this many days either side of now
+DEFAULT_WINDOW_DAYS = 365
+DAY = 24 * 60 * 60
+# Descriptions are cut to this length in search results
+DESCRIPTION_CHARS = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calendars (calendar_id TEXT PRIMARY KEY, sync_token TEXT, synced REAL, window_end REAL);
+CREATE TABLE IF NOT EXISTS dirty (calendar_id TEXT PRIMARY KEY, notified REAL);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    ical_uid TEXT,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    all_day INTEGER NOT NULL,
+    summary TEXT,
+    description TEXT,
+    location TEXT,
+    html_link TEXT,
+    UNIQUE (calendar_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS events_start ON events (start);
+CREATE TABLE IF NOT EXISTS attendees (event INTEGER NOT NULL, email TEXT NOT NULL, name TEXT);
+CREATE INDEX IF NOT EXISTS attendees_email ON attendees (email);
+CREATE INDEX IF NOT EXISTS attendees_event ON attendees (event);
+CREATE VIRTUAL TABLE IF NOT EXISTS events_text USING fts5(summary, description, location, content='events', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS events_text_insert AFTER INSERT ON events BEGIN
+    INSERT INTO events_text (rowid, summary, description, location) VALUES (new.id, new.summary, new.description, new.location);
+END;
+CREATE TRIGGER IF NOT EXISTS events_text_delete AFTER DELETE ON events BEGIN
+    INSERT INTO events_text (events_text, rowid, summary, description, location) VALUES ('delete', old.id, old.summary, old.description, old.location);
+    DELETE FROM attendees WHERE event = old.id;
+END;
+"""
+
+
+def event_index_path(user_id: str) -> str:
+    """The index file of a user, named by a hash of the user id so any id makes a safe file name."""
+    directory = os.environ.get("EVENT_INDEX_DIR", DEFAULT_EVENT_INDEX_DIR)
+    return os.path.join(directory, hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32] + ".sqlite3")
+
+
+def _fts_query(text: str) -> str:
+    """Every word of text as a quoted prefix term, so user input can't be read as FTS5 syntax."""
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in text.split())
+
+
+class EventIndex:
+    def __init__(self, path: str):
+        self.path = path
+        # One sync at a time per index; searches read concurrently
+        self.sync_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            # Indexes from before full syncs were windowed were synced without an end
+            if "window_end" not in {column[1] for column in connection.execute("PRAGMA table_info(calendars)")}:
+                connection.execute("ALTER TABLE calendars ADD COLUMN window_end REAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per call, as tools run on several threads
+        return sqlite3.connect(self.path, timeout=5)
+
+    def sync_state(self) -> dict[str, tuple[str | None, float, float | None]]:
+        """
+        The sync token and time of the last sync of each indexed calendar, with 0 for calendars changed since, and the
+        end of the window of its last full sync.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT c.calendar_id, c.sync_token, CASE WHEN d.notified >= c.synced THEN 0 ELSE c.synced END, c.window_end "
+                "FROM calendars c LEFT JOIN dirty d USING (calendar_id)"
+            )
+            return {calendar_id: (token, synced, window_end) for calendar_id, token, synced, window_end in rows}
+
+    def mark_dirty(self, calendar_id: str):
+        """Records that the calendar changed, so it is synced next time."""
+        with self._connect() as connection:
+            connection.execute("INSERT OR REPLACE INTO dirty (calendar_id, notified) VALUES (?, ?)", (calendar_id, time.time()))
+
+    def apply(self, calendar_id: str, events: list[dict], sync_token: str | None, full: bool, time_zone: datetime.tzinfo,
+              synced: float | None = None, window_end: float | None = None):
+        """
+        Stores a sync's events and next sync token in one transaction; a full sync replaces what the calendar had.
+        synced is when the sync started, so changes notified while it ran still leave the calendar dirty, and window_end
+        the end of a full sync's window, kept as it is by incremental syncs.
+        """
+        with self._connect() as connection:
+            if full:
+                connection.execute("DELETE FROM events WHERE calendar_id = ?", (calendar_id,))
+            for event in events:
+                connection.execute("DELETE FROM events WHERE calendar_id = ? AND event_id = ?", (calendar_id, event["id"]))
+                start, end = event.get("start", {}), event.get("end", {})
+                if event.get("status") == "cancelled" or not (start.get("dateTime") or start.get("date")):
+                    continue
+                row = connection.execute(
+                    "INSERT INTO events (calendar_id, event_id, ical_uid, start, end, all_day, summary, description, location, html_link) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        calendar_id, event["id"], event.get("iCalUID"),
+                        to_epoch(start.get("dateTime") or start["date"], time_zone),
+                        to_epoch(end.get("dateTime") or end.get("date") or start.get("dateTime") or start["date"], time_zone),
+                        "dateTime" not in start, event.get("summary"), event.get("description"), event.get("location"), event.get("htmlLink"),
+                    ),
+                ).lastrowid
+                people = {person["email"].lower(): person.get("displayName") for person in [event.get("organizer", {}), *event.get("attendees", [])] if person.get("email")}
+                connection.executemany("INSERT INTO attendees (event, email, name) VALUES (?, ?, ?)", [(row, email, name) for email, name in people.items()])
+            connection.execute(
+                "INSERT INTO calendars (calendar_id, sync_token, synced, window_end) VALUES (?, ?, ?, ?) ON CONFLICT (calendar_id) DO UPDATE "
+                "SET sync_token = excluded.sync_token, synced = excluded.synced, window_end = coalesce(excluded.window_end, calendars.window_end)",
+                (calendar_id, sync_token, time.time() if synced is None else synced, window_end),
+            )
+
+    def search(self, calendar_ids: list[str], time_zone: datetime.tzinfo, text: str = "", attendee: str = "", time_min: int | None = None,
+               time_max: int | None = None, latest_first: bool = False, limit: int = 10) -> list[dict]:
+        """Events of the calendars matching every given criterion, by start time."""
+        conditions = [f"e.calendar_id IN ({', '.join('?' * len(calendar_ids))})"]
+        parameters: list = list(calendar_ids)
+        if text.strip():
+            conditions.append("e.id IN (SELECT rowid FROM events_text WHERE events_text MATCH ?)")
+            parameters.append(_fts_query(text))
+        if attendee.strip():
+            conditions.append("e.id IN (SELECT event FROM attendees WHERE email LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\')")
+            # % and _ in the input are matched as themselves
+            pattern = attendee.strip().lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            parameters += [f"%{pattern}%"] * 2
+        if time_min is not None:
+            conditions.append("e.end > ?")
+            parameters.append(time_min)
+        if time_max is not None:
+            conditions.append("e.start < ?")
+            parameters.append(time_max)
+        # An event copied to several calendars is one result, so read enough rows to fill the limit after dropping copies
+        query = (
+            "SELECT e.id, e.calendar_id, e.event_id, e.ical_uid, e.start, e.end, e.all_day, e.summary, e.description, e.location, e.html_link "
+            f"FROM events e WHERE {' AND '.join(conditions)} ORDER BY e.start {'DESC' if latest_first else 'ASC'} LIMIT ?"
+        )
+        parameters.append(limit * len(calendar_ids))
+        with self._connect() as connection:
+            rows = connection.execute(query, parameters).fetchall()
+            results, seen = [], set()
+            for row_id, calendar_id, event_id, ical_uid, start, end, all_day, summary, description, location, html_link in rows:
+                if (ical_uid or event_id, start) in seen:
+                    continue
+                seen.add((ical_uid or event_id, start))
+                attendees = [email for email, in connection.execute("SELECT email FROM attendees WHERE event = ? ORDER BY rowid", (row_id,))]
+                results.append({
+                    "id": event_id,
+                    "calendarId": calendar_id,
+                    "summary": summary,
+                    "start": datetime.datetime.fromtimestamp(start, time_zone).date().isoformat() if all_day else to_isoformat(start, time_zone),
+                    "end": datetime.datetime.fromtimestamp(end, time_zone).date().isoformat() if all_day else to_isoformat(end, time_zone),
+                    "location": location,
+                    "description": (description or "")[:DESCRIPTION_CHARS],
+                    "attendees": attendees,
+                    "htmlLink": html_link,
+                })
+                if len(results) == limit:
+                    break
+        return results
+
+
+@functools.cache
+def get_event_index(path: str) -> EventIndex:
+    """Returns the process-wide index for a file, so concurrent tool calls share its sync lock."""
+    return EventIndex(path)
+
+
+def sync(index: EventIndex, calendar_service, calendar_ids: list[str], time_zone: datetime.tzinfo, min_interval_seconds: float = 0,
+         watched: Collection[str] = (), watched_interval_seconds: float = 0):
+    """
+    Brings the index up to date with the calendars. Calendars synced within min_interval_seconds, or for watched
+    calendars (which are marked dirty when they change) within watched_interval_seconds, are skipped, unless less
+    than half the window of their last full sync lies ahead.
+    Every calendar's next page is fetched in one batch request per round; a calendar is only stored once all its pages are in.
+    """
+    window = float(os.environ.get("EVENT_INDEX_WINDOW_DAYS", DEFAULT_WINDOW_DAYS)) * DAY
+    with index.sync_lock:
+        state = index.sync_state()
+        now = time.time()
+        time_min, time_max = to_isoformat(now - window, datetime.timezone.utc), to_isoformat(now + window, datetime.timezone.utc)
+        # calendar id -> (sync token or None for a full sync, page token)
+        pending = {}
+        for calendar_id in calendar_ids:
+            if calendar_id not in state:
+                pending[calendar_id] = (None, None)
+                continue
+            sync_token, synced, window_end = state[calendar_id]
+            if window_end is not None and window_end - now < window / 2:
+                pending[calendar_id] = (None, None)
+            elif now - synced >= (watched_interval_seconds if calendar_id in watched else min_interval_seconds):
+                pending[calendar_id] = (sync_token, None)
+        events: dict[str, list[dict]] = {calendar_id: [] for calendar_id in pending}
+
+        while pending:
+            next_pages = {}
+
+            def collect(calendar_id, response, exception):
+                sync_token, _ = pending[calendar_id]
+                if isinstance(exception, HttpError) and exception.resp.status == 410 and sync_token:
+                    logging.info(f"Sync token of calendar {calendar_id} expired, syncing it in full")
+                    events[calendar_id] = []
+                    next_pages[calendar_id] = (None, None)
+                    return
+                if exception is not None:
+                    logging.warning(f"Could not sync events of calendar {calendar_id}: {exception}")
+                    return
+                events[calendar_id].extend(response.get("items", []))
+                if response.get("nextPageToken"):
+                    next_pages[calendar_id] = (sync_token, response["nextPageToken"])
+                else:
+                    index.apply(calendar_id, events[calendar_id], response.get("nextSyncToken"), full=sync_token is None, time_zone=time_zone,
+                                synced=now, window_end=None if sync_token else now + window)
+
+            batch = calendar_service.new_batch_http_request(callback=collect)
+            for calendar_id, (sync_token, page_token) in pending.items():
+                if sync_token:
+                    request = calendar_service.events().list(calendarId=calendar_id, syncToken=sync_token, singleEvents=True, pageToken=page_token,
+                                                             maxResults=2500)
+                else:
+                    request = calendar_service.events().list(calendarId=calendar_id, singleEvents=True, timeMin=time_min, timeMax=time_max,
+                                                             pageToken=page_token, maxResults=2500)
+                batch.add(request, request_id=calendar_id)
+            batch.execute()
+            pending = next_pages
@@ -0,0 +1,256 @@
+"""
+Bulk freebusy queries, with a cache per user.
+
+Busy time is cached per user, calendar and UTC day for
+FREEBUSY_CACHE_TTL_SECONDS, so the calendars a user asks about again and again,
+in one session or several, are queried again only once their days expire. The
+cache is kept per user because what freebusy returns depends on whose
+credentials asked: busy time fetched for one user is never served to another,
+who may not be allowed to see it. A query is answered from the cache when every
+day it covers is there, and otherwise only the span of missing days is fetched.
+
+FREEBUSY_CACHE_BACKEND picks where the cache lives: "memory" (default) in this
+process, "sqlite" in a file at FREEBUSY_CACHE_PATH that the workers on one
+machine share, or "none". Only busy time the API returned is cached, never
+errors, so a calendar the user can't read is asked about again every time.
+Calendars with a push notification channel are dropped from the cache as soon
+as they change, see notifications.py.
+"""
+import collections
+import datetime
+import functools
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+
+from .time_utils import merge_intervals, to_epoch, to_isoformat
+
+# freebusy.query accepts at most 50 calendars, and a Calendar batch request at most 50 calls
+FREEBUSY_CALENDARS_PER_QUERY = 50
+FREEBUSY_QUERIES_PER_BATCH = 50
+DAY = 24 * 60 * 60
+DEFAULT_CACHE_BACKEND = "memory"
+DEFAULT_CACHE_TTL_SECONDS = 120
+DEFAULT_CACHE_MAX_ENTRIES = 20000
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(), "julian_gregory_freebusy.sqlite3")
+
+
+class MemoryBusyCache:
+    """An in-process LRU of (user, calendar, day) to busy intervals, bounded to max_entries."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: collections.OrderedDict[tuple[str, str, int], tuple[float, list[tuple[int, int]]]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, calendar_id: str, first_day: int, last_day: int, now: float) -> dict[int, list[tuple[int, int]]]:
+        """The unexpired days from first_day to last_day that are cached for the calendar as the user sees it."""
+        days = {}
+        with self._lock:
+            for day in range(first_day, last_day + 1):
+                entry = self._entries.get((user_id, calendar_id, day))
+                if entry is None:
+                    continue
+                expires, busy = entry
+                if expires <= now:
+                    del self._entries[(user_id, calendar_id, day)]
+                    continue
+                self._entries.move_to_end((user_id, calendar_id, day))
+                days[day] = busy
+        return days
+
+    def put(self, user_id: str, calendar_id: str, days: dict[int, list[tuple[int, int]]], expires: float):
+        with self._lock:
+            for day, busy in days.items():
+                self._entries[(user_id, calendar_id, day)] = (expires, busy)
+                self._entries.move_to_end((user_id, calendar_id, day))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, calendar_id: str):
+        """Drops every cached day of the calendar, for every user."""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == calendar_id]:
+                del self._entries[key]
+
+
+class SqliteBusyCache:
+    """(user, calendar, day) to busy intervals in a SQLite file, bounded to max_entries by dropping those expiring first."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            # A cache from before it was kept per user can't tell whose busy time it holds
+            if "user_id" not in {column[1] for column in connection.execute("PRAGMA table_info(busy)")}:
+                connection.execute("DROP TABLE IF EXISTS busy")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS busy (user_id TEXT, calendar_id TEXT, day INTEGER, expires REAL, intervals TEXT, "
+                "PRIMARY KEY (user_id, calendar_id, day))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS busy_expires ON busy (expires)")
+            connection.execute("CREATE INDEX IF NOT EXISTS busy_calendar ON busy (calendar_id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per call, as tools run on several threads and workers share the file
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, user_id: str, calendar_id: str, first_day: int, last_day: int, now: float) -> dict[int, list[tuple[int, int]]]:
+        """The unexpired days from first_day to last_day that are cached for the calendar as the user sees it."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT day, intervals FROM busy WHERE user_id = ? AND calendar_id = ? AND day BETWEEN ? AND ? AND expires > ?",
+                (user_id, calendar_id, first_day, last_day, now),
+            ).fetchall()
+        return {day: [tuple(interval) for interval in json.loads(intervals)] for day, intervals in rows}
+
+    def put(self, user_id: str, calendar_id: str, days: dict[int, list[tuple[int, int]]], expires: float):
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO busy (user_id, calendar_id, day, expires, intervals) VALUES (?, ?, ?, ?, ?)",
+                [(user_id, calendar_id, day, expires, json.dumps(busy)) for day, busy in days.items()],
+            )
+            connection.execute("DELETE FROM busy WHERE expires <= ?", (time.time(),))
+            connection.execute(
+                "DELETE FROM busy WHERE rowid IN (SELECT rowid FROM busy ORDER BY expires LIMIT max(0, (SELECT count(*) FROM busy) - ?))",
+                (self.max_entries,),
+            )
+
+    def invalidate(self, calendar_id: str):
+        """Drops every cached day of the calendar, for every user."""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM busy WHERE calendar_id = ?", (calendar_id,))
+
+
+@functools.cache
+def get_busy_cache(backend: str, path: str, max_entries: int) -> MemoryBusyCache | SqliteBusyCache | None:
+    """Returns the process-wide cache for a backend, so every tool call shares it."""
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        return SqliteBusyCache(path, max_entries)
+    if backend != "memory":
+        logging.warning(f"Unknown FREEBUSY_CACHE_BACKEND {backend!r}, using memory")
+    return MemoryBusyCache(max_entries)
+
+
+def busy_cache() -> MemoryBusyCache | SqliteBusyCache | None:
+    """The cache configured by FREEBUSY_CACHE_BACKEND, FREEBUSY_CACHE_PATH and FREEBUSY_CACHE_MAX_ENTRIES, or None when it is off."""
+    return get_busy_cache(
+        os.environ.get("FREEBUSY_CACHE_BACKEND", DEFAULT_CACHE_BACKEND).lower(),
+        os.environ.get("FREEBUSY_CACHE_PATH", DEFAULT_CACHE_PATH),
+        int(os.environ.get("FREEBUSY_CACHE_MAX_ENTRIES", DEFAULT_CACHE_MAX_ENTRIES)),
+    )
+
+
+def _fetch_busy(calendar_service, queries: list[tuple[list[str], int, int]]) -> dict[str, list[tuple[int, int]] | None]:
+    """
+    Merged busy intervals of the calendars of each (calendar ids, start, end) query, or None for calendars freebusy
+    couldn't read. Calendars are queried 50 to a freebusy request, and the requests are sent 50 to a batch, or on
+    their own when there is only one.
+    """
+    busy: dict[str, list[tuple[int, int]] | None] = {}
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            logging.warning(f"freebusy query {request_id} failed: {exception}")
+            return
+        for calendar_id, data in response.get("calendars", {}).items():
+            if data.get("errors"):
+                continue
+            busy[calendar_id] = merge_intervals([(to_epoch(period["start"]), to_epoch(period["end"])) for period in data.get("busy", [])])
+
+    bodies = []
+    for calendar_ids, start, end in queries:
+        for first in range(0, len(calendar_ids), FREEBUSY_CALENDARS_PER_QUERY):
+            bodies.append({
+                "timeMin": to_isoformat(start, datetime.timezone.utc),
+                "timeMax": to_isoformat(end, datetime.timezone.utc),
+                "items": [{"id": calendar_id} for calendar_id in calendar_ids[first:first + FREEBUSY_CALENDARS_PER_QUERY]],
+            })
+
+    if len(bodies) == 1:
+        try:
+            collect("0", calendar_service.freebusy().query(body=bodies[0]).execute(), None)
+        except HttpError as e:
+            collect("0", None, e)
+    else:
+        for first in range(0, len(bodies), FREEBUSY_QUERIES_PER_BATCH):
+            batch = calendar_service.new_batch_http_request(callback=collect)
+            for index in range(first, min(first + FREEBUSY_QUERIES_PER_BATCH, len(bodies))):
+                batch.add(calendar_service.freebusy().query(body=bodies[index]), request_id=str(index))
+            batch.execute()
+
+    return {calendar_id: busy.get(calendar_id) for calendar_ids, _, _ in queries for calendar_id in calendar_ids}
+
+
+def _split_days(intervals: list[tuple[int, int]], first_day: int, last_day: int) -> dict[int, list[tuple[int, int]]]:
+    """The intervals cut at UTC midnights, for every day from first_day to last_day, including the free ones."""
+    days: dict[int, list[tuple[int, int]]] = {day: [] for day in range(first_day, last_day + 1)}
+    for start, end in intervals:
+        for day in range(max(start // DAY, first_day), min((end - 1) // DAY, last_day) + 1):
+            days[day].append((max(start, day * DAY), min(end, (day + 1) * DAY)))
+    return days
+
+
+def _join_days(days: list[list[tuple[int, int]]], start: int, end: int) -> list[tuple[int, int]]:
+    """Consecutive days' intervals between start and end, rejoining those cut at midnight."""
+    joined: list[tuple[int, int]] = []
+    for intervals in days:
+        for interval_start, interval_end in intervals:
+            interval_start, interval_end = max(interval_start, start), min(interval_end, end)
+            if interval_start >= interval_end:
+                continue
+            if joined and interval_start <= joined[-1][1]:
+                joined[-1] = (joined[-1][0], max(joined[-1][1], interval_end))
+            else:
+                joined.append((interval_start, interval_end))
+    return joined
+
+
+def query_busy(calendar_service, calendar_ids: list[str], time_min: str, time_max: str, *, user_id: str) -> dict[str, list[tuple[int, int]] | None]:
+    """
+    Merged busy intervals (epoch seconds) of every calendar, or None for calendars freebusy couldn't read.
+    user_id is the user whose credentials calendar_service has, and whose days in the cache are served from it;
+    each calendar fetches the span of days it is missing, and calendars missing the same span share freebusy requests.
+    """
+    start, end = to_epoch(time_min), to_epoch(time_max)
+    calendar_ids = list(dict.fromkeys(calendar_ids))
+    cache = busy_cache()
+    if cache is None or end <= start:
+        return _fetch_busy(calendar_service, [(calendar_ids, start, end)])
+
+    first_day, last_day = start // DAY, (end - 1) // DAY
+    now = time.time()
+    cached = {calendar_id: cache.get(user_id, calendar_id, first_day, last_day, now) for calendar_id in calendar_ids}
+    unreadable: set[str] = set()
+    spans: dict[tuple[int, int], list[str]] = collections.defaultdict(list)
+    for calendar_id, days in cached.items():
+        missing = [day for day in range(first_day, last_day + 1) if day not in days]
+        if missing:
+            spans[(missing[0], missing[-1])].append(calendar_id)
+
+    if spans:
+        fetched = _fetch_busy(calendar_service, [(span_ids, first * DAY, (last + 1) * DAY) for (first, last), span_ids in spans.items()])
+        expires = now + float(os.environ.get("FREEBUSY_CACHE_TTL_SECONDS", DEFAULT_CACHE_TTL_SECONDS))
+        for (first, last), span_ids in spans.items():
+            for calendar_id in span_ids:
+                intervals = fetched[calendar_id]
+                if intervals is None:
+                    unreadable.add(calendar_id)
+                    continue
+                days = _split_days(intervals, first, last)
+                cache.put(user_id, calendar_id, days, expires)
+                cached[calendar_id].update(days)
+
+    return {
+        calendar_id: None if calendar_id in unreadable else _join_days([days[day] for day in range(first_day, last_day + 1)], start, end)
+        for calendar_id, days in cached.items()
+    }
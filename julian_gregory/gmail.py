@@ -0,0 +1,330 @@
+"""
+Finding events to put in the calendar in the user's email.
+
+Messages are listed with a Gmail search query and fetched in batch requests,
+first as metadata only: subject, sender and the snippet. Only the messages whose
+metadata looks like an event have their text parts fetched. The API response
+holds a part's base64 text whole, but it is decoded and scanned a chunk at a
+time by EventScanner, up to MAX_SCAN_CHARS, so no decoded copy of a long
+newsletter or a big HTML message is made. The scanner picks out dates, times,
+time zones, locations and meeting links, which become compact candidates
+carrying the arguments for set_calendar_entry.
+"""
+import base64
+import codecs
+import dataclasses
+import datetime
+import logging
+import re
+from collections.abc import Iterator
+from html.parser import HTMLParser
+from zoneinfo import ZoneInfo
+
+from .time_utils import MINUTE, local_to_epoch, to_isoformat
+
+# Gmail rate-limits batches of more than 50 calls
+MESSAGES_PER_BATCH = 50
+METADATA_HEADERS = ["Subject", "From"]
+# Only the text parts of a message, without its headers, attachments or anything else
+TEXT_PARTS_FIELDS = "id,payload(mimeType,body/data,parts(mimeType,body/data,parts(mimeType,body/data,parts(mimeType,body/data))))"
+# Base64 characters decoded at a time; a multiple of 4 so chunks decode on their own
+CHUNK_CHARS = 16 * 1024
+# The most characters of a message's text that are scanned
+MAX_SCAN_CHARS = 100_000
+# The most values of each kind kept per message
+MAX_VALUES = 3
+DEFAULT_DURATION_MINUTES = 60
+SNIPPET_CHARS = 200
+
+_MONTH = r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+_MONTHS = {name: number for number, name in enumerate(["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1)}
+_DATES = [
+    (re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b"), lambda m: (m[1], m[2], m[3])),
+    (re.compile(rf"\b{_MONTH}\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(\d{{4}})\b)?", re.I), lambda m: (m[3], _MONTHS[m[1][:3].lower()], m[2])),
+    (re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTH}(?:,?\s+(\d{{4}})\b)?", re.I), lambda m: (m[3], _MONTHS[m[2][:3].lower()], m[1])),
+    (re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4})\b"), lambda m: (m[3], m[1], m[2])),
+]
+# An hour with optional minutes and am/pm, alone or as a range such as "9:30-11am" or "2 to 4 p.m."
+_CLOCK = r"(\d{1,2})(?!\d)(?::(\d{2}))?(?:\s*([ap])\.?m(?:\.|\b))?"
+_TIME = re.compile(rf"\b{_CLOCK}(?:\s*(?:-|–|—|to|until)\s*{_CLOCK})?", re.I)
+_ZONES = {
+    "pt": "America/Los_Angeles", "pst": "America/Los_Angeles", "pdt": "America/Los_Angeles",
+    "mt": "America/Denver", "mst": "America/Denver", "mdt": "America/Denver",
+    "ct": "America/Chicago", "cst": "America/Chicago", "cdt": "America/Chicago",
+    "et": "America/New_York", "est": "America/New_York", "edt": "America/New_York",
+    "utc": "UTC", "gmt": "UTC", "bst": "Europe/London", "cet": "Europe/Paris", "cest": "Europe/Paris",
+    "ist": "Asia/Kolkata", "sgt": "Asia/Singapore", "jst": "Asia/Tokyo", "aest": "Australia/Sydney", "aedt": "Australia/Sydney",
+}
+_ZONE = re.compile(r"^\s*\(?(" + "|".join(_ZONES) + r")\b", re.I)
+_LOCATION = re.compile(r"^\s*(?:location|where|venue|room|address|place)\s*:\s*(\S.{0,199})", re.I)
+_LINK = re.compile(r"https://(?:[\w-]+\.)*(?:zoom\.us|meet\.google\.com|teams\.microsoft\.com|teams\.live\.com|webex\.com)/[^\s<>\"')\]]+", re.I)
+_EVENT_WORDS = re.compile(
+    r"\b(training|webinar|workshop|course|class|seminar|conference|session|invitation|invite|appointment|reservation|booking|registration|registered)\b",
+    re.I,
+)
+
+
+@dataclasses.dataclass
+class EventScanner:
+    """
+    Collects event details from text fed to it in chunks of any size. Text is scanned a line at a time, the last
+    incomplete line of a chunk waiting for the next one, and scanning stops after MAX_SCAN_CHARS.
+    reference is the date of the message, which dates without a year are on or after.
+    """
+    reference: datetime.date
+    dates: list[datetime.date] = dataclasses.field(default_factory=list)
+    # (hour, minute) starts, and ends when the text gave a range
+    times: list[tuple[tuple[int, int], tuple[int, int] | None]] = dataclasses.field(default_factory=list)
+    time_zone: str | None = None
+    locations: list[str] = dataclasses.field(default_factory=list)
+    links: list[str] = dataclasses.field(default_factory=list)
+    _pending: str = ""
+    _scanned: int = 0
+
+    @property
+    def done(self) -> bool:
+        return self._scanned >= MAX_SCAN_CHARS
+
+    def feed(self, text: str):
+        if self.done:
+            return
+        text = text[:MAX_SCAN_CHARS - self._scanned]
+        self._scanned += len(text)
+        *lines, self._pending = (self._pending + text).split("\n")
+        for line in lines:
+            self._scan(line)
+        if len(self._pending) > MAX_SCAN_CHARS:
+            self._pending = ""
+
+    def close(self):
+        self._scan(self._pending)
+        self._pending = ""
+
+    def _add(self, values: list, value):
+        if value not in values and len(values) < MAX_VALUES:
+            values.append(value)
+
+    def _scan(self, line: str):
+        for pattern, fields in _DATES:
+            for match in pattern.finditer(line):
+                year, month, day = fields(match)
+                try:
+                    date = datetime.date(int(year or self.reference.year), int(month), int(day))
+                except ValueError:
+                    continue
+                if not year and date < self.reference:
+                    date = date.replace(year=date.year + 1)
+                self._add(self.dates, date)
+        for match in _TIME.finditer(line):
+            hour, minute, meridiem, end_hour, end_minute, end_meridiem = match.groups()
+            # A bare number isn't a time, but it can start a range that ends in one
+            if not (minute or meridiem or end_minute or end_meridiem):
+                continue
+            end = _hour(end_hour, end_minute, end_meridiem) if end_hour else None
+            start = _hour(hour, minute, meridiem or end_meridiem)
+            if end and not meridiem and end_meridiem and start > end:
+                start = _hour(hour, minute, "a")
+            if any(value[0] > 23 or value[1] > 59 for value in filter(None, [start, end])):
+                continue
+            self._add(self.times, (start, end))
+            self._zone(line[match.end():])
+        location = _LOCATION.match(line)
+        if location:
+            self._add(self.locations, location[1].strip())
+        for link in _LINK.finditer(line):
+            self._add(self.links, link[0].rstrip(".,;:"))
+
+    def _zone(self, rest: str):
+        zone = _ZONE.match(rest)
+        if zone and self.time_zone is None:
+            self.time_zone = _ZONES[zone[1].lower()]
+
+
+def _hour(hour: str, minute: str | None, meridiem: str | None) -> tuple[int, int]:
+    """(hour, minute) on a 24 hour clock, from a 12 hour one when meridiem ("a" or "p") is given."""
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        hour = hour % 12 + (12 if meridiem.lower() == "p" else 0)
+    return hour, minute
+
+
+class _HtmlText(HTMLParser):
+    """The text of HTML fed to it in chunks, a line per block element, without scripts and styles."""
+    BLOCKS = {"p", "div", "br", "tr", "li", "h1", "h2", "h3", "h4", "h5", "h6", "table", "section"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._text: list[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag in self.BLOCKS:
+            self._text.append("\n")
+        if tag == "a":
+            # Meeting links are often only in the href
+            self._text.extend(f" {value} " for name, value in attrs if name == "href" and value and _LINK.match(value))
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self._skip = max(0, self._skip - 1)
+        elif tag in self.BLOCKS:
+            self._text.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._text.append(data)
+
+    def take(self) -> str:
+        text, self._text = "".join(self._text), []
+        return text
+
+
+def _decoded_chunks(data: str) -> Iterator[str]:
+    """Decodes base64url data into text a chunk at a time."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    data = data.rstrip("=")
+    for first in range(0, len(data), CHUNK_CHARS):
+        chunk = data[first:first + CHUNK_CHARS]
+        yield decoder.decode(base64.urlsafe_b64decode(chunk + "=" * (-len(chunk) % 4)))
+    yield decoder.decode(b"", final=True)
+
+
+def _text_part(payload: dict) -> tuple[str, str] | None:
+    """(mime type, data) of the message's text/plain part, or of its text/html part if it has no plain one."""
+    parts, found = [payload], {}
+    while parts:
+        part = parts.pop(0)
+        if part.get("mimeType") in ("text/plain", "text/html") and part.get("body", {}).get("data"):
+            found.setdefault(part["mimeType"], part["body"]["data"])
+        parts.extend(part.get("parts", []))
+    for mime_type in ("text/plain", "text/html"):
+        if mime_type in found:
+            return mime_type, found[mime_type]
+    return None
+
+
+def scan_text_part(scanner: EventScanner, mime_type: str, data: str):
+    """Feeds a base64url text part to the scanner, a chunk at a time."""
+    html = _HtmlText() if mime_type == "text/html" else None
+    for text in _decoded_chunks(data):
+        if html is not None:
+            html.feed(text)
+            text = html.take()
+        scanner.feed(text)
+        if scanner.done:
+            break
+    if html is not None:
+        html.close()
+        scanner.feed(html.take())
+    scanner.close()
+
+
+def list_message_ids(gmail_service, query: str, max_messages: int) -> list[str]:
+    """Ids of the newest messages matching a Gmail search query."""
+    ids: list[str] = []
+    page_token = None
+    while len(ids) < max_messages:
+        result = gmail_service.users().messages().list(userId="me", q=query, maxResults=min(500, max_messages - len(ids)),
+                                                       pageToken=page_token).execute()
+        ids.extend(message["id"] for message in result.get("messages", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            break
+    return ids[:max_messages]
+
+
+def _get_messages(gmail_service, message_ids: list[str], **kwargs) -> dict[str, dict]:
+    """The messages, fetched with messages.get(**kwargs) in batch requests, leaving out those that failed."""
+    messages: dict[str, dict] = {}
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            logging.warning(f"Could not fetch message {request_id}: {exception}")
+            return
+        messages[request_id] = response
+
+    for first in range(0, len(message_ids), MESSAGES_PER_BATCH):
+        batch = gmail_service.new_batch_http_request(callback=collect)
+        for message_id in message_ids[first:first + MESSAGES_PER_BATCH]:
+            batch.add(gmail_service.users().messages().get(userId="me", id=message_id, **kwargs), request_id=message_id)
+        batch.execute()
+    return messages
+
+
+def _header(message: dict, name: str) -> str:
+    return next((header["value"] for header in message.get("payload", {}).get("headers", []) if header["name"].lower() == name.lower()), "")
+
+
+def _candidate(message: dict, scanner: EventScanner, time_zone: ZoneInfo) -> dict:
+    """What was found in a message, with set_calendar_entry arguments when it gave a date and a time."""
+    subject, sender = _header(message, "Subject"), _header(message, "From")
+    snippet = message.get("snippet", "")[:SNIPPET_CHARS]
+    candidate = {
+        "message_id": message["id"],
+        "subject": subject,
+        "from": sender,
+        "received": to_isoformat(int(message.get("internalDate", 0)) // 1000, time_zone),
+        "dates": [date.isoformat() for date in scanner.dates],
+        "times": [f"{start[0]:02d}:{start[1]:02d}" + (f"-{end[0]:02d}:{end[1]:02d}" if end else "") for start, end in scanner.times],
+        "time_zone": scanner.time_zone,
+        "locations": scanner.locations,
+        "links": scanner.links,
+        "snippet": snippet,
+    }
+    if scanner.dates and scanner.times:
+        event_zone = ZoneInfo(scanner.time_zone) if scanner.time_zone else time_zone
+        (start_hour, start_minute), end = scanner.times[0]
+        start = local_to_epoch(scanner.dates[0], start_hour, event_zone) + start_minute * MINUTE
+        end_epoch = start + DEFAULT_DURATION_MINUTES * MINUTE
+        if end:
+            end_epoch = local_to_epoch(scanner.dates[0], end[0], event_zone) + end[1] * MINUTE
+            end_epoch += 24 * 60 * MINUTE if end_epoch <= start else 0
+        location = scanner.locations[0] if scanner.locations else scanner.links[0] if scanner.links else ""
+        candidate["set_calendar_entry"] = {
+            "summary": subject,
+            "location": location,
+            "description": "\n".join(filter(None, [f"From {sender}: {snippet}", *scanner.links, f"https://mail.google.com/mail/#all/{message['id']}"])),
+            "start_datetime_isoformat": to_isoformat(start, time_zone),
+            "end_datetime_isoformat": to_isoformat(end_epoch, time_zone),
+            "source_message_id": message["id"],
+        }
+    return candidate
+
+
+def scan_messages(gmail_service, message_ids: list[str], time_zone: ZoneInfo) -> dict[str, dict | None]:
+    """
+    The event candidate of each message, or None for messages without one, leaving out messages that couldn't be
+    fetched. Messages are fetched as metadata, and only those whose subject or snippet has a date, a time or an event
+    word are fetched again for their text.
+    """
+    metadata = _get_messages(gmail_service, message_ids, format="metadata", metadataHeaders=METADATA_HEADERS,
+                             fields="id,snippet,internalDate,payload/headers")
+    scanned: dict[str, dict | None] = {}
+    scanners: dict[str, EventScanner] = {}
+    for message_id in message_ids:
+        message = metadata.get(message_id)
+        if message is None:
+            continue
+        received = datetime.datetime.fromtimestamp(int(message.get("internalDate", 0)) / 1000, time_zone).date()
+        scanner = EventScanner(received)
+        scanner.feed(_header(message, "Subject") + "\n" + message.get("snippet", "") + "\n")
+        scanned[message_id] = None
+        if scanner.dates or scanner.times or _EVENT_WORDS.search(_header(message, "Subject") + " " + message.get("snippet", "")):
+            scanners[message_id] = scanner
+
+    bodies = _get_messages(gmail_service, list(scanners), format="full", fields=TEXT_PARTS_FIELDS)
+    for message_id, scanner in scanners.items():
+        part = _text_part(bodies.get(message_id, {}).get("payload", {}))
+        if part:
+            scan_text_part(scanner, *part)
+        if scanner.dates or scanner.times:
+            scanned[message_id] = _candidate(metadata[message_id], scanner, time_zone)
+    return scanned
+
+
+def find_event_candidates(gmail_service, query: str, max_messages: int, time_zone: ZoneInfo) -> list[dict]:
+    """Event candidates from the newest messages matching query, newest first."""
+    scanned = scan_messages(gmail_service, list_message_ids(gmail_service, query, max_messages), time_zone)
+    return [candidate for candidate in scanned.values() if candidate]
@@ -0,0 +1,196 @@
+"""
+Incremental scanning of the user's mail for events, with a per-user SQLite store.
+
+The first scan lists recent mail matching a query and remembers the
+mailbox's historyId from just before it. Later scans ask users.history.list for
+the messages added and deleted since then, so only new mail is fetched and
+scanned; history can't be searched, so new mail is picked by its metadata, as
+in gmail.scan_messages, rather than by the query. When Gmail no longer has history that far back (404), or there is more
+new mail than one scan reads, it falls back to a full scan again, bounded to the
+newest max_messages.
+
+Every scanned message is recorded with its candidate, if it had one, and the id
+of the event booked from it, so a message is scanned once and booked once:
+set_calendar_entry claims the message before creating the event and refuses a
+second booking. A claim left behind by a process that died while booking lapses
+after CLAIM_TIMEOUT_SECONDS. The stores live in GMAIL_SYNC_DIR, one file per user.
+"""
+import datetime
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+from googleapiclient.errors import HttpError
+
+from .gmail import list_message_ids, scan_messages
+from .time_utils import to_epoch
+
+DEFAULT_GMAIL_SYNC_DIR = os.path.join(tempfile.gettempdir(), "julian_gregory_gmail_sync")
+# Marks a message whose event is being created
+BOOKING = "booking"
+# A booking that hasn't finished in this long is taken to have died with its process
+CLAIM_TIMEOUT_SECONDS = 10 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync (id INTEGER PRIMARY KEY CHECK (id = 0), history_id TEXT, synced REAL);
+CREATE TABLE IF NOT EXISTS messages (message_id TEXT PRIMARY KEY, received INTEGER, candidate TEXT, event_id TEXT, claimed REAL);
+CREATE INDEX IF NOT EXISTS messages_received ON messages (received);
+"""
+
+
+def gmail_sync_path(user_id: str) -> str:
+    """The store file of a user, named by a hash of the user id so any id makes a safe file name."""
+    directory = os.environ.get("GMAIL_SYNC_DIR", DEFAULT_GMAIL_SYNC_DIR)
+    return os.path.join(directory, hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32] + ".sqlite3")
+
+
+class GmailSyncStore:
+    def __init__(self, path: str):
+        self.path = path
+        # One scan at a time per store
+        self.sync_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            if "claimed" not in {column[1] for column in connection.execute("PRAGMA table_info(messages)")}:
+                connection.execute("ALTER TABLE messages ADD COLUMN claimed REAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per call, as tools run on several threads
+        return sqlite3.connect(self.path, timeout=5)
+
+    def history_id(self) -> str | None:
+        with self._connect() as connection:
+            row = connection.execute("SELECT history_id FROM sync").fetchone()
+        return row[0] if row else None
+
+    def processed(self, message_ids: list[str]) -> set[str]:
+        """The messages among message_ids that were scanned before."""
+        with self._connect() as connection:
+            return {
+                message_id for message_id, in connection.execute(
+                    f"SELECT message_id FROM messages WHERE message_id IN ({', '.join('?' * len(message_ids))})", message_ids
+                )
+            }
+
+    def record(self, scanned: dict[str, dict | None], deleted: list[str], history_id: str | None):
+        """Stores scanned messages, forgets deleted ones that weren't booked, and moves the history id on, in one transaction."""
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO messages (message_id, received, candidate) VALUES (?, ?, ?)",
+                [(message_id, to_epoch(candidate["received"]) if candidate else None, json.dumps(candidate) if candidate else None)
+                 for message_id, candidate in scanned.items()],
+            )
+            connection.executemany("DELETE FROM messages WHERE message_id = ? AND event_id IS NULL", [(message_id,) for message_id in deleted])
+            if history_id:
+                connection.execute("INSERT OR REPLACE INTO sync (id, history_id, synced) VALUES (0, ?, ?)", (history_id, time.time()))
+
+    def candidates(self) -> list[dict]:
+        """Candidates not booked yet, from the newest message."""
+        with self._connect() as connection:
+            rows = connection.execute("SELECT candidate FROM messages WHERE candidate IS NOT NULL AND event_id IS NULL ORDER BY received DESC").fetchall()
+        return [json.loads(candidate) for candidate, in rows]
+
+    def booked_messages(self, message_ids: list[str]) -> set[str]:
+        """The messages among message_ids that an event was booked from, or is being booked from."""
+        with self._connect() as connection:
+            return {
+                message_id for message_id, in connection.execute(
+                    f"SELECT message_id FROM messages WHERE event_id IS NOT NULL AND message_id IN ({', '.join('?' * len(message_ids))})", message_ids
+                )
+            }
+
+    def claim(self, message_id: str) -> str | None:
+        """
+        Claims a message for booking. Returns None when the caller may book it, or else the id of the event already
+        booked from it, or BOOKING while another call is booking it. A claim older than CLAIM_TIMEOUT_SECONDS is
+        taken over.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute("INSERT OR IGNORE INTO messages (message_id) VALUES (?)", (message_id,))
+            if connection.execute(
+                "UPDATE messages SET event_id = ?, claimed = ? WHERE message_id = ? "
+                "AND (event_id IS NULL OR (event_id = ? AND coalesce(claimed, 0) < ?))",
+                (BOOKING, now, message_id, BOOKING, now - CLAIM_TIMEOUT_SECONDS),
+            ).rowcount:
+                return None
+            return connection.execute("SELECT event_id FROM messages WHERE message_id = ?", (message_id,)).fetchone()[0]
+
+    def booked(self, message_id: str, event_id: str | None):
+        """Records the event booked from a claimed message, or with None releases the claim after a failed booking."""
+        with self._connect() as connection:
+            connection.execute("UPDATE messages SET event_id = ? WHERE message_id = ?", (event_id, message_id))
+
+
+@functools.cache
+def get_gmail_sync_store(path: str) -> GmailSyncStore:
+    """Returns the process-wide store for a file, so concurrent tool calls share its sync lock."""
+    return GmailSyncStore(path)
+
+
+def _history(gmail_service, start_history_id: str) -> tuple[list[str], list[str], str] | None:
+    """
+    Ids of the messages added and deleted since start_history_id, oldest first, and the mailbox's latest history id,
+    or None when Gmail no longer has history that far back.
+    """
+    added: list[str] = []
+    deleted: list[str] = []
+    page_token = None
+    while True:
+        try:
+            result = gmail_service.users().history().list(
+                userId="me", startHistoryId=start_history_id, historyTypes=["messageAdded", "messageDeleted"], pageToken=page_token
+            ).execute()
+        except HttpError as e:
+            if e.resp.status == 404:
+                return None
+            raise
+        for record in result.get("history", []):
+            for change in record.get("messagesAdded", []):
+                # Mail the user wrote isn't about events they were invited to
+                if not {"SENT", "DRAFT"} & set(change["message"].get("labelIds", [])):
+                    added.append(change["message"]["id"])
+            deleted.extend(change["message"]["id"] for change in record.get("messagesDeleted", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return added, deleted, result["historyId"]
+
+
+def sync_candidates(store: GmailSyncStore, gmail_service, query: str, max_messages: int, time_zone: ZoneInfo) -> list[dict]:
+    """
+    Scans the mail that is new since the last scan, or the newest max_messages matching query on the first scan or
+    when history has expired, and returns the candidates not booked yet, newest first.
+    """
+    with store.sync_lock:
+        history_id = store.history_id()
+        changes = _history(gmail_service, history_id) if history_id else None
+        if changes is not None and len(set(changes[0])) > max_messages:
+            logging.info(f"{len(set(changes[0]))} new messages since the last scan, scanning the newest {max_messages} again")
+            changes = None
+        if changes is None:
+            # The history id from before listing, so mail arriving during the scan is picked up next time
+            latest = gmail_service.users().getProfile(userId="me").execute()["historyId"]
+            message_ids, deleted = list_message_ids(gmail_service, query, max_messages), []
+        else:
+            added, deleted, latest = changes[0], set(changes[1]), changes[2]
+            # Newest first, like a full scan, without the messages that were deleted again
+            message_ids = [message_id for message_id in dict.fromkeys(reversed(added)) if message_id not in deleted]
+        processed = store.processed(message_ids) if message_ids else set()
+        unprocessed = [message_id for message_id in message_ids if message_id not in processed]
+        scanned = scan_messages(gmail_service, unprocessed, time_zone)
+        if len(scanned) < len(unprocessed):
+            # Keep the history id, so the messages that couldn't be fetched are tried again
+            latest = None
+        store.record(scanned, list(deleted), latest)
+    today = datetime.datetime.now(time_zone).date().isoformat()
+    # Events that are over aren't worth proposing
+    return [candidate for candidate in store.candidates() if not candidate["dates"] or max(candidate["dates"]) >= today][:max_messages]
@@ -1,60 +1,159 @@
+import datetime
+import functools
+import json
 import os.path
+import tempfile
+import threading
 
+import requests
 from google.adk.tools.tool_context import ToolContext
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+from .app_utils.cassette import cassette_http
+from .app_utils.telemetry import TracedHttpRequest, traced_credentials_refresh
 from .scopes import SCOPES, AUTHORIZER_NAME
 
+# Token refreshes share one HTTP session so the connection to the OAuth endpoint is pooled
+refresh_session = requests.Session()
+# Local credentials are refreshed once they expire within this long, and used as they are until then
+REFRESH_BEFORE_EXPIRY_SECONDS = 5 * 60
+# Gemini Enterprise tokens whose Credentials are kept, one per user session
+CREDENTIALS_CACHE_SIZE = 1024
+TOKEN_PATH = "./token_and_creds/token.json"
+LOCAL_CREDENTIALS_PATH = "./token_and_creds/credentials_local.json"
+
+# The local credentials, loaded once and refreshed by one thread at a time
+_local_creds: Credentials | None = None
+_local_creds_lock = threading.Lock()
+
+
+def _needs_refresh(creds: Credentials) -> bool:
+    if not creds.token:
+        return True
+    if creds.expiry is None:
+        return False
+    # google-auth keeps expiry as a naive UTC datetime
+    now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+    return creds.expiry - datetime.timedelta(seconds=REFRESH_BEFORE_EXPIRY_SECONDS) <= now
+
+
+def _write_token(path: str, creds: Credentials):
+    """Writes the token file atomically, so a crash or another process never sees half a token."""
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".token-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as token:
+            token.write(creds.to_json())
+            token.flush()
+            os.fsync(token.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
 
 def get_local_creds():
     """
     Gets the Google API credentials
     This function is only executed when running locally. It should never be needed when running on Agent Engine
     There's a difference between Google CLoud auth tokens and GWS auth tokens, they're not interchangeable :(
+
+    The token file is read once per process. The credentials are refreshed shortly before they expire, by one thread
+    while the others wait for it, and only a refresh or a new login writes the file.
     """
-    token_path = "./token_and_creds/token.json"
-    local_credentials_json = "./token_and_creds/credentials_local.json"
+    global _local_creds
+    creds = _local_creds
+    if creds is not None and not _needs_refresh(creds):
+        return creds
 
-    creds = False
-    if os.path.exists(token_path):
-        creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+    with _local_creds_lock:
+        # Another thread may have refreshed them while this one waited
+        creds = _local_creds
+        if creds is not None and not _needs_refresh(creds):
+            return creds
+        if creds is None and os.path.exists(TOKEN_PATH):
+            creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
         # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(local_credentials_json, SCOPES)
-            creds = flow.run_local_server(port=0)
-            # Save the credentials for the next run
-        with open(token_path, "w") as token:
-            token.write(creds.to_json())
+        if not creds or _needs_refresh(creds):
+            if creds and creds.refresh_token:
+                with traced_credentials_refresh():
+                    creds.refresh(Request(session=refresh_session))
+            else:
+                # Only needed for the interactive local login, so keep it off the import path
+                from google_auth_oauthlib.flow import InstalledAppFlow
 
-    if not creds:
-        raise Exception("Unable to get Google Credentials")
+                flow = InstalledAppFlow.from_client_secrets_file(LOCAL_CREDENTIALS_PATH, SCOPES)
+                creds = flow.run_local_server(port=0)
+            # Save the credentials for the next run
+            _write_token(TOKEN_PATH, creds)
 
+        if not creds:
+            raise Exception("Unable to get Google Credentials")
+        _local_creds = creds
     return creds
 
+
+@functools.lru_cache(maxsize=CREDENTIALS_CACHE_SIZE)
+def _token_creds(oauth_token: str) -> Credentials:
+    """One Credentials per Gemini Enterprise token, reused by every tool call of the session."""
+    return Credentials(token=oauth_token)
+
+
 def get_creds(tool_context: ToolContext):
     """
     Returns the Credentials object for either Gemini Enterprise or Local Host execution
     """
     try:
         oauth_token = tool_context.state[AUTHORIZER_NAME]
-        creds = Credentials(token=oauth_token)
+        creds = _token_creds(oauth_token)
     except KeyError:  ## if the AUTHORIZER doesn't exists, then we're on a local machine testing
         creds = get_local_creds()
 
     return creds
 
+
+@functools.cache
+def get_discovery_document(service_name: str, version: str, root_url: str | None = None) -> dict:
+    """
+    Returns the parsed discovery document bundled with googleapiclient.
+    build() re-reads and re-parses the JSON on every call, so we parse it once per process instead.
+    If root_url is given, requests (including batches) are sent there instead of https://www.googleapis.com/
+    """
+    document = json.loads(discovery_cache.get_static_doc(service_name, version))
+    if root_url:
+        root_url = root_url.rstrip("/") + "/"
+        document["rootUrl"] = root_url
+        document["baseUrl"] = root_url + document["servicePath"]
+    return document
+
+
+def api_root_url(service_name: str) -> str | None:
+    """
+    Returns the root URL override for a service, e.g. CALENDAR_API_BASE_URL=http://localhost:8080 to use a fake server
+    """
+    return os.environ.get(f"{service_name.upper()}_API_BASE_URL")
+
+
+def build_service(service_name: str, version: str, creds):
+    """
+    Builds a Google API service from the cached discovery document, tracing every request.
+    With GOOGLE_API_CASSETTE set, requests are recorded to or replayed from that cassette file instead.
+    """
+    document = get_discovery_document(service_name, version, api_root_url(service_name))
+    http = cassette_http(creds)
+    if http is not None:
+        return build_from_document(document, http=http, requestBuilder=TracedHttpRequest)
+    return build_from_document(document, credentials=creds, requestBuilder=TracedHttpRequest)
+
+
 def get_calendar_service(tool_context: ToolContext):
     """
     Returns the Google Calendar service for API interaction
     """
     creds = get_creds(tool_context)
-    return build("calendar", "v3", credentials=creds)
+    return build_service("calendar", "v3", creds)
 
 
 def get_gmail_service(tool_context: ToolContext):
@@ -62,7 +161,8 @@ def get_gmail_service(tool_context: ToolContext):
     Returns the Google Gmail service for API interaction
     """
     creds = get_creds(tool_context)
-    return build("gmail", "v1", credentials=creds)
+    return build_service("gmail", "v1", creds)
+
 
 def get_user_info(tool_context: ToolContext)->dict:
     """
@@ -70,7 +170,7 @@ def get_user_info(tool_context: ToolContext)->dict:
     We infer the user from the token provided
     """
     creds = get_creds(tool_context)
-    user_info_service = build('oauth2','v2',credentials=creds)
+    user_info_service = build_service("oauth2", "v2", creds)
     user_info = user_info_service.userinfo().get().execute()
     return user_info
 
@@ -0,0 +1,309 @@
+"""
+Push notifications of calendar changes, through Calendar events.watch channels.
+
+With WATCH_WEBHOOK_URL set, search_events watches the user's calendars: a channel
+is opened per calendar, and Google then POSTs to that address whenever the
+calendar's events change. The WebhookReceiver behind it looks the channel up and
+marks the calendar dirty in the user's event index and in the freebusy cache, so
+the next search syncs it and the next freebusy query fetches it again, while
+calendars that haven't changed are served as they are for much longer than the
+polling interval allows.
+
+Channels expire (after WATCH_CHANNEL_TTL_SECONDS at most) and can't be extended,
+so a channel about to expire is replaced with a new one the next time the user's
+tools run, and the old one is stopped. Channels are renewed with the user's own
+credentials, so calendars of users who don't come back simply fall back to
+polling once their channels expire. Channels and their secret tokens are kept in
+a SQLite file at WATCH_CHANNELS_PATH, shared by the workers on one machine.
+
+Only one worker can bind WATCH_RECEIVER_PORT; the others skip the receiver. As a
+notification then only reaches one process, a "memory" freebusy cache would stay
+stale in every other worker, so with NUM_WORKERS above 1 the receiver switches
+FREEBUSY_CACHE_BACKEND to "sqlite", which the workers share.
+"""
+import dataclasses
+import functools
+import hmac
+import logging
+import os
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .event_index import event_index_path, get_event_index
+from .freebusy import DEFAULT_CACHE_BACKEND, busy_cache
+
+DEFAULT_CHANNELS_PATH = os.path.join(tempfile.gettempdir(), "julian_gregory_channels.sqlite3")
+# Google caps events.watch channels at a week or so
+DEFAULT_CHANNEL_TTL_SECONDS = 7 * 24 * 60 * 60
+# Channels expiring sooner than this are replaced
+RENEW_BEFORE_SECONDS = 24 * 60 * 60
+# Watched calendars are still synced this often, in case a notification was lost
+WATCHED_SYNC_INTERVAL_SECONDS = 60 * 60
+# Calendars whose channel couldn't be opened are tried again this often
+RETRY_WATCH_SECONDS = 60 * 60
+# A Calendar batch request takes at most 50 calls
+CHANNELS_PER_BATCH = 50
+
+
+@dataclasses.dataclass(frozen=True)
+class Channel:
+    channel_id: str
+    resource_id: str
+    token: str
+    user_id: str
+    # The calendar as the tools name it, e.g. "primary", and its real id, as freebusy names it
+    calendar_id: str
+    resolved_id: str
+    expiration: float
+
+
+class ChannelRegistry:
+    """Open channels in a SQLite file, so any worker's receiver can tell whose calendar a notification is about."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # (user, calendars, address) to when its channels next need checking and the calendars they watch, kept in
+        # memory so tool calls in between don't read the file
+        self._checked: dict[tuple[str, tuple[str, ...], str], tuple[float, frozenset[str]]] = {}
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS channels (channel_id TEXT PRIMARY KEY, resource_id TEXT, token TEXT, user_id TEXT, "
+                "calendar_id TEXT, resolved_id TEXT, expiration REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS channels_user ON channels (user_id, calendar_id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per call, as tools and the receiver run on several threads
+        return sqlite3.connect(self.path, timeout=5)
+
+    def add(self, channel: Channel):
+        with self._connect() as connection:
+            connection.execute("INSERT OR REPLACE INTO channels VALUES (?, ?, ?, ?, ?, ?, ?)", dataclasses.astuple(channel))
+            connection.execute("DELETE FROM channels WHERE expiration <= ?", (time.time(),))
+
+    def get(self, channel_id: str) -> Channel | None:
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM channels WHERE channel_id = ?", (channel_id,)).fetchone()
+        return Channel(*row) if row else None
+
+    def remove(self, channel_id: str):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM channels WHERE channel_id = ?", (channel_id,))
+
+    def live(self, user_id: str, now: float) -> dict[str, Channel]:
+        """The unexpired channel of each of the user's watched calendars, the latest expiring one if there are several."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT * FROM channels WHERE user_id = ? AND expiration > ? ORDER BY expiration", (user_id, now)
+            ).fetchall()
+        return {row[4]: Channel(*row) for row in rows}
+
+    def checked(self, key: tuple[str, tuple[str, ...], str], now: float) -> frozenset[str] | None:
+        """The calendars watched for key, or None once they need checking again."""
+        with self._lock:
+            entry = self._checked.get(key)
+        return entry[1] if entry and now < entry[0] else None
+
+    def remember(self, key: tuple[str, tuple[str, ...], str], check_after: float, watched: set[str]):
+        with self._lock:
+            self._checked[key] = (check_after, frozenset(watched))
+
+
+@functools.cache
+def get_channel_registry(path: str) -> ChannelRegistry:
+    """Returns the process-wide registry for a file."""
+    return ChannelRegistry(path)
+
+
+def channel_registry() -> ChannelRegistry:
+    """The registry at WATCH_CHANNELS_PATH."""
+    return get_channel_registry(os.environ.get("WATCH_CHANNELS_PATH", DEFAULT_CHANNELS_PATH))
+
+
+def watch_calendars(registry: ChannelRegistry, calendar_service, user_id: str, calendar_ids: list[str], address: str,
+                    now: float | None = None) -> set[str]:
+    """
+    Makes sure every calendar has a channel sending notifications to address, opening channels for calendars without
+    one and replacing those about to expire, in batch requests. Returns the calendars that are watched; calendars whose
+    channel couldn't be opened, e.g. because they don't support notifications, are left to polling and tried again
+    after RETRY_WATCH_SECONDS. Until a channel is due for renewal, the registry isn't read again.
+    """
+    now = time.time() if now is None else now
+    key = (user_id, tuple(calendar_ids), address)
+    checked = registry.checked(key, now)
+    if checked is not None:
+        return set(checked)
+    live = registry.live(user_id, now)
+    renew = [calendar_id for calendar_id in calendar_ids if calendar_id not in live or live[calendar_id].expiration - now < RENEW_BEFORE_SECONDS]
+    if not renew:
+        watched = set(calendar_ids)
+        registry.remember(key, min((live[calendar_id].expiration for calendar_id in watched), default=now) - RENEW_BEFORE_SECONDS, watched)
+        return watched
+
+    ttl = int(os.environ.get("WATCH_CHANNEL_TTL_SECONDS", DEFAULT_CHANNEL_TTL_SECONDS))
+    opened: dict[str, dict] = {}
+    # "primary" is watched under that name, but freebusy knows the calendar by its real id
+    resolved = {calendar_id: calendar_id for calendar_id in renew}
+    tokens = {calendar_id: secrets.token_urlsafe(32) for calendar_id in renew}
+
+    def collect(request_id, response, exception):
+        kind, _, calendar_id = request_id.partition(":")
+        if exception is not None:
+            logging.warning(f"Could not watch calendar {calendar_id}: {exception}")
+        elif kind == "watch":
+            opened[calendar_id] = response
+        else:
+            resolved[calendar_id] = response["id"]
+
+    requests = [
+        (f"watch:{calendar_id}", calendar_service.events().watch(calendarId=calendar_id, body={
+            "id": str(uuid.uuid4()),
+            "type": "web_hook",
+            "address": address,
+            "token": tokens[calendar_id],
+            "params": {"ttl": str(ttl)},
+        }))
+        for calendar_id in renew
+    ]
+    if "primary" in renew:
+        requests.append(("calendar:primary", calendar_service.calendars().get(calendarId="primary")))
+    for first in range(0, len(requests), CHANNELS_PER_BATCH):
+        batch = calendar_service.new_batch_http_request(callback=collect)
+        for request_id, request in requests[first:first + CHANNELS_PER_BATCH]:
+            batch.add(request, request_id=request_id)
+        batch.execute()
+
+    expirations = {calendar_id: channel.expiration for calendar_id, channel in live.items() if calendar_id in calendar_ids}
+    for calendar_id, response in opened.items():
+        expirations[calendar_id] = int(response["expiration"]) / 1000 if response.get("expiration") else now + ttl
+        registry.add(Channel(response["id"], response["resourceId"], tokens[calendar_id], user_id, calendar_id, resolved[calendar_id],
+                             expirations[calendar_id]))
+    _stop_channels(registry, calendar_service, [live[calendar_id] for calendar_id in opened if calendar_id in live])
+    check_after = min(expirations.values(), default=now) - RENEW_BEFORE_SECONDS
+    if len(expirations) < len(calendar_ids):
+        check_after = min(check_after, now + RETRY_WATCH_SECONDS)
+    registry.remember(key, check_after, set(expirations))
+    return set(expirations)
+
+
+def _stop_channels(registry: ChannelRegistry, calendar_service, channels: list[Channel]):
+    """Stops channels that were replaced; they are forgotten even if stopping fails, as they expire anyway."""
+    def collect(request_id, response, exception):
+        if exception is not None:
+            logging.warning(f"Could not stop channel {request_id}: {exception}")
+
+    for first in range(0, len(channels), CHANNELS_PER_BATCH):
+        batch = calendar_service.new_batch_http_request(callback=collect)
+        for channel in channels[first:first + CHANNELS_PER_BATCH]:
+            batch.add(calendar_service.channels().stop(body={"id": channel.channel_id, "resourceId": channel.resource_id}), request_id=channel.channel_id)
+        batch.execute()
+    for channel in channels:
+        registry.remove(channel.channel_id)
+
+
+def invalidate(channel: Channel):
+    """Marks the channel's calendar dirty in its user's event index and in the freebusy cache."""
+    path = event_index_path(channel.user_id)
+    if os.path.exists(path):
+        get_event_index(path).mark_dirty(channel.calendar_id)
+    cache = busy_cache()
+    if cache is not None:
+        cache.invalidate(channel.resolved_id)
+
+
+def handle_notification(registry: ChannelRegistry, headers) -> int:
+    """
+    Handles a notification's X-Goog-* headers and returns the HTTP status to answer with. Notifications of unknown
+    channels, or without the channel's token, are refused; the "sync" message sent when a channel opens changes nothing.
+    """
+    channel = registry.get(headers.get("X-Goog-Channel-ID", ""))
+    if channel is None or not hmac.compare_digest(channel.token, headers.get("X-Goog-Channel-Token", "")):
+        return 404
+    if headers.get("X-Goog-Resource-State") != "sync":
+        invalidate(channel)
+    return 200
+
+
+class WebhookReceiver:
+    """
+    An HTTP server for notifications, run on a background thread:
+
+        with WebhookReceiver(channel_registry(), port=8081) as receiver:
+            ...
+
+    It should sit behind the HTTPS address in WATCH_WEBHOOK_URL, as Google only delivers to HTTPS.
+    """
+
+    def __init__(self, registry: ChannelRegistry, host: str = "127.0.0.1", port: int = 0):
+        self.registry = registry
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/notifications"
+
+    def start(self) -> "WebhookReceiver":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="webhook-receiver", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def start_webhook_receiver() -> WebhookReceiver | None:
+    """
+    Starts a receiver on WATCH_RECEIVER_HOST:WATCH_RECEIVER_PORT when the port is set, or returns None when it isn't
+    or another worker already has the port. The receiver speaks plain HTTP to whatever reaches it, so it listens on
+    127.0.0.1 for the HTTPS proxy in front of it unless WATCH_RECEIVER_HOST says otherwise, e.g. 0.0.0.0.
+    """
+    port = os.environ.get("WATCH_RECEIVER_PORT")
+    if not port:
+        return None
+    backend = os.environ.get("FREEBUSY_CACHE_BACKEND", DEFAULT_CACHE_BACKEND).lower()
+    if int(os.environ.get("NUM_WORKERS", "1")) > 1 and backend not in ("sqlite", "none"):
+        logging.warning(f"FREEBUSY_CACHE_BACKEND {backend!r} can't be invalidated across workers, using sqlite")
+        os.environ["FREEBUSY_CACHE_BACKEND"] = "sqlite"
+    try:
+        receiver = WebhookReceiver(channel_registry(), os.environ.get("WATCH_RECEIVER_HOST", "127.0.0.1"), int(port))
+    except OSError as e:
+        logging.info(f"Webhook receiver not started, port {port} is taken, likely by another worker: {e}")
+        return None
+    return receiver.start()
+
+
+def _make_handler(receiver: WebhookReceiver):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                status = handle_notification(receiver.registry, self.headers)
+            except Exception:
+                logging.exception("Could not handle a calendar notification")
+                status = 500
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
@@ -0,0 +1,90 @@
+"""
+Weekly availability bitmasks for finding recurring slots.
+
+A week is a grid of CELL_MINUTES cells over the business hours of Monday to
+Friday, with bit weekday * cells_per_day + cell for each cell. Busy time sets
+bits; a start is free in a week when all the cells its meeting covers are
+clear, so free starts of several attendees and weeks combine with & and |.
+Cells are counted from each day's local business-hours start, so a weekly
+slot keeps its wall-clock time across DST changes, as recurring events do.
+"""
+import bisect
+import dataclasses
+import datetime
+
+from .time_utils import MINUTE, local_to_epoch
+
+CELL_MINUTES = 15
+# Meetings start on the half hour, like the other slot tools
+START_EVERY_MINUTES = 30
+WEEKDAYS = 5
+WEEKDAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+
+
+@dataclasses.dataclass(frozen=True)
+class WeekGrid:
+    business_hours_start: int
+    business_hours_end: int
+
+    @property
+    def cells_per_day(self) -> int:
+        return (self.business_hours_end - self.business_hours_start) * 60 // CELL_MINUTES
+
+    def busy_mask(self, intervals: list[tuple[int, int]], week_start: datetime.date, time_zone: datetime.tzinfo) -> int:
+        """The cells of the 7 days from week_start that overlap the merged, sorted busy intervals (epoch seconds)."""
+        cells = self.cells_per_day
+        cell_seconds = CELL_MINUTES * MINUTE
+        ends = [end for _, end in intervals]
+        mask = 0
+        for day_offset in range(7):
+            date = week_start + datetime.timedelta(days=day_offset)
+            weekday = date.weekday()
+            if weekday >= WEEKDAYS:
+                continue
+            day_start = local_to_epoch(date, self.business_hours_start, time_zone)
+            day_end = local_to_epoch(date, self.business_hours_end, time_zone)
+            index = bisect.bisect_right(ends, day_start)
+            while index < len(intervals) and intervals[index][0] < day_end:
+                start, end = intervals[index]
+                first = max(0, (start - day_start) // cell_seconds)
+                last = min(cells, -(-(end - day_start) // cell_seconds))
+                mask |= ((1 << (last - first)) - 1) << (weekday * cells + first)
+                index += 1
+        return mask
+
+    def free_starts(self, busy_mask: int, slot_duration_minutes: int) -> int:
+        """The cells where a meeting of slot_duration_minutes can start without touching a busy cell or running past business hours."""
+        cells = self.cells_per_day
+        length = -(-slot_duration_minutes // CELL_MINUTES)
+        if length > cells:
+            return 0
+        free = ~busy_mask & ((1 << (cells * WEEKDAYS)) - 1)
+        starts = free
+        for offset in range(1, length):
+            starts &= free >> offset
+        return starts & self._start_cells(length)
+
+    def _start_cells(self, length: int) -> int:
+        step = START_EVERY_MINUTES // CELL_MINUTES
+        day = sum(1 << cell for cell in range(0, self.cells_per_day - length + 1, step))
+        return sum(day << (weekday * self.cells_per_day) for weekday in range(WEEKDAYS))
+
+    def occurrence(self, bit: int, week_start: datetime.date, time_zone: datetime.tzinfo) -> tuple[datetime.date, int]:
+        """The date and start (epoch seconds) of a start cell in the week beginning week_start."""
+        weekday, cell = divmod(bit, self.cells_per_day)
+        date = week_start + datetime.timedelta(days=(weekday - week_start.weekday()) % 7)
+        return date, local_to_epoch(date, self.business_hours_start, time_zone) + cell * CELL_MINUTES * MINUTE
+
+    def wall_time(self, bit: int, after_minutes: int = 0) -> tuple[int, str]:
+        """The weekday (0 is Monday) and HH:MM of a start cell, or of after_minutes later."""
+        weekday, cell = divmod(bit, self.cells_per_day)
+        minutes = self.business_hours_start * 60 + cell * CELL_MINUTES + after_minutes
+        return weekday, f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def bits(mask: int):
+    """Indexes of the set bits, lowest first."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
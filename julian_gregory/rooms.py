@@ -0,0 +1,80 @@
+"""
+Meeting room lookup: a locally cached resource directory and a room-by-slot availability matrix.
+
+The directory is a JSON file holding the `items` of the Admin SDK
+`resources.calendars.list` response (resourceEmail, resourceName, capacity,
+buildingId, floorName, resourceCategory), either as that list or as the whole
+response. It is read from ROOM_DIRECTORY_PATH and reloaded when the file changes.
+"""
+import functools
+import json
+import logging
+import os
+
+DEFAULT_ROOM_DIRECTORY_PATH = "room_directory.json"
+
+
+def room_directory_path() -> str:
+    return os.environ.get("ROOM_DIRECTORY_PATH", DEFAULT_ROOM_DIRECTORY_PATH)
+
+
+@functools.lru_cache(maxsize=4)
+def _read_directory(path: str, mtime_ns: int) -> tuple[dict, ...]:
+    with open(path) as f:
+        directory = json.load(f)
+    items = directory.get("items", []) if isinstance(directory, dict) else directory
+    return tuple(item for item in items if item.get("resourceEmail") and item.get("resourceCategory", "CONFERENCE_ROOM") == "CONFERENCE_ROOM")
+
+
+def load_room_directory(path: str | None = None) -> tuple[dict, ...]:
+    """The conference rooms of the directory, or () if there is no directory file."""
+    path = path or room_directory_path()
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        logging.warning(f"No room directory at {path}")
+        return ()
+    return _read_directory(path, mtime_ns)
+
+
+def filter_rooms(rooms: tuple[dict, ...], min_capacity: int = 1, building: str | None = None) -> list[dict]:
+    """Rooms seating at least min_capacity, in a building whose id contains `building` (case-insensitive), smallest first."""
+    building = building.lower() if building else None
+    matching = [
+        room for room in rooms
+        if room.get("capacity", 0) >= min_capacity and (building is None or building in room.get("buildingId", "").lower())
+    ]
+    return sorted(matching, key=lambda room: (room.get("capacity", 0), room.get("resourceName", "")))
+
+
+def availability_matrix(slots: list[tuple[int, int]], busy: list[list[tuple[int, int]] | None]) -> list[int]:
+    """
+    One bitmask per slot with bit r set when calendar r is free for the whole slot.
+    Each calendar's busy intervals are swept once against the slots in start order; unreadable calendars are never free.
+    """
+    order = sorted(range(len(slots)), key=lambda index: slots[index])
+    all_slots = (1 << len(slots)) - 1
+    busy_masks = []
+    for intervals in busy:
+        if intervals is None:
+            busy_masks.append(all_slots)
+            continue
+        mask = 0
+        first = 0
+        for index in order:
+            start, end = slots[index]
+            # Intervals ending before this slot starts also end before every later slot starts
+            while first < len(intervals) and intervals[first][1] <= start:
+                first += 1
+            if first < len(intervals) and intervals[first][0] < end:
+                mask |= 1 << index
+        busy_masks.append(mask)
+
+    free = [0] * len(slots)
+    for room, mask in enumerate(busy_masks):
+        free_slots = all_slots & ~mask
+        while free_slots:
+            lowest = free_slots & -free_slots
+            free[lowest.bit_length() - 1] |= 1 << room
+            free_slots ^= lowest
+    return free
@@ -0,0 +1,112 @@
+"""
+Backtracking solver for scheduling a set of related meetings at once.
+
+Each meeting comes with its candidate starts (epoch seconds, sorted), already
+free for its attendees. The solver places the meetings in an order that puts
+every meeting after the ones it must follow, trying the earliest start that
+keeps the meeting clear of the meetings already placed for the same attendees
+and the required gap after its predecessors. When a meeting has no start left,
+it backtracks to the previous meeting's next start. If no schedule fits
+everything, the meetings that don't fit are left out greedily instead.
+"""
+import bisect
+import dataclasses
+
+# The most starts tried before falling back to a greedy partial schedule
+SEARCH_STEP_LIMIT = 200_000
+
+
+@dataclasses.dataclass(frozen=True)
+class Meeting:
+    attendees: frozenset[str]
+    duration: int
+    candidates: tuple[int, ...]
+    after: tuple[int, ...] = ()
+    min_gap: int = 0
+
+
+class _SearchLimit(Exception):
+    pass
+
+
+def placement_order(meetings: list[Meeting]) -> list[int]:
+    """
+    Meeting indexes with every meeting after the ones it must follow, the most constrained (fewest candidates) first
+    among those ready. Raises ValueError for unknown or circular `after` references.
+    """
+    for meeting in meetings:
+        if any(not 0 <= before < len(meetings) for before in meeting.after):
+            raise ValueError(f"Unknown meeting in after={list(meeting.after)}")
+    placed: set[int] = set()
+    order = []
+    while len(order) < len(meetings):
+        ready = [index for index, meeting in enumerate(meetings) if index not in placed and placed.issuperset(meeting.after)]
+        if not ready:
+            raise ValueError("The meetings' after constraints are circular")
+        index = min(ready, key=lambda index: (len(meetings[index].candidates), index))
+        order.append(index)
+        placed.add(index)
+    return order
+
+
+def _fits(meetings: list[Meeting], conflicts: list[list[int]], starts: list[int | None], index: int, candidate: int) -> bool:
+    end = candidate + meetings[index].duration
+    return not any(starts[other] is not None and starts[other] < end and candidate < starts[other] + meetings[other].duration
+                   for other in conflicts[index])
+
+
+def _earliest(meetings: list[Meeting], starts: list[int | None], index: int) -> int | None:
+    """The earliest start the after constraints allow, or None while a meeting it follows has no start."""
+    meeting = meetings[index]
+    if any(starts[before] is None for before in meeting.after):
+        return None
+    return max((starts[before] + meetings[before].duration + meeting.min_gap for before in meeting.after), default=0)
+
+
+def solve(meetings: list[Meeting], max_steps: int = SEARCH_STEP_LIMIT) -> list[int | None]:
+    """
+    A start for every meeting, or if there is none within max_steps, a schedule that leaves out the meetings that
+    don't fit when placed in turn (and the ones that must follow them), with None for their starts.
+    """
+    order = placement_order(meetings)
+    # Pairs of meetings that share an attendee can't overlap
+    conflicts = [
+        [other for other in range(len(meetings)) if other != index and meeting.attendees & meetings[other].attendees]
+        for index, meeting in enumerate(meetings)
+    ]
+    starts: list[int | None] = [None] * len(meetings)
+    steps = 0
+
+    def place(position: int) -> bool:
+        nonlocal steps
+        if position == len(order):
+            return True
+        index = order[position]
+        candidates = meetings[index].candidates
+        for candidate in candidates[bisect.bisect_left(candidates, _earliest(meetings, starts, index)):]:
+            steps += 1
+            if steps > max_steps:
+                raise _SearchLimit
+            if not _fits(meetings, conflicts, starts, index, candidate):
+                continue
+            starts[index] = candidate
+            if place(position + 1):
+                return True
+            starts[index] = None
+        return False
+
+    try:
+        if place(0):
+            return starts
+    except _SearchLimit:
+        pass
+
+    starts = [None] * len(meetings)
+    for index in order:
+        earliest = _earliest(meetings, starts, index)
+        if earliest is None:
+            continue
+        candidates = meetings[index].candidates
+        starts[index] = next((candidate for candidate in candidates[bisect.bisect_left(candidates, earliest):]
+                              if _fits(meetings, conflicts, starts, index, candidate)), None)
+    return starts
@@ -0,0 +1,48 @@
+"""
+Integer epoch-second times for the slot tools.
+
+Calendar API timestamps are parsed once into epoch seconds, slot arithmetic
+and overlap checks run on ints, and datetimes are only built again for the
+strings a tool returns. Parsing and formatting are cached, because the same
+busy periods and slot boundaries come back on every call.
+"""
+import datetime
+import functools
+
+MINUTE = 60
+
+
+@functools.lru_cache(maxsize=16384)
+def to_epoch(value: str, time_zone: datetime.tzinfo = datetime.timezone.utc) -> int:
+    """Epoch seconds of an RFC 3339 / ISO-8601 timestamp, reading timestamps without an offset in time_zone."""
+    parsed = datetime.datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=time_zone)
+    return int(parsed.timestamp())
+
+
+@functools.lru_cache(maxsize=4096)
+def local_to_epoch(date: datetime.date, hour: int, time_zone: datetime.tzinfo) -> int:
+    """Epoch seconds of a wall-clock hour on a date in time_zone.
+
+    A wall time skipped by a DST change is shifted forward by the gap, and a
+    repeated one resolves to its first occurrence.
+    """
+    return int(datetime.datetime(date.year, date.month, date.day, hour, tzinfo=time_zone).timestamp())
+
+
+@functools.lru_cache(maxsize=16384)
+def to_isoformat(epoch: int, time_zone: datetime.tzinfo) -> str:
+    """ISO-8601 string of an epoch second in time_zone, with the UTC offset in effect at that instant."""
+    return datetime.datetime.fromtimestamp(epoch, time_zone).isoformat()
+
+
+def merge_intervals(intervals: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Sort and merge overlapping (start, end) intervals, dropping empty ones."""
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(interval for interval in intervals if interval[1] > interval[0]):
+        if merged and start < merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
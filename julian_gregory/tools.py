@@ -1,7 +1,47 @@
 from google.adk.tools.tool_context import ToolContext
+import bisect
+import dataclasses
 import datetime
+import functools
+import hashlib
+import heapq
+import logging
+import operator
+import os
+import time
 from zoneinfo import ZoneInfo
-from .helper_funcs import get_calendar_service, get_user_info
+from googleapiclient.errors import HttpError
+from .app_utils.telemetry import traced_tool
+from .event_index import DEFAULT_SYNC_INTERVAL_SECONDS, event_index_path, get_event_index, sync
+from .gmail import find_event_candidates
+from .gmail_sync import BOOKING, get_gmail_sync_store, gmail_sync_path, sync_candidates
+from .helper_funcs import get_calendar_service, get_gmail_service, get_user_info
+from .freebusy import busy_cache, query_busy
+from .notifications import WATCHED_SYNC_INTERVAL_SECONDS, channel_registry, watch_calendars
+from .recurring import WEEKDAY_NAMES, WeekGrid, bits
+from .rooms import availability_matrix, filter_rooms, load_room_directory
+from .scheduler import Meeting, solve
+from .time_utils import MINUTE, local_to_epoch, merge_intervals, to_epoch, to_isoformat
+from .working_hours import WorkingHours, fetch_time_zones, intersect_windows
+
+# Kept in user state so the calendars in use carry over between sessions
+CALENDARS_STATE_KEY = "user:calendars"
+# Calendars the user can write to hold their own commitments; read-only ones are other people's or subscriptions
+OWN_CALENDAR_ROLES = ("owner", "writer")
+# How long a discovered calendar list is used before calendarList is read again; a choice made with select_calendars doesn't expire
+CALENDAR_LIST_TTL_SECONDS = 6 * 60 * 60
+# Working hours the user told us for attendees, by email; kept until they are given again
+WORKING_HOURS_STATE_KEY = "user:working_hours"
+# Attendee time zones read from their calendars, by email, with None for calendars we can't read
+ATTENDEE_TIME_ZONES_STATE_KEY = "user:attendee_time_zones"
+ATTENDEE_TIME_ZONE_TTL_SECONDS = 24 * 60 * 60
+# Google's regional holiday calendars, e.g. en.usa#holiday@group.v.calendar.google.com
+HOLIDAY_CALENDAR_SUFFIX = "#holiday@group.v.calendar.google.com"
+# A Calendar batch request takes at most 50 calls
+EVENTS_PER_BATCH = 50
+# Recent mail that is likely about something to attend; {a b} matches either word
+EVENT_EMAIL_QUERY = ("newer_than:30d -category:promotions "
+                     "{training webinar workshop course class seminar conference invitation appointment reservation booking registration}")
 
 
 def _get_calendar_and_time_info(tool_context: ToolContext):
@@ -13,13 +53,146 @@ def _get_calendar_and_time_info(tool_context: ToolContext):
     return calendar_service, time_zone, now
 
 
+def _list_calendars(calendar_service) -> list[dict]:
+    """All entries of the user's calendar list."""
+    calendars = []
+    page_token = None
+    while True:
+        result = calendar_service.calendarList().list(pageToken=page_token).execute()
+        calendars.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return calendars
+
+
+def _get_calendar_ids(tool_context: ToolContext, calendar_service) -> list[str]:
+    """
+    The calendars whose events are the user's, primary first.
+    Unless the user picked them with select_calendars, these are the primary calendar and the calendars shown in
+    the user's calendar list that they own or can write to.
+    """
+    cached = tool_context.state.get(CALENDARS_STATE_KEY)
+    if cached and (cached["chosen"] or time.time() - cached["updated"] < CALENDAR_LIST_TTL_SECONDS):
+        return cached["ids"]
+
+    calendar_ids = ["primary"]
+    for calendar in _list_calendars(calendar_service):
+        if calendar.get("primary") or calendar.get("deleted") or calendar.get("hidden"):
+            continue
+        if calendar.get("selected") and calendar.get("accessRole") in OWN_CALENDAR_ROLES:
+            calendar_ids.append(calendar["id"])
+    tool_context.state[CALENDARS_STATE_KEY] = {"ids": calendar_ids, "chosen": False, "updated": time.time()}
+    return calendar_ids
+
+
+def _event_start(event: dict, time_zone: ZoneInfo) -> int:
+    start = event.get('start', {})
+    return to_epoch(start.get('dateTime') or start['date'], time_zone)
+
+
+def _busy_interval(event: dict, time_zone: ZoneInfo) -> tuple[int, int] | None:
+    """
+    The time an event blocks, in epoch seconds, or None when it leaves the user free: cancelled, shown as free
+    (transparent), a working location, or declined by the user. All-day events block whole days in time_zone.
+    Out-of-office time always blocks, and so do public holidays from a holiday calendar, which are shown as free.
+    """
+    if event.get("status") == "cancelled" or event.get("eventType") == "workingLocation":
+        return None
+    if any(attendee.get("self") and attendee.get("responseStatus") == "declined" for attendee in event.get("attendees", [])):
+        return None
+    is_public_holiday = event.get("calendarId", "").endswith(HOLIDAY_CALENDAR_SUFFIX) and not event.get("description", "").startswith("Observance")
+    if event.get("transparency") == "transparent" and event.get("eventType") != "outOfOffice" and not is_public_holiday:
+        return None
+    start, end = event.get("start", {}), event.get("end", {})
+    if not (start.get("dateTime") or start.get("date")) or not (end.get("dateTime") or end.get("date")):
+        return None
+    return to_epoch(start.get("dateTime") or start["date"], time_zone), to_epoch(end.get("dateTime") or end["date"], time_zone)
+
+
+def _invalidate_busy(events: list[dict]):
+    """
+    Drops the cached busy time of the organizers and attendees of events that were just created or changed, so the
+    slot tools don't offer their new time as free until the cache expires.
+    """
+    cache = busy_cache()
+    if cache is None:
+        return
+    calendar_ids = set()
+    for event in events:
+        calendar_ids.add(event.get("organizer", {}).get("email"))
+        calendar_ids.update(attendee.get("email") for attendee in event.get("attendees", []))
+    for calendar_id in calendar_ids - {None}:
+        cache.invalidate(calendar_id)
+
+
+def _list_events(calendar_service, calendar_ids: list[str], time_zone: ZoneInfo, time_min: str, time_max: str) -> list[dict]:
+    """
+    Events of all calendars between time_min and time_max, ordered by start time.
+    Every calendar's pages are fetched in one batch request per round, and the sorted results are merged.
+    Each event gets a calendarId; an event on several calendars (e.g. an invite copied to a team calendar) is kept once.
+    """
+    def request(calendar_id, page_token=None):
+        return calendar_service.events().list(
+            calendarId=calendar_id,
+            timeMin=time_min,
+            timeMax=time_max,
+            singleEvents=True,
+            orderBy='startTime',
+            pageToken=page_token,
+        )
+
+    events_by_calendar = {calendar_id: [] for calendar_id in calendar_ids}
+    if len(calendar_ids) == 1:
+        page_token = None
+        while True:
+            result = request(calendar_ids[0], page_token).execute()
+            events_by_calendar[calendar_ids[0]].extend(result.get("items", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                break
+    else:
+        pending = {calendar_id: None for calendar_id in calendar_ids}
+        while pending:
+            next_pages = {}
+
+            def collect(calendar_id, response, exception):
+                if exception is not None:
+                    # A calendar that was removed or unshared shouldn't hide the others
+                    logging.warning(f"Could not list events of calendar {calendar_id}: {exception}")
+                    return
+                events_by_calendar[calendar_id].extend(response.get("items", []))
+                if response.get("nextPageToken"):
+                    next_pages[calendar_id] = response["nextPageToken"]
+
+            batch = calendar_service.new_batch_http_request(callback=collect)
+            for calendar_id, page_token in pending.items():
+                batch.add(request(calendar_id, page_token), request_id=calendar_id)
+            batch.execute()
+            pending = next_pages
+
+    for calendar_id, events in events_by_calendar.items():
+        for event in events:
+            event["calendarId"] = calendar_id
+    merged = heapq.merge(*events_by_calendar.values(), key=lambda event: _event_start(event, time_zone))
+
+    seen = set()
+    events = []
+    for event in merged:
+        key = (event.get("iCalUID", event["id"]), _event_start(event, time_zone))
+        if key not in seen:
+            seen.add(key)
+            events.append(event)
+    return events
+
+
+@traced_tool
 def get_upcoming_events(tool_context: ToolContext, time_delta_in_days: int=7) -> list[dict]:
     """
     Returns all events from now until time_delta_in_days into the future
     Args:
         time_delta_in_days: The number of days to look into the future
     returns
-        events: List of Dicts of the events
+        events: List of Dicts of the events, each with the calendarId of the calendar it is on
     """
     calendar_service, time_zone, now = _get_calendar_and_time_info(tool_context)
     start_of_today = datetime.datetime(now.year, now.month, now.day, 0, 0, 0, tzinfo=time_zone)
@@ -28,26 +201,20 @@ def get_upcoming_events(tool_context: ToolContext, time_delta_in_days: int=7) ->
     time_min = now.isoformat()
     time_max = end_time.isoformat()
 
-    events_result = calendar_service.events().list(
-        calendarId='primary',
-        timeMin=time_min,
-        timeMax=time_max,
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute()
-
-    events = events_result.get("items", [])
+    calendar_ids = _get_calendar_ids(tool_context, calendar_service)
+    events = _list_events(calendar_service, calendar_ids, time_zone, time_min, time_max)
 
     return events
 
 
+@traced_tool
 def get_todays_events(tool_context: ToolContext) -> list[dict]:
     """
     Gets a list of events for today. 
     Today is inferred between the system time and timeZone set on the calendar.
 
     returns:
-        events: List of Dicts of the events
+        events: List of Dicts of the events, each with the calendarId of the calendar it is on
     """
 
     calendar_service, time_zone, now = _get_calendar_and_time_info(tool_context)
@@ -58,26 +225,20 @@ def get_todays_events(tool_context: ToolContext) -> list[dict]:
     time_min = start_of_today.isoformat()
     time_max = start_of_tomorrow.isoformat()
 
-    events_result = calendar_service.events().list(
-        calendarId='primary',
-        timeMin=time_min,
-        timeMax=time_max,
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute()
-
-    events = events_result.get("items", [])
+    calendar_ids = _get_calendar_ids(tool_context, calendar_service)
+    events = _list_events(calendar_service, calendar_ids, time_zone, time_min, time_max)
 
     return events
 
 
+@traced_tool
 def get_weeks_events(tool_context: ToolContext) -> list[dict]:
     """
     Gets a list of events for the week. 
     The week is inferred between the system time and timeZone set on the calendar.
 
     returns:
-        events: List of Dicts of the events
+        events: List of Dicts of the events, each with the calendarId of the calendar it is on
     """
 
     calendar_service, time_zone, now = _get_calendar_and_time_info(tool_context)
@@ -88,174 +249,207 @@ def get_weeks_events(tool_context: ToolContext) -> list[dict]:
     time_min = start_of_today.isoformat()
     time_max = (start_of_today + datetime.timedelta(days=days_until_end_of_week)).isoformat()
 
-    events_result = calendar_service.events().list(
-        calendarId='primary',
-        timeMin=time_min,
-        timeMax=time_max,
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute()
-
-    events = events_result.get("items", [])
+    calendar_ids = _get_calendar_ids(tool_context, calendar_service)
+    events = _list_events(calendar_service, calendar_ids, time_zone, time_min, time_max)
 
     return events
 
 
-def find_free_slots(tool_context: ToolContext, slot_duration_minutes: int = 60, time_delta_in_days: int = 14, business_hours_start: int = 8, business_hours_end: int = 17) -> list[dict]:
-    """
-    Finds all free time slots of a given duration in the next specified number of days during business hours.
-    Business hours are Monday to Friday.
+@traced_tool
+def list_calendars(tool_context: ToolContext) -> list[dict]:
     """
-    _, time_zone, now = _get_calendar_and_time_info(tool_context)
-    
-    events = get_upcoming_events(tool_context, time_delta_in_days=time_delta_in_days)
-    
-    def parse_datetime_from_event(event_time_dict):
-        dt_str = event_time_dict.get('dateTime')
-        if dt_str:
-            return datetime.datetime.fromisoformat(dt_str)
-        return None
+    Lists the user's calendars, and whether each one is used when looking at the user's events and free time.
 
-    busy_intervals = []
-    for event in events:
-        start = parse_datetime_from_event(event.get('start', {}))
-        end = parse_datetime_from_event(event.get('end', {}))
-        if start and end:
-            busy_intervals.append((start.astimezone(time_zone), end.astimezone(time_zone)))
+    returns:
+        calendars: List of Dicts with the id, summary, accessRole, primary and in_use of each calendar
+    """
+    calendar_service = get_calendar_service(tool_context)
+    calendar_ids = _get_calendar_ids(tool_context, calendar_service)
+    return [
+        {
+            "id": calendar["id"],
+            "summary": calendar.get("summaryOverride", calendar.get("summary")),
+            "accessRole": calendar.get("accessRole"),
+            "primary": calendar.get("primary", False),
+            "in_use": calendar.get("primary", False) or calendar["id"] in calendar_ids,
+        }
+        for calendar in _list_calendars(calendar_service)
+    ]
+
+
+@traced_tool
+def select_calendars(tool_context: ToolContext, calendar_ids: list[str]) -> dict:
+    """
+    Chooses which calendars are used, besides the primary one, when looking at the user's events and free time.
+    The choice is remembered for the user. Pass an empty list to go back to the calendars the user owns or can edit.
 
-    # Sort intervals by start time
-    busy_intervals.sort()
+    Args:
+        calendar_ids: Ids of the calendars to use, from list_calendars
+    returns:
+        in_use: The calendars now in use
+        unknown: Ids that are not in the user's calendar list and were ignored
+    """
+    calendar_service = get_calendar_service(tool_context)
+    if not calendar_ids:
+        tool_context.state[CALENDARS_STATE_KEY] = None
+        return {"in_use": _get_calendar_ids(tool_context, calendar_service), "unknown": []}
 
-    # Merge overlapping intervals
-    # The result is a clean list of non-overlapping intervals representing all the busy periods.
-    if not busy_intervals:
-        merged_busy_intervals = []
-    else:
-        merged_busy_intervals = [busy_intervals[0]]
-        for current_start, current_end in busy_intervals[1:]:
-            last_start, last_end = merged_busy_intervals[-1]
-            if current_start < last_end:
-                merged_busy_intervals[-1] = (last_start, max(last_end, current_end))
-            else:
-                merged_busy_intervals.append((current_start, current_end))
+    calendars = _list_calendars(calendar_service)
+    primary_ids = {calendar["id"] for calendar in calendars if calendar.get("primary")}
+    known_ids = {calendar["id"] for calendar in calendars}
+    in_use = ["primary"] + [calendar_id for calendar_id in dict.fromkeys(calendar_ids)
+                            if calendar_id in known_ids and calendar_id not in primary_ids]
+    tool_context.state[CALENDARS_STATE_KEY] = {"ids": in_use, "chosen": True, "updated": time.time()}
+    return {"in_use": in_use, "unknown": [calendar_id for calendar_id in calendar_ids if calendar_id not in known_ids and calendar_id != "primary"]}
 
-    free_slots = []
-    slot_duration = datetime.timedelta(minutes=slot_duration_minutes)
-    increment = datetime.timedelta(minutes=30) # Check for a new slot every 30 minutes
-    
-    start_date = (now + datetime.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
 
-    for day_offset in range(time_delta_in_days):
-        current_day = start_date + datetime.timedelta(days=day_offset)
+def _search_range(time_zone: ZoneInfo, now: datetime.datetime, time_delta_in_days: int) -> tuple[int, int]:
+    """From the start of tomorrow to the end of the time_delta_in_days days after it, in epoch seconds."""
+    start_date = now.date() + datetime.timedelta(days=1)
+    return local_to_epoch(start_date, 0, time_zone), local_to_epoch(start_date + datetime.timedelta(days=time_delta_in_days), 0, time_zone)
 
-        if current_day.weekday() >= 5:  # Skip weekends
-            continue
-        
-        day_start = current_day.replace(hour=business_hours_start, minute=0, second=0, microsecond=0)
-        day_end = current_day.replace(hour=business_hours_end, minute=0, second=0, microsecond=0)
 
-        potential_slot_start = day_start
-        while potential_slot_start + slot_duration <= day_end:
+def _free_slot_starts(busy_intervals: list[tuple[int, int]], windows: list[tuple[int, int]], time_zone: ZoneInfo, slot_duration_minutes: int) -> list[int]:
+    """
+    Starts (epoch seconds) of the free slots within the working windows, on the half hour of time_zone.
+    """
+    # The result is a clean list of non-overlapping intervals representing all the busy periods.
+    merged_busy_intervals = merge_intervals(busy_intervals)
+    busy_ends = [end for _, end in merged_busy_intervals]
+
+    free_starts = []
+    slot_duration = slot_duration_minutes * MINUTE
+    increment = 30 * MINUTE # Check for a new slot every 30 minutes
+
+    for window_start, window_end in windows:
+        # Round up to the next half hour on the organizer's clock, as another attendee's day may start at a quarter past
+        offset = int(datetime.datetime.fromtimestamp(window_start, time_zone).utcoffset().total_seconds())
+        potential_slot_start = -(-(window_start + offset) // increment) * increment - offset
+        while potential_slot_start + slot_duration <= window_end:
             potential_slot_end = potential_slot_start + slot_duration
-            
-            is_overlapping = False
-            for busy_start, busy_end in merged_busy_intervals:
-                if max(potential_slot_start, busy_start) < min(potential_slot_end, busy_end):
-                    is_overlapping = True
-                    break
-            
+
+            # The first busy interval ending after the slot starts is the only one that can overlap it
+            index = bisect.bisect_right(busy_ends, potential_slot_start)
+            is_overlapping = index < len(merged_busy_intervals) and merged_busy_intervals[index][0] < potential_slot_end
+
             if not is_overlapping:
-                free_slots.append({
-                    "start": potential_slot_start.isoformat(),
-                    "end": potential_slot_end.isoformat(),
-                })
-            
+                free_starts.append(potential_slot_start)
+
             potential_slot_start += increment
-            
-    return free_slots
 
+    return free_starts
 
-def find_free_slots_for_multiple_users(tool_context: ToolContext, user_emails: list[str], slot_duration_minutes: int = 60, time_delta_in_days: int = 14, business_hours_start: int = 8, business_hours_end: int = 17) -> list[dict]:
+
+def _find_free_slots(busy_intervals: list[tuple[int, int]], windows: list[tuple[int, int]], time_zone: ZoneInfo, slot_duration_minutes: int) -> list[dict]:
     """
-    Finds all free time slots of a given duration for multiple users in the next specified number of days during business hours.
-    Business hours are Monday to Friday.
+    Free slots within the working windows, starting on the half hour of time_zone.
+    Busy intervals, windows and slots are epoch seconds; only the returned slots are formatted as datetimes.
     """
-    calendar_service, time_zone, now = _get_calendar_and_time_info(tool_context)
-    
-    time_min = (now + datetime.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-    time_max = (now + datetime.timedelta(days=time_delta_in_days)).replace(hour=23, minute=59, second=59, microsecond=0).isoformat()
-
-    calendar_ids = [{"id": email} for email in user_emails]
+    slot_duration = slot_duration_minutes * MINUTE
+    return [
+        {"start": to_isoformat(start, time_zone), "end": to_isoformat(start + slot_duration, time_zone)}
+        for start in _free_slot_starts(busy_intervals, windows, time_zone, slot_duration_minutes)
+    ]
 
-    freebusy_query = {
-        "timeMin": time_min,
-        "timeMax": time_max,
-        "items": calendar_ids
-    }
 
-    freebusy_result = calendar_service.freebusy().query(body=freebusy_query).execute()
+def _get_working_hours(tool_context: ToolContext, calendar_service, user_emails: list[str], default: WorkingHours) -> dict[str, WorkingHours]:
+    """
+    The working hours of each user: those the user gave for them, or else the default hours in the time zone of
+    their calendar, or in the default time zone if their calendar can't be read.
+    """
+    known_hours = tool_context.state.get(WORKING_HOURS_STATE_KEY) or {}
+    time_zones = dict(tool_context.state.get(ATTENDEE_TIME_ZONES_STATE_KEY) or {})
+    now = time.time()
+    stale = [
+        email for email in user_emails
+        if email not in known_hours and (email not in time_zones or now - time_zones[email]["updated"] >= ATTENDEE_TIME_ZONE_TTL_SECONDS)
+    ]
+    if stale:
+        for email, time_zone in fetch_time_zones(calendar_service, stale).items():
+            time_zones[email] = {"time_zone": time_zone, "updated": now}
+        tool_context.state[ATTENDEE_TIME_ZONES_STATE_KEY] = time_zones
+
+    working_hours = {}
+    for email in user_emails:
+        if email in known_hours:
+            working_hours[email] = WorkingHours.from_dict(known_hours[email], default)
+        else:
+            working_hours[email] = dataclasses.replace(default, time_zone=time_zones[email]["time_zone"] or default.time_zone)
+    return working_hours
+
+
+@traced_tool
+def find_free_slots(tool_context: ToolContext, slot_duration_minutes: int = 60, time_delta_in_days: int = 14, business_hours_start: int = 8, business_hours_end: int = 17) -> list[dict]:
+    """
+    Finds all free time slots of a given duration in the next specified number of days during business hours.
+    Business hours are Monday to Friday. All-day events, out-of-office time and public holidays are already left out,
+    while events shown as free or declined by the user don't block time.
+    """
+    _, time_zone, now = _get_calendar_and_time_info(tool_context)
     
-    busy_intervals = []
-    for calendar_id, data in freebusy_result['calendars'].items():
-        for busy_period in data['busy']:
-            busy_intervals.append((
-                datetime.datetime.fromisoformat(busy_period['start']).astimezone(time_zone),
-                datetime.datetime.fromisoformat(busy_period['end']).astimezone(time_zone)
-            ))
-
-    # Sort intervals by start time
-    busy_intervals.sort()
-
-    # Merge overlapping intervals
-    if not busy_intervals:
-        merged_busy_intervals = []
-    else:
-        merged_busy_intervals = [busy_intervals[0]]
-        for current_start, current_end in busy_intervals[1:]:
-            last_start, last_end = merged_busy_intervals[-1]
-            if current_start < last_end:
-                merged_busy_intervals[-1] = (last_start, max(last_end, current_end))
-            else:
-                merged_busy_intervals.append((current_start, current_end))
+    # Slots start tomorrow, so the events have to reach one day further than time_delta_in_days
+    events = get_upcoming_events(tool_context, time_delta_in_days=time_delta_in_days + 1)
 
-    free_slots = []
-    slot_duration = datetime.timedelta(minutes=slot_duration_minutes)
-    increment = datetime.timedelta(minutes=30) # Check for a new slot every 30 minutes
-    
-    start_date = (now + datetime.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    busy_intervals = []
+    for event in events:
+        interval = _busy_interval(event, time_zone)
+        if interval:
+            busy_intervals.append(interval)
 
-    for day_offset in range(time_delta_in_days):
-        current_day = start_date + datetime.timedelta(days=day_offset)
+    windows = WorkingHours(str(time_zone), business_hours_start, business_hours_end).windows(*_search_range(time_zone, now, time_delta_in_days))
+    return _find_free_slots(busy_intervals, windows, time_zone, slot_duration_minutes)
 
-        if current_day.weekday() >= 5:  # Skip weekends
-            continue
-        
-        day_start = current_day.replace(hour=business_hours_start, minute=0, second=0, microsecond=0, tzinfo=time_zone)
-        day_end = current_day.replace(hour=business_hours_end, minute=0, second=0, microsecond=0, tzinfo=time_zone)
 
-        potential_slot_start = day_start
-        while potential_slot_start + slot_duration <= day_end:
-            potential_slot_end = potential_slot_start + slot_duration
-            
-            is_overlapping = False
-            for busy_start, busy_end in merged_busy_intervals:
-                if max(potential_slot_start, busy_start) < min(potential_slot_end, busy_end):
-                    is_overlapping = True
-                    break
-            
-            if not is_overlapping:
-                free_slots.append({
-                    "start": potential_slot_start.isoformat(),
-                    "end": potential_slot_end.isoformat(),
-                })
-            
-            potential_slot_start += increment
-            
-    return free_slots
+@traced_tool
+def find_free_slots_for_multiple_users(tool_context: ToolContext, user_emails: list[str], slot_duration_minutes: int = 60, time_delta_in_days: int = 14, business_hours_start: int = 8,
+                                       business_hours_end: int = 17, attendee_working_hours: list[dict] | None = None) -> dict:
+    """
+    Finds all free time slots of a given duration for multiple users in the next specified number of days, within
+    everyone's working hours. Business hours are Monday to Friday, in the user's time zone for the user and in each
+    attendee's own time zone for the attendees, unless other working hours are known for an attendee.
 
+    Args:
+        user_emails: The attendees to check
+        attendee_working_hours: Working hours the user mentioned for attendees, each a Dict with email and any of
+            time_zone (e.g. "Europe/Berlin"), start_hour, end_hour and workdays (e.g. ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]).
+            They are remembered, so only pass them when they are new or have changed.
+    returns:
+        A Dict with
+        slots: List of Dicts with the start and end of each slot
+        unchecked_calendars: The attendees whose calendars couldn't be read, and whose time is taken as free, if any
+    """
+    calendar_service, time_zone, now = _get_calendar_and_time_info(tool_context)
 
+    organizer_hours = WorkingHours(str(time_zone), business_hours_start, business_hours_end)
+    if attendee_working_hours:
+        known_hours = dict(tool_context.state.get(WORKING_HOURS_STATE_KEY) or {})
+        for hours in attendee_working_hours:
+            # Fail on bad input before remembering it
+            WorkingHours.from_dict(hours, organizer_hours)
+            known_hours[hours["email"]] = {key: value for key, value in hours.items() if key != "email"}
+        tool_context.state[WORKING_HOURS_STATE_KEY] = known_hours
+
+    range_start, range_end = _search_range(time_zone, now, time_delta_in_days)
+    windows = organizer_hours.windows(range_start, range_end)
+    # Attendees often share hours and a time zone, and each distinct set of working hours only needs intersecting once
+    for hours in set(_get_working_hours(tool_context, calendar_service, user_emails, organizer_hours).values()):
+        windows = intersect_windows(windows, hours.windows(range_start, range_end))
+
+    busy = query_busy(calendar_service, user_emails, to_isoformat(range_start, time_zone), to_isoformat(range_end, time_zone), user_id=tool_context.user_id)
+    unchecked = [email for email, intervals in busy.items() if intervals is None]
+    if unchecked:
+        logging.warning(f"Could not read the free/busy information of {unchecked}")
+    busy_intervals = [interval for intervals in busy.values() if intervals for interval in intervals]
+
+    result: dict = {"slots": _find_free_slots(busy_intervals, windows, time_zone, slot_duration_minutes)}
+    if unchecked:
+        result["unchecked_calendars"] = unchecked
+    return result
+
+
+@traced_tool
 def set_calendar_entry(location: str, summary: str, description: str, start_datetime_isoformat: str, end_datetime_isoformat: str,
-                     tool_context: ToolContext) -> dict:
+                     tool_context: ToolContext, source_message_id: str = "") -> dict:
     """
     Sets a calendar entry. The agents uses strings to call the function even when type hints suggest datetime objects.
 
@@ -264,6 +458,8 @@ def set_calendar_entry(location: str, summary: str, description: str, start_date
     Args: 
         start_datetime_isoformat: The start time of the meeting
         end_datetime_isoformat: The end time of the meeting
+        source_message_id: The message_id of the email the entry comes from, if any. An email is only ever booked
+        once; booking it again returns the event booked before, with already_booked set.
     """
 
     calendar_service, time_zone, _ = _get_calendar_and_time_info(tool_context)
@@ -284,11 +480,48 @@ def set_calendar_entry(location: str, summary: str, description: str, start_date
         },
     }
     
-    event = calendar_service.events().insert(calendarId="primary", body=event).execute()
-    # Return the created event object, which contains the ID, link, etc.
+    if not source_message_id:
+        event = calendar_service.events().insert(calendarId="primary", body=event).execute()
+        _invalidate_busy([event])
+        # Return the created event object, which contains the ID, link, etc.
+        return event
+
+    store = get_gmail_sync_store(gmail_sync_path(tool_context.user_id))
+    booked = store.claim(source_message_id)
+    if booked == BOOKING:
+        return {"already_booked": True, "status": "This email is being booked by another request"}
+    if booked:
+        existing = calendar_service.events().get(calendarId="primary", eventId=booked).execute()
+        if existing.get("status") != "cancelled":
+            return {**existing, "already_booked": True}
+        # The event was deleted since, so the email is booked again
+        store.booked(source_message_id, None)
+        if store.claim(source_message_id) is not None:
+            return {"already_booked": True, "status": "This email is being booked by another request"}
+    # An id derived from the message, so the Calendar API itself refuses a second event even if the store is lost
+    event["id"] = "jg" + hashlib.sha256(source_message_id.encode("utf-8")).hexdigest()[:40]
+    try:
+        try:
+            event = calendar_service.events().insert(calendarId="primary", body=event).execute()
+        except HttpError as e:
+            if e.resp.status != 409:
+                raise
+            existing = calendar_service.events().get(calendarId="primary", eventId=event["id"]).execute()
+            if existing.get("status") == "cancelled":
+                # A deleted event keeps its id, so it is restored instead
+                event = calendar_service.events().patch(calendarId="primary", eventId=event["id"], body={**event, "status": "confirmed"}).execute()
+            else:
+                event = {**existing, "already_booked": True}
+        _invalidate_busy([event])
+    except BaseException:
+        # Whatever failed, release the claim so the email can be booked again
+        store.booked(source_message_id, None)
+        raise
+    store.booked(source_message_id, event["id"])
     return event
 
 
+@traced_tool
 def decline_all_todays_events(tool_context: ToolContext):
     """
     Declines all of todays events.
@@ -312,8 +545,10 @@ def decline_all_todays_events(tool_context: ToolContext):
             user_as_attendee['responseStatus'] = 'declined'
             user_as_attendee['comment'] = "Declined by Julian"
             
-            # Patch the event with the updated attendee list once per event
-            calendar_service.events().patch(calendarId='primary', eventId=event['id'], body=event).execute()
+            # Patch the event with the updated attendee list once per event, on the calendar it was listed from
+            calendar_id = event.pop('calendarId', 'primary')
+            calendar_service.events().patch(calendarId=calendar_id, eventId=event['id'], body=event).execute()
+            _invalidate_busy([event])
             declined_events.append({
                 "Event Title": event.get('summary', 'No Title'),
                 "start": event.get('start', {}).get('dateTime'),
@@ -323,12 +558,17 @@ def decline_all_todays_events(tool_context: ToolContext):
     return declined_events
 
 
-def add_attendees_to_event(tool_context: ToolContext, event_id: str, attendees: list[str]) -> dict:
+@traced_tool
+def add_attendees_to_event(tool_context: ToolContext, event_id: str, attendees: list[str], calendar_id: str = "primary") -> dict:
     """
     Adds a list of attendees to an existing event.
+    Args:
+        event_id: Event id of the event
+        attendees: The emails of the attendees to add
+        calendar_id: The calendarId the event was listed with
     """
     calendar_service, _, _ = _get_calendar_and_time_info(tool_context)
-    event = calendar_service.events().get(calendarId='primary', eventId=event_id).execute()
+    event = calendar_service.events().get(calendarId=calendar_id, eventId=event_id).execute()
 
     if 'attendees' not in event:
         event['attendees'] = []
@@ -336,10 +576,13 @@ def add_attendees_to_event(tool_context: ToolContext, event_id: str, attendees:
     for attendee_email in attendees:
         event['attendees'].append({'email': attendee_email})
 
-    updated_event = calendar_service.events().patch(calendarId='primary', eventId=event['id'], body=event, sendUpdates='all').execute()
+    updated_event = calendar_service.events().patch(calendarId=calendar_id, eventId=event['id'], body=event, sendUpdates='all').execute()
+    _invalidate_busy([updated_event])
 
     return updated_event
 
+
+@traced_tool
 def get_now(tool_context: ToolContext):
     """
     Returns the current time according to the timezone of the users primary calendar's timezone
@@ -348,40 +591,383 @@ def get_now(tool_context: ToolContext):
     return now.isoformat()
 
 
-def reschedule_event(tool_context: ToolContext, event_id: str, new_start_datetime_isoformat: str, new_end_datetime_isoformat: str):
+@traced_tool
+def reschedule_event(tool_context: ToolContext, event_id: str, new_start_datetime_isoformat: str, new_end_datetime_isoformat: str,
+                     calendar_id: str = "primary"):
     """
     Receives and event id, and new time, and reschedules and event
     Args:
         event_id: Event id of the event to reschedule
         new_start_datetime_isoformat: The new startime of the event
         new_end_datetime_isoformat: The new endtime of the event
+        calendar_id: The calendarId the event was listed with
     """
 
     calendar_service, _, _ = _get_calendar_and_time_info(tool_context)
-    event = calendar_service.events().get(calendarId='primary', eventId=event_id).execute()
+    event = calendar_service.events().get(calendarId=calendar_id, eventId=event_id).execute()
     event['start']['dateTime'] = new_start_datetime_isoformat
     event['end']['dateTime'] = new_end_datetime_isoformat
-    updated_event = calendar_service.events().patch(calendarId='primary', eventId=event['id'], body=event, sendUpdates='all').execute()
+    updated_event = calendar_service.events().patch(calendarId=calendar_id, eventId=event['id'], body=event, sendUpdates='all').execute()
+    _invalidate_busy([updated_event])
 
     return updated_event
 
 
-def decline_event(tool_context: ToolContext, event_id: str, decline_comment: str="Declined by Julian"):
+@traced_tool
+def decline_event(tool_context: ToolContext, event_id: str, decline_comment: str="Declined by Julian", calendar_id: str = "primary"):
     """
     Declines an event with a message
     
     Args:
         event_id: The Event id of the event to reschedule
         decline_message: A message to decline
+        calendar_id: The calendarId the event was listed with
     """
     calendar_service, _, _ = _get_calendar_and_time_info(tool_context)
     user_email = get_user_info(tool_context)['email']
-    event = calendar_service.events().get(calendarId='primary', eventId=event_id).execute()
+    event = calendar_service.events().get(calendarId=calendar_id, eventId=event_id).execute()
     user_as_attendee = next((att for att in event['attendees'] if att.get('email') == user_email), None)
 
     if user_as_attendee:
         user_as_attendee['responseStatus'] = 'declined'
         user_as_attendee['comment'] = decline_comment
-        calendar_service.events().patch(calendarId='primary', eventId=event['id'], body=event).execute()
+        calendar_service.events().patch(calendarId=calendar_id, eventId=event['id'], body=event).execute()
+        _invalidate_busy([event])
+
+    return event
+
+
+@traced_tool
+def find_available_rooms(tool_context: ToolContext, slots: list[dict], min_capacity: int = 1, building: str = "", max_rooms_per_slot: int = 3) -> list[dict]:
+    """
+    Finds meeting rooms that are free for each of the candidate slots, checking all rooms in one go.
+
+    Args:
+        slots: Candidate slots, each a Dict with "start" and "end" isoformat strings, e.g. from find_free_slots
+        min_capacity: The number of people the room must seat
+        building: Only rooms in buildings whose id contains this text; empty for any building
+        max_rooms_per_slot: The most rooms to return per slot, smallest suitable rooms first
+    returns:
+        slots: List of Dicts with the start, end and free rooms (email, name, capacity, building, floor) of each slot
+    """
+    rooms = filter_rooms(load_room_directory(), min_capacity, building or None)
+    if not rooms or not slots:
+        return [{"start": slot["start"], "end": slot["end"], "rooms": []} for slot in slots]
+
+    calendar_service = get_calendar_service(tool_context)
+    slot_bounds = [(to_epoch(slot["start"]), to_epoch(slot["end"])) for slot in slots]
+    time_min = to_isoformat(min(start for start, _ in slot_bounds), datetime.timezone.utc)
+    time_max = to_isoformat(max(end for _, end in slot_bounds), datetime.timezone.utc)
+    room_emails = [room["resourceEmail"] for room in rooms]
+    busy = query_busy(calendar_service, room_emails, time_min, time_max, user_id=tool_context.user_id)
+    free = availability_matrix(slot_bounds, [busy[email] for email in room_emails])
+
+    results = []
+    for slot, free_rooms in zip(slots, free):
+        available = []
+        for index, room in enumerate(rooms):
+            if len(available) == max_rooms_per_slot:
+                break
+            if free_rooms >> index & 1:
+                available.append({
+                    "email": room["resourceEmail"],
+                    "name": room.get("resourceName"),
+                    "capacity": room.get("capacity"),
+                    "building": room.get("buildingId"),
+                    "floor": room.get("floorName"),
+                })
+        results.append({"start": slot["start"], "end": slot["end"], "rooms": available})
+    return results
+
+
+@traced_tool
+def find_recurring_slots(tool_context: ToolContext, user_emails: list[str], weeks: int = 8, slot_duration_minutes: int = 60, business_hours_start: int = 8,
+                         business_hours_end: int = 17, min_weeks_free: int = 0, max_results: int = 10) -> dict:
+    """
+    Finds weekly time slots that are free for all the users every week, e.g. for a weekly 1:1, in one call.
+    Include the user's own email to check their calendar too. Business hours are Monday to Friday.
 
-    return event
\ No newline at end of file
+    Args:
+        user_emails: The attendees to check
+        weeks: How many weekly occurrences to check, starting tomorrow
+        slot_duration_minutes: Length of each occurrence
+        min_weeks_free: Also return slots that are free in at least this many of the weeks; 0 for every week
+        max_results: The most slots to return
+    returns:
+        A Dict with
+        slots: List of Dicts with the weekday, start_time, end_time, first_start (isoformat), weeks_free and
+        busy_weeks (dates of the occurrences that clash) of each slot, most weeks free first
+        unchecked_calendars: The attendees whose calendars couldn't be read, and whose time is taken as free, if any
+    """
+    calendar_service, time_zone, now = _get_calendar_and_time_info(tool_context)
+    grid = WeekGrid(business_hours_start, business_hours_end)
+    first_week = now.date() + datetime.timedelta(days=1)
+    week_starts = [first_week + datetime.timedelta(weeks=week) for week in range(weeks)]
+
+    time_min = to_isoformat(local_to_epoch(first_week, 0, time_zone), time_zone)
+    time_max = to_isoformat(local_to_epoch(first_week + datetime.timedelta(weeks=weeks), 0, time_zone), time_zone)
+    busy = query_busy(calendar_service, user_emails, time_min, time_max, user_id=tool_context.user_id)
+    unchecked = [email for email, intervals in busy.items() if intervals is None]
+    if unchecked:
+        logging.warning(f"Could not read the free/busy information of {unchecked}")
+
+    # Free starts per week: what is free for every attendee that week
+    weekly_starts = []
+    for week_start in week_starts:
+        busy_cells = 0
+        for intervals in busy.values():
+            if intervals:
+                busy_cells |= grid.busy_mask(intervals, week_start, time_zone)
+        weekly_starts.append(grid.free_starts(busy_cells, slot_duration_minutes))
+
+    every_week = functools.reduce(operator.and_, weekly_starts) if weekly_starts else 0
+    candidates = functools.reduce(operator.or_, weekly_starts, 0) if min_weeks_free else every_week
+    required = min(min_weeks_free, weeks) if min_weeks_free else weeks
+
+    ranked = []
+    for bit in bits(candidates):
+        weeks_free = weeks if every_week >> bit & 1 else sum(starts >> bit & 1 for starts in weekly_starts)
+        if weeks_free >= required:
+            ranked.append((-weeks_free, bit))
+    ranked.sort()
+
+    slots = []
+    for negative_weeks_free, bit in ranked[:max_results]:
+        weekday, start_time = grid.wall_time(bit)
+        occurrences = [grid.occurrence(bit, week_start, time_zone) for week_start in week_starts]
+        free_occurrences = [start for (_, start), starts in zip(occurrences, weekly_starts) if starts >> bit & 1]
+        slots.append({
+            "weekday": WEEKDAY_NAMES[weekday],
+            "start_time": start_time,
+            "end_time": grid.wall_time(bit, slot_duration_minutes)[1],
+            "first_start": to_isoformat(free_occurrences[0], time_zone),
+            "weeks_free": -negative_weeks_free,
+            "busy_weeks": [date.isoformat() for (date, _), starts in zip(occurrences, weekly_starts) if not starts >> bit & 1],
+        })
+    result: dict = {"slots": slots}
+    if unchecked:
+        result["unchecked_calendars"] = unchecked
+    return result
+
+
+def _deadline(value: str | None, time_zone: ZoneInfo, default: int) -> int:
+    """Epoch seconds of a deadline datetime, or of the end of a deadline date, but no later than default."""
+    if not value:
+        return default
+    if len(value) == len("YYYY-MM-DD"):
+        return min(default, local_to_epoch(datetime.date.fromisoformat(value) + datetime.timedelta(days=1), 0, time_zone))
+    return min(default, to_epoch(value, time_zone))
+
+
+def _insert_events(calendar_service, events: list[dict]) -> list[dict | None]:
+    """Creates the events on the primary calendar in batch requests, returning each created event or None if it failed."""
+    created: list[dict | None] = [None] * len(events)
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            logging.warning(f"Could not create event {request_id}: {exception}")
+            return
+        created[int(request_id)] = response
+
+    for first in range(0, len(events), EVENTS_PER_BATCH):
+        batch = calendar_service.new_batch_http_request(callback=collect)
+        for index in range(first, min(first + EVENTS_PER_BATCH, len(events))):
+            batch.add(calendar_service.events().insert(calendarId="primary", body=events[index], sendUpdates="all"), request_id=str(index))
+        batch.execute()
+    return created
+
+
+def _delete_events(calendar_service, event_ids: list[str]) -> list[str]:
+    """Deletes events from the primary calendar in batch requests, notifying attendees, and returns the ids that are left."""
+    left = []
+
+    def collect(request_id, response, exception):
+        # An event that is already gone doesn't need deleting
+        if exception is not None and not (isinstance(exception, HttpError) and exception.resp.status in (404, 410)):
+            logging.warning(f"Could not delete event {request_id}: {exception}")
+            left.append(request_id)
+
+    for first in range(0, len(event_ids), EVENTS_PER_BATCH):
+        batch = calendar_service.new_batch_http_request(callback=collect)
+        for event_id in event_ids[first:first + EVENTS_PER_BATCH]:
+            batch.add(calendar_service.events().delete(calendarId="primary", eventId=event_id, sendUpdates="all"), request_id=event_id)
+        batch.execute()
+    return left
+
+
+@traced_tool
+def schedule_meetings(tool_context: ToolContext, meetings: list[dict], time_delta_in_days: int = 14, business_hours_start: int = 8,
+                      business_hours_end: int = 17, create_events: bool = False) -> dict:
+    """
+    Schedules a set of related meetings at once, e.g. an interview loop or an onboarding series, checking everyone's
+    calendars in one go. Call it first without create_events to get the proposed times, and once the user confirms,
+    call it again with the same meetings and create_events to book them all.
+
+    Args:
+        meetings: The meetings, each a Dict with summary, attendees (emails; include the user's own email if they attend),
+            duration_minutes, and optionally description, location, after (positions in this list, from 0, of the
+            meetings that must end first), min_gap_minutes (the least time between those meetings and this one) and
+            deadline (isoformat date or datetime to finish by)
+        time_delta_in_days: How many days from tomorrow to schedule the meetings in
+        create_events: Book the meetings, which only happens when every meeting fits. If some of the events can't
+            be created, the ones that were are deleted again
+    returns:
+        scheduled: List of Dicts with the index, summary, start, end and attendees of each meeting that fits, plus the
+            event_id and htmlLink once booked, or an error if its event couldn't be created
+        unscheduled: List of Dicts with the index, summary and reason of each meeting that doesn't fit
+        unchecked_calendars: Attendees whose calendars couldn't be read, if any
+        error: Why the meetings couldn't be scheduled or booked, if they couldn't
+    """
+    calendar_service, time_zone, now = _get_calendar_and_time_info(tool_context)
+    organizer_hours = WorkingHours(str(time_zone), business_hours_start, business_hours_end)
+    range_start, range_end = _search_range(time_zone, now, time_delta_in_days)
+    deadlines = [_deadline(meeting.get("deadline"), time_zone, range_end) for meeting in meetings]
+    range_end = max(deadlines, default=range_end)
+
+    attendees = list(dict.fromkeys(email for meeting in meetings for email in meeting["attendees"]))
+    busy = query_busy(calendar_service, attendees, to_isoformat(range_start, time_zone), to_isoformat(range_end, time_zone), user_id=tool_context.user_id)
+    unchecked = [email for email, intervals in busy.items() if intervals is None]
+    if unchecked:
+        logging.warning(f"Could not read the free/busy information of {unchecked}")
+    working_hours = _get_working_hours(tool_context, calendar_service, attendees, organizer_hours)
+    organizer_windows = organizer_hours.windows(range_start, range_end)
+    windows_by_hours: dict[WorkingHours, list[tuple[int, int]]] = {}
+
+    problem = []
+    for meeting, deadline in zip(meetings, deadlines):
+        windows = intersect_windows(organizer_windows, [(range_start, deadline)])
+        for hours in {working_hours[email] for email in meeting["attendees"]}:
+            if hours not in windows_by_hours:
+                windows_by_hours[hours] = hours.windows(range_start, range_end)
+            windows = intersect_windows(windows, windows_by_hours[hours])
+        busy_intervals = [interval for email in meeting["attendees"] for interval in busy[email] or []]
+        duration_minutes = meeting.get("duration_minutes", 60)
+        problem.append(Meeting(
+            attendees=frozenset(meeting["attendees"]),
+            duration=duration_minutes * MINUTE,
+            candidates=tuple(_free_slot_starts(busy_intervals, windows, time_zone, duration_minutes)),
+            after=tuple(meeting.get("after", [])),
+            min_gap=meeting.get("min_gap_minutes", 0) * MINUTE,
+        ))
+    try:
+        starts = solve(problem)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    scheduled, unscheduled = [], []
+    for index, (meeting, start) in enumerate(zip(meetings, starts)):
+        if start is None:
+            if not problem[index].candidates:
+                reason = "no time before the deadline is free for all attendees"
+            elif any(starts[before] is None for before in problem[index].after):
+                reason = "follows a meeting that doesn't fit"
+            else:
+                reason = "clashes with the other meetings"
+            unscheduled.append({"index": index, "summary": meeting.get("summary"), "reason": reason})
+            continue
+        scheduled.append({
+            "index": index,
+            "summary": meeting.get("summary"),
+            "start": to_isoformat(start, time_zone),
+            "end": to_isoformat(start + problem[index].duration, time_zone),
+            "attendees": meeting["attendees"],
+        })
+
+    if create_events and scheduled and not unscheduled:
+        events = [
+            {
+                "summary": slot["summary"],
+                "location": meeting.get("location", ""),
+                "description": meeting.get("description", ""),
+                "start": {"dateTime": slot["start"], "timeZone": str(time_zone)},
+                "end": {"dateTime": slot["end"], "timeZone": str(time_zone)},
+                "attendees": [{"email": email} for email in slot["attendees"]],
+            }
+            for slot, meeting in zip(scheduled, meetings)
+        ]
+        created = _insert_events(calendar_service, events)
+        _invalidate_busy([event for event in created if event])
+        # The meetings are booked together or not at all, so the events created before a failure are deleted again
+        left = _delete_events(calendar_service, [event["id"] for event in created if event]) if None in created else []
+        for slot, event in zip(scheduled, created):
+            if event is None:
+                slot["error"] = "the event could not be created"
+            elif None not in created or event["id"] in left:
+                slot["event_id"] = event["id"]
+                slot["htmlLink"] = event.get("htmlLink")
+
+    result = {"scheduled": scheduled, "unscheduled": unscheduled}
+    if unchecked:
+        result["unchecked_calendars"] = unchecked
+    if create_events and any("error" in slot for slot in scheduled):
+        result["error"] = "Not every event could be created, so the others were deleted again"
+        if any("event_id" in slot for slot in scheduled):
+            result["error"] += "; the ones with an event_id couldn't be deleted and are still booked"
+    return result
+
+
+def _date_bound(value: str, time_zone: ZoneInfo, end: bool = False) -> int | None:
+    """Epoch seconds of an isoformat datetime, or of the start (or with end, the end) of an isoformat date."""
+    if not value:
+        return None
+    if len(value) == len("YYYY-MM-DD"):
+        return local_to_epoch(datetime.date.fromisoformat(value) + datetime.timedelta(days=1 if end else 0), 0, time_zone)
+    return to_epoch(value, time_zone)
+
+
+@traced_tool
+def search_events(tool_context: ToolContext, text: str = "", attendee: str = "", start_date: str = "", end_date: str = "",
+                  latest_first: bool = False, max_results: int = 10) -> list[dict]:
+    """
+    Searches the user's events, past and future, and returns only the matching ones. Use it to find an event by what
+    it is about, who was there or when, instead of reading through listed events. For example, "when did I last meet
+    Brad?" is search_events(attendee="brad", end_date=<today>, latest_first=True, max_results=1), and "find my
+    dentist appointment" is search_events(text="dentist").
+
+    Args:
+        text: Words in the event's title, description or location; each word matches as a prefix
+        attendee: Part of the email or name of an attendee or the organizer
+        start_date: Only events ending after this isoformat date or datetime
+        end_date: Only events starting before the end of this isoformat date, or before this datetime
+        latest_first: Return the latest events first, instead of the earliest
+        max_results: The most events to return
+    returns:
+        events: List of Dicts with the id, calendarId, summary, start, end, location, description (shortened),
+        attendees and htmlLink of each event
+    """
+    calendar_service, time_zone, _ = _get_calendar_and_time_info(tool_context)
+    calendar_ids = _get_calendar_ids(tool_context, calendar_service)
+    index = get_event_index(event_index_path(tool_context.user_id))
+    webhook_url = os.environ.get("WATCH_WEBHOOK_URL")
+    watched = watch_calendars(channel_registry(), calendar_service, tool_context.user_id, calendar_ids, webhook_url) if webhook_url else set()
+    sync(index, calendar_service, calendar_ids, time_zone, float(os.environ.get("EVENT_INDEX_SYNC_INTERVAL_SECONDS", DEFAULT_SYNC_INTERVAL_SECONDS)),
+         watched=watched, watched_interval_seconds=WATCHED_SYNC_INTERVAL_SECONDS)
+    return index.search(calendar_ids, time_zone, text=text, attendee=attendee, time_min=_date_bound(start_date, time_zone),
+                        time_max=_date_bound(end_date, time_zone, end=True), latest_first=latest_first, limit=max_results)
+
+
+@traced_tool
+def find_events_in_email(tool_context: ToolContext, query: str = "", max_messages: int = 20) -> list[dict]:
+    """
+    Reads the user's recent email for things to put in their calendar, such as trainings, webinars, appointments
+    and reservations. Only messages that mention a date or time are returned. Show the user what was found, and once
+    they confirm, pass a candidate's set_calendar_entry arguments to set_calendar_entry.
+
+    Args:
+        query: A Gmail search query, e.g. "from:learning@example.com newer_than:7d". By default, mail about
+        trainings, webinars, appointments and the like is read, only the mail that arrived since the last time
+        max_messages: The most messages to read, and candidates to return
+    returns:
+        candidates: List of Dicts, newest message first, with the message_id, subject, from, the dates, times
+        ("HH:MM" or "HH:MM-HH:MM"), time_zone, locations and meeting links found, a snippet, and when a date and a
+        time were found, set_calendar_entry: the summary, location, description, start_datetime_isoformat and
+        end_datetime_isoformat for the event in the user's time zone, and its source_message_id. Emails already
+        booked are left out.
+    """
+    _, time_zone, _ = _get_calendar_and_time_info(tool_context)
+    store = get_gmail_sync_store(gmail_sync_path(tool_context.user_id))
+    if not query:
+        return sync_candidates(store, get_gmail_service(tool_context), EVENT_EMAIL_QUERY, max_messages, time_zone)
+    candidates = find_event_candidates(get_gmail_service(tool_context), query, max_messages, time_zone)
+    booked = store.booked_messages([candidate["message_id"] for candidate in candidates]) if candidates else set()
+    return [candidate for candidate in candidates if candidate["message_id"] not in booked]
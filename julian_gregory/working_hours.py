@@ -0,0 +1,110 @@
+"""
+Attendee working hours as epoch-second windows.
+
+Each attendee works set hours on set weekdays in their own time zone. Their
+windows over a search range are intersected with each other's, so the slot
+search only walks time that is workable for everyone, instead of producing
+slots at 3am for someone in another time zone.
+"""
+import dataclasses
+import datetime
+import logging
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .time_utils import local_to_epoch
+
+DEFAULT_WORKDAYS = (0, 1, 2, 3, 4)
+WEEKDAY_ABBREVIATIONS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+# A Calendar batch request takes at most 50 calls
+CALENDARS_PER_BATCH = 50
+
+
+@dataclasses.dataclass(frozen=True)
+class WorkingHours:
+    time_zone: str
+    start_hour: int
+    end_hour: int
+    workdays: tuple[int, ...] = DEFAULT_WORKDAYS
+
+    @classmethod
+    def from_dict(cls, hours: dict, default: "WorkingHours") -> "WorkingHours":
+        """
+        Working hours from a Dict with any of time_zone, start_hour, end_hour and workdays (weekday names or
+        numbers, 0 is Monday), taking what is missing from default. Raises ValueError for an unknown time zone or
+        weekday, or unless 0 <= start_hour < end_hour <= 24.
+        """
+        time_zone = hours.get("time_zone") or default.time_zone
+        try:
+            ZoneInfo(time_zone)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown time zone {time_zone!r}")
+        workdays = default.workdays
+        if hours.get("workdays"):
+            workdays = tuple(sorted({_weekday(day) for day in hours["workdays"]}))
+        start_hour, end_hour = int(hours.get("start_hour", default.start_hour)), int(hours.get("end_hour", default.end_hour))
+        if not 0 <= start_hour < end_hour <= 24:
+            raise ValueError(f"Working hours {start_hour} to {end_hour} aren't 0 <= start_hour < end_hour <= 24")
+        return cls(time_zone, start_hour, end_hour, workdays)
+
+    def windows(self, time_min: int, time_max: int) -> list[tuple[int, int]]:
+        """The working time between time_min and time_max (epoch seconds), as sorted (start, end) intervals."""
+        time_zone = ZoneInfo(self.time_zone)
+        date = datetime.datetime.fromtimestamp(time_min, time_zone).date()
+        last_date = datetime.datetime.fromtimestamp(time_max, time_zone).date()
+        windows = []
+        while date <= last_date:
+            if date.weekday() in self.workdays:
+                start = max(time_min, local_to_epoch(date, self.start_hour, time_zone))
+                # Hour 24 is midnight at the end of the day
+                end = min(time_max, local_to_epoch(date + datetime.timedelta(days=self.end_hour // 24), self.end_hour % 24, time_zone))
+                if start < end:
+                    windows.append((start, end))
+            date += datetime.timedelta(days=1)
+        return windows
+
+
+def _weekday(day: int | str) -> int:
+    if isinstance(day, int) or str(day).isdigit():
+        if not 0 <= int(day) <= 6:
+            raise ValueError(f"Unknown weekday {day!r}")
+        return int(day)
+    try:
+        return WEEKDAY_ABBREVIATIONS.index(day.strip().lower()[:3])
+    except ValueError:
+        raise ValueError(f"Unknown weekday {day!r}")
+
+
+def intersect_windows(first: list[tuple[int, int]], second: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """The time covered by both lists of sorted, non-overlapping intervals."""
+    common = []
+    i = j = 0
+    while i < len(first) and j < len(second):
+        start = max(first[i][0], second[j][0])
+        end = min(first[i][1], second[j][1])
+        if start < end:
+            common.append((start, end))
+        # The interval that ends first can't overlap anything further along the other list
+        if first[i][1] < second[j][1]:
+            i += 1
+        else:
+            j += 1
+    return common
+
+
+def fetch_time_zones(calendar_service, calendar_ids: list[str]) -> dict[str, str | None]:
+    """The time zone of each calendar from batched calendars.get calls, or None where the calendar can't be read."""
+    time_zones: dict[str, str | None] = {}
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            logging.info(f"No time zone for calendar {request_id}: {exception}")
+            return
+        time_zones[calendar_ids[int(request_id)]] = response.get("timeZone")
+
+    for first in range(0, len(calendar_ids), CALENDARS_PER_BATCH):
+        batch = calendar_service.new_batch_http_request(callback=collect)
+        for index in range(first, min(first + CALENDARS_PER_BATCH, len(calendar_ids))):
+            batch.add(calendar_service.calendars().get(calendarId=calendar_ids[index]), request_id=str(index))
+        batch.execute()
+
+    return {calendar_id: time_zones.get(calendar_id) for calendar_id in calendar_ids}
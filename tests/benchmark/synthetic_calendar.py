@@ -0,0 +1,75 @@
+"""
+Seeded synthetic calendars for benchmarking the slot engines.
+The same seed always produces the same events, so timings are comparable between runs.
+"""
+import datetime
+import random
+from dataclasses import dataclass, field
+from zoneinfo import ZoneInfo
+
+SINGLE_TIME_ZONE = ["America/Los_Angeles"]
+MIXED_TIME_ZONES = ["America/Los_Angeles", "America/New_York", "Europe/London", "Asia/Kolkata", "Asia/Singapore", "Australia/Sydney"]
+
+# A Monday, so horizons line up with working weeks
+DEFAULT_NOW = datetime.datetime(2025, 12, 8, 10, 0, 0, tzinfo=ZoneInfo("America/Los_Angeles"))
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    attendees: int = 1
+    horizon_days: int = 14
+    events_per_day: int = 4
+    slot_duration_minutes: int = 60
+    time_zones: list[str] = field(default_factory=lambda: SINGLE_TIME_ZONE)
+    seed: int = 42
+
+
+def _busy_periods(rng: random.Random, time_zone: ZoneInfo, scenario: Scenario, now: datetime.datetime):
+    """Yields (start, end) aware datetimes for one attendee, mostly inside their own working day."""
+    first_day = (now + datetime.timedelta(days=1)).date()
+    for day_offset in range(scenario.horizon_days):
+        day = first_day + datetime.timedelta(days=day_offset)
+        if day.weekday() >= 5 and rng.random() < 0.9:
+            continue
+        for _ in range(scenario.events_per_day):
+            start_minutes = rng.randrange(7 * 60, 19 * 60, 15)
+            duration = rng.choice([15, 30, 30, 45, 60, 60, 90, 120])
+            start = datetime.datetime(day.year, day.month, day.day, tzinfo=time_zone) + datetime.timedelta(minutes=start_minutes)
+            yield start, start + datetime.timedelta(minutes=duration)
+
+
+def generate_events(scenario: Scenario, now: datetime.datetime = DEFAULT_NOW) -> list[dict]:
+    """Returns events in the shape of events().list items for a single calendar."""
+    rng = random.Random(scenario.seed)
+    time_zone = ZoneInfo(scenario.time_zones[0])
+    events = [
+        {
+            "id": f"event{i}",
+            "summary": f"Synthetic event {i}",
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": end.isoformat()},
+        }
+        for i, (start, end) in enumerate(_busy_periods(rng, time_zone, scenario, now))
+    ]
+    events.sort(key=lambda event: event["start"]["dateTime"])
+    return events
+
+
+def generate_freebusy(scenario: Scenario, now: datetime.datetime = DEFAULT_NOW) -> tuple[list[str], dict]:
+    """Returns the attendee emails and a freebusy().query response covering them."""
+    rng = random.Random(scenario.seed)
+    emails = [f"user{i}@example.com" for i in range(scenario.attendees)]
+    calendars = {}
+    for i, email in enumerate(emails):
+        time_zone = ZoneInfo(scenario.time_zones[i % len(scenario.time_zones)])
+        calendars[email] = {
+            "busy": [
+                {
+                    "start": start.astimezone(datetime.UTC).isoformat().replace("+00:00", "Z"),
+                    "end": end.astimezone(datetime.UTC).isoformat().replace("+00:00", "Z"),
+                }
+                for start, end in _busy_periods(rng, time_zone, scenario, now)
+            ]
+        }
+    return emails, {"calendars": calendars}
@@ -0,0 +1,167 @@
+"""
+Benchmarks for find_free_slots and find_free_slots_for_multiple_users on synthetic calendars.
+
+    make bench                                  # compare against baselines.json
+    BENCH_UPDATE_BASELINES=1 make bench         # re-record baselines.json
+    BENCH_FULL_MATRIX=1 make bench              # also run the full attendee/horizon/density matrix (report only)
+"""
+import datetime
+import itertools
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from julian_gregory.tools import ATTENDEE_TIME_ZONES_STATE_KEY, find_free_slots, find_free_slots_for_multiple_users
+from tests.benchmark.synthetic_calendar import (
+    DEFAULT_NOW,
+    MIXED_TIME_ZONES,
+    SINGLE_TIME_ZONE,
+    Scenario,
+    generate_events,
+    generate_freebusy,
+)
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+REPEATS = int(os.environ.get("BENCH_REPEATS", "3"))
+# Baselines are recorded on a developer machine, so allow for slower CI runners
+TIME_TOLERANCE = float(os.environ.get("BENCH_TIME_TOLERANCE", "2.0"))
+MEMORY_TOLERANCE = float(os.environ.get("BENCH_MEMORY_TOLERANCE", "1.5"))
+# Absolute slack so millisecond-scale scenarios don't fail on timer noise
+TIME_SLACK_SECONDS = 0.005
+MEMORY_SLACK_KIB = 64
+UPDATE_BASELINES = os.environ.get("BENCH_UPDATE_BASELINES") == "1"
+
+SINGLE_USER_SCENARIOS = [
+    Scenario("single_1d_sparse", horizon_days=1, events_per_day=2),
+    Scenario("single_14d", horizon_days=14, events_per_day=6),
+    Scenario("single_60d_dense", horizon_days=60, events_per_day=12),
+    Scenario("single_180d", horizon_days=180, events_per_day=6),
+    Scenario("single_180d_30min_slots", horizon_days=180, events_per_day=6, slot_duration_minutes=30),
+    Scenario("single_180d_2h_slots", horizon_days=180, events_per_day=6, slot_duration_minutes=120),
+]
+
+MULTI_USER_SCENARIOS = [
+    Scenario("multi_2_14d", attendees=2, horizon_days=14, events_per_day=4),
+    Scenario("multi_10_14d_mixed_tz", attendees=10, horizon_days=14, events_per_day=4, time_zones=MIXED_TIME_ZONES),
+    Scenario("multi_50_30d", attendees=50, horizon_days=30, events_per_day=4),
+    Scenario("multi_50_30d_mixed_tz", attendees=50, horizon_days=30, events_per_day=4, time_zones=MIXED_TIME_ZONES),
+    Scenario("multi_200_14d", attendees=200, horizon_days=14, events_per_day=6),
+    Scenario("multi_200_180d_mixed_tz", attendees=200, horizon_days=180, events_per_day=2, time_zones=MIXED_TIME_ZONES),
+]
+
+FULL_MATRIX_SCENARIOS = [
+    Scenario(
+        f"matrix_{attendees}_{horizon}d_{density}pd_{duration}m_{'mixed' if len(zones) > 1 else 'single'}",
+        attendees=attendees,
+        horizon_days=horizon,
+        events_per_day=density,
+        slot_duration_minutes=duration,
+        time_zones=zones,
+    )
+    for attendees, horizon, density, duration, zones in itertools.product(
+        [1, 10, 50, 200], [1, 14, 60, 180], [2, 6, 12], [30, 60, 120], [SINGLE_TIME_ZONE, MIXED_TIME_ZONES]
+    )
+]
+
+results: dict[str, dict[str, float]] = {}
+
+
+def load_baselines() -> dict:
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH) as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def record_baselines():
+    yield
+    if UPDATE_BASELINES and results:
+        baselines = load_baselines()
+        baselines.update({name: result for name, result in results.items() if not name.startswith("matrix_")})
+        with open(BASELINES_PATH, "w") as f:
+            json.dump(dict(sorted(baselines.items())), f, indent=2)
+            f.write("\n")
+
+
+def measure(func) -> dict[str, float]:
+    """Returns the median wall time over REPEATS runs and the peak traced memory of one run."""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": round(statistics.median(timings), 5), "peak_kib": round(peak / 1024, 1)}
+
+
+def single_user_runner(scenario: Scenario):
+    time_zone = ZoneInfo(scenario.time_zones[0])
+    now = DEFAULT_NOW.astimezone(time_zone)
+    events = generate_events(scenario, now)
+
+    def run():
+        with patch("julian_gregory.tools._get_calendar_and_time_info", return_value=(None, time_zone, now)), \
+                patch("julian_gregory.tools.get_upcoming_events", return_value=events):
+            return find_free_slots(MagicMock(), slot_duration_minutes=scenario.slot_duration_minutes, time_delta_in_days=scenario.horizon_days)
+
+    return run
+
+
+def multi_user_runner(scenario: Scenario):
+    time_zone = ZoneInfo(scenario.time_zones[0])
+    now = DEFAULT_NOW.astimezone(time_zone)
+    emails, freebusy_result = generate_freebusy(scenario, now)
+    calendar_service = MagicMock()
+    calendar_service.freebusy.return_value.query.return_value.execute.return_value = freebusy_result
+    # Attendee time zones as cached from an earlier call
+    time_zones = {
+        email: {"time_zone": scenario.time_zones[i % len(scenario.time_zones)], "updated": time.time()} for i, email in enumerate(emails)
+    }
+
+    def run():
+        tool_context = SimpleNamespace(state={ATTENDEE_TIME_ZONES_STATE_KEY: time_zones}, user_id="bench")
+        with patch("julian_gregory.tools._get_calendar_and_time_info", return_value=(calendar_service, time_zone, now)):
+            return find_free_slots_for_multiple_users(tool_context, emails, slot_duration_minutes=scenario.slot_duration_minutes, time_delta_in_days=scenario.horizon_days)["slots"]
+
+    return run
+
+
+def check_against_baseline(scenario: Scenario, result: dict[str, float]):
+    results[scenario.name] = result
+    baseline = load_baselines().get(scenario.name)
+    print(f"\n{scenario.name}: {result['seconds'] * 1000:.1f}ms, peak {result['peak_kib']:.0f}KiB"
+          + (f" (baseline {baseline['seconds'] * 1000:.1f}ms, {baseline['peak_kib']:.0f}KiB)" if baseline else ""))
+    if UPDATE_BASELINES or baseline is None or scenario.name.startswith("matrix_"):
+        return
+    assert result["seconds"] <= baseline["seconds"] * TIME_TOLERANCE + TIME_SLACK_SECONDS, f"{scenario.name} is slower than its baseline"
+    assert result["peak_kib"] <= baseline["peak_kib"] * MEMORY_TOLERANCE + MEMORY_SLACK_KIB, f"{scenario.name} uses more memory than its baseline"
+
+
+@pytest.mark.parametrize("scenario", SINGLE_USER_SCENARIOS, ids=lambda s: s.name)
+def test_bench_find_free_slots(scenario):
+    check_against_baseline(scenario, measure(single_user_runner(scenario)))
+
+
+@pytest.mark.parametrize("scenario", MULTI_USER_SCENARIOS, ids=lambda s: s.name)
+def test_bench_find_free_slots_for_multiple_users(scenario):
+    check_against_baseline(scenario, measure(multi_user_runner(scenario)))
+
+
+@pytest.mark.skipif(os.environ.get("BENCH_FULL_MATRIX") != "1", reason="set BENCH_FULL_MATRIX=1 to run the full matrix")
+@pytest.mark.parametrize("scenario", FULL_MATRIX_SCENARIOS, ids=lambda s: s.name)
+def test_bench_full_matrix(scenario):
+    runner = single_user_runner(scenario) if scenario.attendees == 1 else multi_user_runner(scenario)
+    check_against_baseline(scenario, measure(runner))
@@ -0,0 +1,11 @@
+import pytest
+
+from julian_gregory import freebusy
+
+
+@pytest.fixture(autouse=True)
+def clear_freebusy_cache():
+    """Every test starts with an empty freebusy cache, as the fake calendars differ from test to test."""
+    freebusy.get_busy_cache.cache_clear()
+    yield
+    freebusy.get_busy_cache.cache_clear()
@@ -0,0 +1,539 @@
+"""
+A localhost fake of the Google Calendar v3 endpoints used by the tools.
+
+    with FakeCalendarApi(latency_seconds=0.05) as api:
+        api.add_event("primary", "Standup", start, end)
+        os.environ["CALENDAR_API_BASE_URL"] = api.url
+        os.environ["OAUTH2_API_BASE_URL"] = api.url
+        ...
+
+Supports calendars.get, calendarList.list, events.list/get/insert/patch/delete (with incremental sync tokens),
+events.watch and channels.stop, freebusy.query, Gmail messages.list/get, history.list and getProfile, batch requests
+and oauth2 userinfo.get,
+with configurable latency, random or scheduled error injection and a simple per-second and total quota. Point
+GMAIL_API_BASE_URL at the same url for Gmail; messages.list only understands plain words and {a b} alternatives.
+
+Watched calendars send push notifications to their channels' addresses, like Google does: a "sync" message when
+the channel opens and an "exists" message whenever one of the calendar's events changes.
+"""
+import base64
+import datetime
+import email.parser
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+DEFAULT_PAGE_SIZE = 250
+FREEBUSY_MAX_CALENDARS = 50
+
+
+class FakeCalendarApi:
+    def __init__(self, user_email: str = "user@example.com", time_zone: str = "America/Los_Angeles",
+                 latency_seconds: float = 0.0, latency_jitter_seconds: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, quota_per_second: float | None = None, quota_total: int | None = None,
+                 seed: int = 0):
+        self.user_email = user_email
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.quota_per_second = quota_per_second
+        self.quota_total = quota_total
+        self.calendars = {user_email: {"kind": "calendar#calendar", "id": user_email, "summary": user_email, "timeZone": time_zone}}
+        # The user's calendar list: calendar id -> accessRole and display flags
+        self.calendar_list = {user_email: {"accessRole": "owner", "primary": True, "selected": True}}
+        self.events: dict[str, dict[str, dict]] = {user_email: {}}
+        # Every request served, as (method, path) tuples, batch parts included
+        self.requests: list[tuple[str, str]] = []
+        # The number of parts of every batch request served
+        self.batches: list[int] = []
+        self._scheduled_errors: list[int] = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # Change number of the latest change to each event, by calendar, for incremental sync
+        self._changes: dict[str, dict[str, int]] = {}
+        self._change_numbers = itertools.count(1)
+        self._last_change = 0
+        self._min_sync_token = 0
+        # Open push notification channels by id, and every notification sent as (channel id, state, response status)
+        self.channels: dict[str, dict] = {}
+        self.notifications: list[tuple[str, str, int | None]] = []
+        # The user's mailbox, newest message last, and its history as (history id, "messagesAdded" or "messagesDeleted", message id)
+        self.messages: dict[str, dict] = {}
+        self._history: list[tuple[int, str, str]] = []
+        self._min_history_id = 0
+        self._request_count = 0
+        self._bucket = quota_per_second or 0.0
+        self._bucket_updated = time.monotonic()
+        self._server = None
+        self._thread = None
+
+    # Server lifecycle
+
+    def start(self) -> "FakeCalendarApi":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/"
+
+    # Test data and fault injection
+
+    def add_calendar(self, calendar_id: str, time_zone: str = "UTC", summary: str | None = None, access_role: str | None = None,
+                     selected: bool = True):
+        """Adds a calendar; with an access_role it also appears in the user's calendar list."""
+        with self._lock:
+            self.calendars[calendar_id] = {"kind": "calendar#calendar", "id": calendar_id, "summary": summary or calendar_id, "timeZone": time_zone}
+            self.events.setdefault(calendar_id, {})
+            if access_role:
+                self.calendar_list[calendar_id] = {"accessRole": access_role, "selected": selected}
+
+    def add_event(self, calendar_id: str, summary: str, start: datetime.datetime | datetime.date, end: datetime.datetime | datetime.date,
+                  **fields) -> dict:
+        """Adds an event; dates (not datetimes) create all-day events."""
+        def time_field(value):
+            if isinstance(value, datetime.datetime):
+                return {"dateTime": value.isoformat()}
+            return {"date": value.isoformat()}
+
+        event = {"summary": summary, "start": time_field(start), "end": time_field(end), **fields}
+        with self._lock:
+            return self._insert_event(self._resolve(calendar_id), event)
+
+    def add_message(self, subject: str, body: str, sender: str = "events@example.com", html: str | None = None,
+                    date: datetime.datetime | None = None, label_ids: list[str] | None = None) -> dict:
+        """Adds an email with a text/plain body, and a text/html alternative if html is given."""
+        date = date or datetime.datetime.now(datetime.UTC)
+
+        def part(part_id, mime_type, text):
+            data = base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+            return {"partId": part_id, "mimeType": mime_type, "filename": "", "body": {"size": len(text), "data": data}}
+
+        headers = [{"name": "From", "value": sender}, {"name": "To", "value": self.user_email}, {"name": "Subject", "value": subject},
+                   {"name": "Date", "value": date.strftime("%a, %d %b %Y %H:%M:%S %z")}]
+        if html is None:
+            payload = {"partId": "", "headers": headers, **part("", "text/plain", body)}
+        else:
+            payload = {"partId": "", "mimeType": "multipart/alternative", "filename": "", "headers": headers, "body": {"size": 0},
+                       "parts": [part("0", "text/plain", body), part("1", "text/html", html)]}
+        with self._lock:
+            message_id = f"msg{next(self._ids)}"
+            message = self.messages[message_id] = {
+                "id": message_id,
+                "threadId": message_id,
+                "labelIds": label_ids or ["INBOX"],
+                "snippet": " ".join(body.split())[:200],
+                "internalDate": str(int(date.timestamp() * 1000)),
+                "payload": payload,
+            }
+            self._history.append((next(self._change_numbers), "messagesAdded", message_id))
+            return message
+
+    def delete_message(self, message_id: str):
+        with self._lock:
+            del self.messages[message_id]
+            self._history.append((next(self._change_numbers), "messagesDeleted", message_id))
+
+    def expire_gmail_history(self):
+        """Makes history.list fail with 404 for every history id handed out so far, forcing a full scan."""
+        with self._lock:
+            self._min_history_id = self._history_id() + 1
+
+    def _history_id(self) -> int:
+        return self._history[-1][0] if self._history else 1
+
+    def update_event(self, calendar_id: str, event_id: str, **fields) -> dict:
+        with self._lock:
+            calendar_id = self._resolve(calendar_id)
+            event = self.events[calendar_id][event_id] = {**self.events[calendar_id][event_id], **fields}
+            self._changed(calendar_id, event_id)
+            return event
+
+    def delete_event(self, calendar_id: str, event_id: str):
+        """Deletes an event; like the real API it stays visible as cancelled to incremental syncs and showDeleted."""
+        with self._lock:
+            calendar_id = self._resolve(calendar_id)
+            self.events[calendar_id][event_id]["status"] = "cancelled"
+            self._changed(calendar_id, event_id)
+
+    def expire_sync_tokens(self):
+        """Makes every sync token issued so far fail with 410 Gone, forcing a full sync."""
+        with self._lock:
+            self._min_sync_token = self._last_change + 1
+
+    def fail_next(self, count: int = 1, status: int = 503):
+        """Makes the next `count` requests fail with `status`."""
+        with self._lock:
+            self._scheduled_errors.extend([status] * count)
+
+    # Request handling
+
+    def _resolve(self, calendar_id: str) -> str:
+        return self.user_email if calendar_id == "primary" else calendar_id
+
+    def _insert_event(self, calendar_id: str, event: dict) -> dict:
+        event_id = event.get("id") or f"evt{next(self._ids)}"
+        event = {
+            "kind": "calendar#event",
+            "id": event_id,
+            "status": "confirmed",
+            "htmlLink": f"https://calendar.google.com/event?eid={event_id}",
+            "organizer": {"email": calendar_id, "self": calendar_id == self.user_email},
+            "updated": datetime.datetime.now(datetime.UTC).isoformat(),
+            **event,
+        }
+        self.events.setdefault(calendar_id, {})[event_id] = event
+        self._changed(calendar_id, event_id)
+        return event
+
+    def _changed(self, calendar_id: str, event_id: str):
+        self._last_change = next(self._change_numbers)
+        self._changes.setdefault(calendar_id, {})[event_id] = self._last_change
+        self.events[calendar_id][event_id]["updated"] = datetime.datetime.now(datetime.UTC).isoformat()
+        for channel in list(self.channels.values()):
+            if channel["calendarId"] == calendar_id:
+                self._notify(channel, "exists")
+
+    def _notify(self, channel: dict, state: str):
+        """POSTs a notification to the channel's address; the receiver doesn't call back into the fake, so the lock can be held."""
+        channel["messageNumber"] += 1
+        headers = {
+            "X-Goog-Channel-ID": channel["id"],
+            "X-Goog-Channel-Token": channel.get("token", ""),
+            "X-Goog-Channel-Expiration": channel["expirationTime"],
+            "X-Goog-Resource-ID": channel["resourceId"],
+            "X-Goog-Resource-URI": channel["resourceUri"],
+            "X-Goog-Resource-State": state,
+            "X-Goog-Message-Number": str(channel["messageNumber"]),
+        }
+        try:
+            with urllib.request.urlopen(urllib.request.Request(channel["address"], data=b"", headers=headers, method="POST"), timeout=5) as response:
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except urllib.error.URLError:
+            status = None
+        self.notifications.append((channel["id"], state, status))
+
+    def _watch(self, calendar_id: str, payload: dict) -> tuple[int, dict]:
+        if payload.get("type") != "web_hook" or not payload.get("address") or not payload.get("id"):
+            return _error(400, "invalid")
+        ttl = int(payload.get("params", {}).get("ttl", 7 * 24 * 60 * 60))
+        expiration = int((time.time() + ttl) * 1000)
+        channel = {
+            "id": payload["id"],
+            "resourceId": f"resource-{calendar_id}",
+            "resourceUri": f"{self.url}calendar/v3/calendars/{calendar_id}/events?alt=json",
+            "address": payload["address"],
+            "token": payload.get("token"),
+            "calendarId": calendar_id,
+            "expirationTime": datetime.datetime.fromtimestamp(expiration / 1000, datetime.UTC).strftime("%a, %d %b %Y %H:%M:%S GMT"),
+            "messageNumber": 0,
+        }
+        self.channels[channel["id"]] = channel
+        self._notify(channel, "sync")
+        return 200, {"kind": "api#channel", "id": channel["id"], "resourceId": channel["resourceId"], "resourceUri": channel["resourceUri"],
+                     "token": channel["token"], "expiration": str(expiration)}
+
+    def _fault(self) -> tuple[int, dict] | None:
+        """Returns an error response if latency/quota/error injection says this request should fail."""
+        delay = self.latency_seconds + self._random.uniform(0, self.latency_jitter_seconds)
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self._request_count += 1
+            if self._scheduled_errors:
+                return _error(self._scheduled_errors.pop(0), "backendError")
+            if self.quota_total is not None and self._request_count > self.quota_total:
+                return _error(403, "quotaExceeded")
+            if self.quota_per_second:
+                now = time.monotonic()
+                self._bucket = min(self.quota_per_second, self._bucket + (now - self._bucket_updated) * self.quota_per_second)
+                self._bucket_updated = now
+                if self._bucket < 1:
+                    return _error(403, "rateLimitExceeded")
+                self._bucket -= 1
+            if self.error_rate and self._random.random() < self.error_rate:
+                return _error(self.error_status, "backendError")
+        return None
+
+    def handle(self, method: str, raw_path: str, headers, body: bytes) -> tuple[int, dict]:
+        """Dispatches a single (non-batch) API request and returns (status, json body)."""
+        parsed = urlparse(raw_path)
+        path = parsed.path
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        with self._lock:
+            self.requests.append((method, path))
+
+        if not headers.get("Authorization", "").startswith("Bearer "):
+            return _error(401, "authError")
+        fault = self._fault()
+        if fault:
+            return fault
+
+        payload = json.loads(body) if body else {}
+        if method == "GET" and path == "/oauth2/v2/userinfo":
+            return 200, {"id": "1", "email": self.user_email, "verified_email": True}
+        if method == "POST" and path == "/calendar/v3/freeBusy":
+            if len(payload.get("items", [])) > FREEBUSY_MAX_CALENDARS:
+                return _error(400, "tooManyCalendarsRequested")
+            return 200, self._freebusy(payload)
+        if method == "GET" and path == "/gmail/v1/users/me/profile":
+            with self._lock:
+                return 200, {"emailAddress": self.user_email, "messagesTotal": len(self.messages), "historyId": str(self._history_id())}
+        if method == "GET" and path == "/gmail/v1/users/me/history":
+            return self._list_history(query)
+        if method == "GET" and path == "/gmail/v1/users/me/messages":
+            return 200, self._list_messages(query)
+        match = re.fullmatch(r"/gmail/v1/users/me/messages/([^/]+)", path)
+        if method == "GET" and match:
+            return self._get_message(match.group(1), query, parse_qs(urlparse(raw_path).query).get("metadataHeaders", []))
+        if method == "POST" and path == "/calendar/v3/channels/stop":
+            with self._lock:
+                channel = self.channels.get(payload.get("id"))
+                if channel is None or channel["resourceId"] != payload.get("resourceId"):
+                    return _error(404, "notFound")
+                del self.channels[payload["id"]]
+            return 204, None
+        if method == "GET" and path == "/calendar/v3/users/me/calendarList":
+            with self._lock:
+                items = [{"kind": "calendar#calendarListEntry", **self.calendars[calendar_id], **entry}
+                         for calendar_id, entry in self.calendar_list.items()]
+            return 200, {"kind": "calendar#calendarList", "items": items}
+
+        match = re.fullmatch(r"/calendar/v3/calendars/([^/]+)(/events(?:/([^/]+))?)?", path)
+        if not match:
+            return _error(404, "notFound")
+        calendar_id = self._resolve(unquote(match.group(1)))
+        with self._lock:
+            if calendar_id not in self.calendars:
+                return _error(404, "notFound")
+            if not match.group(2):
+                return 200, self.calendars[calendar_id]
+
+            events = self.events[calendar_id]
+            event_id = match.group(3) and unquote(match.group(3))
+            if event_id is None and method == "GET":
+                return self._list_events(calendar_id, query)
+            if event_id is None and method == "POST":
+                if payload.get("id") in events:
+                    return _error(409, "duplicate")
+                return 200, self._insert_event(calendar_id, payload)
+            if event_id == "watch" and method == "POST":
+                return self._watch(calendar_id, payload)
+            if event_id not in events:
+                return _error(404, "notFound")
+            if method == "GET":
+                return 200, events[event_id]
+            if method in ("PATCH", "PUT"):
+                events[event_id] = {**events[event_id], **payload, "id": event_id}
+                self._changed(calendar_id, event_id)
+                return 200, events[event_id]
+            if method == "DELETE":
+                events[event_id]["status"] = "cancelled"
+                self._changed(calendar_id, event_id)
+                return 204, None
+        return _error(405, "methodNotAllowed")
+
+    def _list_events(self, calendar_id: str, query: dict) -> tuple[int, dict]:
+        if "syncToken" in query:
+            sync_token = int(query["syncToken"])
+            if sync_token < self._min_sync_token:
+                return _error(410, "fullSyncRequired")
+            # Everything changed since the token, deletions included, in the order it changed
+            changes = self._changes.get(calendar_id, {})
+            items = sorted((changes[event_id], event) for event_id, event in self.events[calendar_id].items() if changes.get(event_id, 0) > sync_token)
+        else:
+            time_min = _parse_time(query["timeMin"]) if "timeMin" in query else None
+            time_max = _parse_time(query["timeMax"]) if "timeMax" in query else None
+            items = []
+            for event in self.events[calendar_id].values():
+                if event.get("status") == "cancelled" and query.get("showDeleted") != "true":
+                    continue
+                start, end = _event_bounds(event, self.calendars[calendar_id]["timeZone"])
+                if time_min and end <= time_min or time_max and start >= time_max:
+                    continue
+                items.append((start, event))
+            items.sort(key=lambda item: item[0])
+
+        offset = int(query.get("pageToken", 0))
+        page_size = min(int(query.get("maxResults", DEFAULT_PAGE_SIZE)), 2500)
+        page = [event for _, event in items[offset:offset + page_size]]
+        response = {
+            "kind": "calendar#events",
+            "summary": calendar_id,
+            "timeZone": self.calendars[calendar_id]["timeZone"],
+            "items": page,
+        }
+        if offset + page_size < len(items):
+            response["nextPageToken"] = str(offset + page_size)
+        elif not {"orderBy", "q"} & query.keys():
+            # Like the real API, only listings that can be continued incrementally end with a sync token; a time
+            # window only bounds the first listing, and later changes are returned wherever they are
+            response["nextSyncToken"] = str(self._last_change)
+        return 200, response
+
+    def _list_messages(self, query: dict) -> dict:
+        words = re.findall(r"\{[^}]*\}|\S+", query.get("q", "").lower())
+        matches = []
+        with self._lock:
+            for message in reversed(self.messages.values()):
+                text = (self._header(message, "Subject") + " " + self._message_text(message)).lower()
+                if all(any(option in text for option in word.strip("{}").split()) for word in words if ":" not in word):
+                    matches.append({"id": message["id"], "threadId": message["threadId"]})
+        offset = int(query.get("pageToken", 0))
+        page_size = int(query.get("maxResults", 100))
+        response = {"messages": matches[offset:offset + page_size], "resultSizeEstimate": len(matches)}
+        if offset + page_size < len(matches):
+            response["nextPageToken"] = str(offset + page_size)
+        return response
+
+    def _list_history(self, query: dict) -> tuple[int, dict]:
+        start = int(query["startHistoryId"])
+        with self._lock:
+            if start < self._min_history_id:
+                return _error(404, "notFound")
+            history = [
+                {"id": str(history_id), kind: [{"message": {"id": message_id, "threadId": message_id,
+                                                            "labelIds": self.messages.get(message_id, {}).get("labelIds", [])}}]}
+                for history_id, kind, message_id in self._history if history_id > start
+            ]
+            return 200, {"history": history, "historyId": str(self._history_id())}
+
+    def _get_message(self, message_id: str, query: dict, metadata_headers: list[str]) -> tuple[int, dict]:
+        with self._lock:
+            message = self.messages.get(message_id)
+        if message is None:
+            return _error(404, "notFound")
+        if query.get("format") != "metadata":
+            return 200, message
+        wanted = {name.lower() for name in metadata_headers}
+        headers = [header for header in message["payload"]["headers"] if not wanted or header["name"].lower() in wanted]
+        return 200, {**message, "payload": {"mimeType": message["payload"]["mimeType"], "headers": headers}}
+
+    @staticmethod
+    def _header(message: dict, name: str) -> str:
+        return next((header["value"] for header in message["payload"]["headers"] if header["name"] == name), "")
+
+    @staticmethod
+    def _message_text(message: dict) -> str:
+        parts = message["payload"].get("parts") or [message["payload"]]
+        return " ".join(base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8") for part in parts if part["mimeType"] == "text/plain")
+
+    def _freebusy(self, query: dict) -> dict:
+        time_min, time_max = _parse_time(query["timeMin"]), _parse_time(query["timeMax"])
+        calendars = {}
+        with self._lock:
+            for item in query.get("items", []):
+                calendar_id = self._resolve(item["id"])
+                if calendar_id not in self.calendars:
+                    calendars[item["id"]] = {"errors": [{"domain": "global", "reason": "notFound"}], "busy": []}
+                    continue
+                busy = []
+                for event in self.events[calendar_id].values():
+                    if event.get("transparency") == "transparent" or event.get("status") == "cancelled":
+                        continue
+                    start, end = _event_bounds(event, self.calendars[calendar_id]["timeZone"])
+                    if end <= time_min or start >= time_max:
+                        continue
+                    busy.append((max(start, time_min), min(end, time_max)))
+                busy.sort()
+                calendars[item["id"]] = {"busy": [{"start": _format_time(start), "end": _format_time(end)} for start, end in busy]}
+        return {"kind": "calendar#freeBusy", "timeMin": query["timeMin"], "timeMax": query["timeMax"], "calendars": calendars}
+
+    def handle_batch(self, content_type: str, body: bytes) -> tuple[str, bytes]:
+        """Runs each part of a multipart/mixed batch and returns the multipart response."""
+        message = email.parser.Parser().parsestr(f"Content-Type: {content_type}\r\n\r\n" + body.decode("utf-8"))
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        with self._lock:
+            self.batches.append(len(message.get_payload()))
+        for part in message.get_payload():
+            request_line, _, rest = part.get_payload().partition("\n")
+            method, path, _ = request_line.strip().split(" ")
+            inner = email.parser.Parser().parsestr(rest)
+            status, response = self.handle(method, path, inner, inner.get_payload().encode("utf-8"))
+            # Long Content-IDs arrive folded over two lines
+            content_id = " ".join(part["Content-ID"].split()).replace("<", "<response-", 1)
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{'' if response is None else json.dumps(response)}\r\n"
+            )
+        return f"multipart/mixed; boundary={boundary}", ("".join(parts) + f"--{boundary}--\r\n").encode("utf-8")
+
+
+def _error(status: int, reason: str) -> tuple[int, dict]:
+    return status, {"error": {"code": status, "message": reason, "errors": [{"domain": "global", "reason": reason, "message": reason}]}}
+
+
+def _parse_time(value: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value)
+
+
+def _format_time(value: datetime.datetime) -> str:
+    return value.astimezone(datetime.UTC).isoformat().replace("+00:00", "Z")
+
+
+def _event_bounds(event: dict, time_zone: str) -> tuple[datetime.datetime, datetime.datetime]:
+    from zoneinfo import ZoneInfo
+
+    def bound(field):
+        if "dateTime" in field:
+            return _parse_time(field["dateTime"])
+        date = datetime.date.fromisoformat(field["date"])
+        return datetime.datetime(date.year, date.month, date.day, tzinfo=ZoneInfo(field.get("timeZone", time_zone)))
+
+    return bound(event["start"]), bound(event["end"])
+
+
+def _make_handler(api: FakeCalendarApi):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self, status: int, body: bytes, content_type: str = "application/json; charset=UTF-8"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _dispatch(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path == "/batch" or self.path.startswith("/batch/"):
+                content_type, content = api.handle_batch(self.headers["Content-Type"], body)
+                self._respond(200, content, content_type)
+                return
+            status, response = api.handle(self.command, self.path, self.headers, body)
+            self._respond(status, b"" if response is None else json.dumps(response).encode("utf-8"))
+
+        do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _dispatch
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
@@ -0,0 +1,285 @@
+"""
+Concurrent-session load harness for root_agent, with a scripted stub model and the fake Calendar API.
+
+    uv run python -m tests.load.agent_load --sessions 50 --concurrency 9 --model-latency-ms 800
+    uv run python -m tests.load.agent_load --sessions 200 --concurrency 20 --output load.json
+
+Each session plays SCRIPT turn by turn. A semaphore of size --concurrency stands in for
+container_concurrency in deploy.py: turns beyond it wait for admission, like requests queued
+in front of a full container. Per turn we time admission wait, model calls and tool calls, and
+a monitor task measures event-loop lag. The tools are synchronous and Runner.run_async calls
+them on the event loop (ADK's tool thread pool only applies to live mode), so Google API latency
+shows up there as lag shared by every in-flight turn.
+"""
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+from collections.abc import AsyncGenerator
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from julian_gregory.agent import root_agent
+from julian_gregory.scopes import AUTHORIZER_NAME
+from tests.fakes.fake_calendar_api import FakeCalendarApi
+
+TIME_ZONE = ZoneInfo("America/Los_Angeles")
+APP_NAME = "julian_gregory_load"
+
+
+def _tomorrow_at(hour: int) -> str:
+    now = datetime.datetime.now(TIME_ZONE)
+    return (datetime.datetime(now.year, now.month, now.day, hour, tzinfo=TIME_ZONE) + datetime.timedelta(days=1)).isoformat()
+
+
+@dataclasses.dataclass
+class Turn:
+    """A user message, the tool calls the stub model makes in reply, and its final answer."""
+    message: str
+    tool_calls: list[tuple[str, dict]]
+    reply: str
+
+
+# A typical "find a time and book it" conversation
+SCRIPT = [
+    Turn(
+        "Find an hour with alex@example.com in the next few days",
+        [("get_now", {}), ("find_free_slots_for_multiple_users", {"user_emails": ["alex@example.com"], "time_delta_in_days": 3})],
+        "Here are three slots that work for both of you.",
+    ),
+    Turn(
+        "Book the first one and invite Alex",
+        [("set_calendar_entry", {"location": "", "summary": "Sync with Alex", "description": "",
+                                 "start_datetime_isoformat": _tomorrow_at(10), "end_datetime_isoformat": _tomorrow_at(11)})],
+        "Booked. I've added the meeting to your calendar.",
+    ),
+]
+
+
+class ScriptedLlm(BaseLlm):
+    """Replays SCRIPT: works out the turn from the last user message and the step from the tool responses since."""
+    latency_seconds: float = 0.0
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.latency_seconds)
+        message, step = "", 0
+        for content in llm_request.contents:
+            for part in content.parts or []:
+                if part.text and content.role == "user":
+                    message, step = part.text, 0
+                elif part.function_response:
+                    step += 1
+        turn = next((turn for turn in SCRIPT if turn.message == message), None)
+
+        if turn is not None and step < len(turn.tool_calls):
+            name, args = turn.tool_calls[step]
+            part = types.Part(function_call=types.FunctionCall(name=name, args=args))
+        else:
+            part = types.Part.from_text(text=turn.reply if turn else "Done.")
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+@dataclasses.dataclass
+class TurnTiming:
+    admission_wait: float
+    latency: float
+    model: float
+    tools: float
+
+
+class CallTimer:
+    """Agent callbacks that sum model and tool time per invocation (turn)."""
+
+    def __init__(self):
+        self.started: dict[str, float] = {}
+        self.model: dict[str, float] = {}
+        self.tools: dict[str, float] = {}
+
+    def _stop(self, key: str, totals: dict[str, float], invocation_id: str):
+        start = self.started.pop(key, None)
+        if start is not None:
+            totals[invocation_id] = totals.get(invocation_id, 0.0) + time.perf_counter() - start
+
+    def before_model(self, callback_context, llm_request):
+        self.started[callback_context.invocation_id] = time.perf_counter()
+
+    def after_model(self, callback_context, llm_response):
+        self._stop(callback_context.invocation_id, self.model, callback_context.invocation_id)
+
+    def before_tool(self, tool, args, tool_context):
+        self.started[tool_context.function_call_id] = time.perf_counter()
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        self._stop(tool_context.function_call_id, self.tools, tool_context.invocation_id)
+
+
+def stub_agent_tree(agent, model: BaseLlm, timer: CallTimer):
+    """Clones the agent tree with every agent using the stub model and the timing callbacks."""
+    return agent.clone(update={
+        "model": model,
+        "sub_agents": [stub_agent_tree(sub_agent, model, timer) for sub_agent in agent.sub_agents],
+        "before_model_callback": timer.before_model,
+        "after_model_callback": timer.after_model,
+        "before_tool_callback": timer.before_tool,
+        "after_tool_callback": timer.after_tool,
+    })
+
+
+async def _monitor_loop_lag(lags: list[float], interval: float = 0.01):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(percentile) - 1]
+
+
+def _summary_ms(values: list[float]) -> dict:
+    return {
+        "p50": _percentile(values, 50) * 1000,
+        "p95": _percentile(values, 95) * 1000,
+        "p99": _percentile(values, 99) * 1000,
+        "max": max(values, default=0.0) * 1000,
+    }
+
+
+async def run_load(sessions: int, concurrency: int, model_latency_ms: float, api_latency_ms: float) -> dict:
+    """Runs `sessions` concurrent conversations and returns the report."""
+    with FakeCalendarApi(time_zone=str(TIME_ZONE), latency_seconds=api_latency_ms / 1000) as api, \
+            patch.dict(os.environ, {"CALENDAR_API_BASE_URL": api.url, "OAUTH2_API_BASE_URL": api.url}):
+        api.add_calendar("alex@example.com", time_zone="Europe/London")
+
+        model = ScriptedLlm(model="scripted-stub", latency_seconds=model_latency_ms / 1000)
+        timer = CallTimer()
+        agent = stub_agent_tree(root_agent, model, timer)
+        session_service = InMemorySessionService()
+        runner = Runner(agent=agent, session_service=session_service, app_name=APP_NAME)
+        admission = asyncio.Semaphore(concurrency)
+        timings: list[TurnTiming] = []
+        errors: list[str] = []
+
+        async def run_session(index: int):
+            user_id = f"user{index}"
+            session = await session_service.create_session(app_name=APP_NAME, user_id=user_id, state={AUTHORIZER_NAME: "fake-token"})
+            for turn in SCRIPT:
+                queued = time.perf_counter()
+                async with admission:
+                    admitted = time.perf_counter()
+                    invocation_id = None
+                    try:
+                        async for event in runner.run_async(user_id=user_id, session_id=session.id,
+                                                            new_message=types.Content(role="user", parts=[types.Part.from_text(text=turn.message)])):
+                            invocation_id = event.invocation_id
+                            if event.error_message:
+                                errors.append(event.error_message)
+                    except Exception as error:
+                        errors.append(repr(error))
+                    finished = time.perf_counter()
+                timings.append(TurnTiming(
+                    admission_wait=admitted - queued,
+                    latency=finished - queued,
+                    model=timer.model.pop(invocation_id, 0.0),
+                    tools=timer.tools.pop(invocation_id, 0.0),
+                ))
+
+        lags: list[float] = []
+        monitor = asyncio.create_task(_monitor_loop_lag(lags))
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        cpu_before = time.process_time()
+        start = time.perf_counter()
+        await asyncio.gather(*(run_session(index) for index in range(sessions)))
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_before
+        rss_growth_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+        monitor.cancel()
+
+    turns = len(timings)
+    service_times = [t.latency - t.admission_wait for t in timings]
+    mean_latency = statistics.fmean(t.latency for t in timings) if timings else 0.0
+    breakdown = {
+        "admission_wait": statistics.fmean(t.admission_wait for t in timings),
+        "model": statistics.fmean(t.model for t in timings),
+        "tools": statistics.fmean(t.tools for t in timings),
+    } if timings else {}
+    breakdown["framework_and_loop"] = max(mean_latency - sum(breakdown.values()), 0.0)
+    return {
+        "config": {
+            "sessions": sessions,
+            "concurrency": concurrency,
+            "model_latency_ms": model_latency_ms,
+            "api_latency_ms": api_latency_ms,
+        },
+        "turns": turns,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "elapsed_seconds": elapsed,
+        "throughput_turns_per_second": turns / elapsed if elapsed else 0.0,
+        "turn_latency_ms": _summary_ms([t.latency for t in timings]),
+        "admission_wait_ms": _summary_ms([t.admission_wait for t in timings]),
+        # Time from admission to the end of the turn, the input of app_utils.sizing
+        "service_time_ms": {
+            **_summary_ms(service_times),
+            "mean": statistics.fmean(service_times) * 1000 if service_times else 0.0,
+        },
+        "event_loop_lag_ms": _summary_ms(lags),
+        "mean_turn_breakdown_ms": {name: seconds * 1000 for name, seconds in breakdown.items()},
+        "cpu_ms_per_session": cpu / sessions * 1000,
+        "cpu_utilisation": cpu / elapsed if elapsed else 0.0,
+        "peak_rss_growth_kb_per_session": rss_growth_kb / sessions,
+        "api_requests": len(api.requests),
+    }
+
+
+def print_report(report: dict):
+    config = report["config"]
+    print(f"{config['sessions']} sessions, concurrency {config['concurrency']}, model {config['model_latency_ms']:.0f}ms, "
+          f"API {config['api_latency_ms']:.0f}ms")
+    print(f"{report['turns']} turns in {report['elapsed_seconds']:.2f}s, {report['throughput_turns_per_second']:.1f} turns/s, {report['errors']} errors")
+    for name in ("turn_latency_ms", "admission_wait_ms", "service_time_ms", "event_loop_lag_ms"):
+        values = report[name]
+        print(f"  {name:<20} p50 {values['p50']:8.1f}  p95 {values['p95']:8.1f}  p99 {values['p99']:8.1f}  max {values['max']:8.1f}")
+    total = sum(report["mean_turn_breakdown_ms"].values()) or 1.0
+    print("  mean turn breakdown: " + ", ".join(
+        f"{name} {ms:.1f}ms ({ms / total:.0%})" for name, ms in report["mean_turn_breakdown_ms"].items()))
+    print(f"  CPU {report['cpu_ms_per_session']:.1f}ms/session ({report['cpu_utilisation']:.0%} of one core), "
+          f"peak RSS +{report['peak_rss_growth_kb_per_session']:.0f}KB/session, {report['api_requests']} API requests")
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent sessions to run")
+    parser.add_argument("--concurrency", type=int, default=9, help="Turns admitted at once, as container_concurrency in deploy.py")
+    parser.add_argument("--model-latency-ms", type=float, default=500.0, help="Simulated latency of each model call")
+    parser.add_argument("--api-latency-ms", type=float, default=50.0, help="Latency of each fake Calendar API request")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_load(args.sessions, args.concurrency, args.model_latency_ms, args.api_latency_ms))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main()["errors"] == 0 else 1)
@@ -0,0 +1,17 @@
+import pytest
+
+from tests.load.agent_load import SCRIPT, run_load
+
+
+@pytest.mark.asyncio
+async def test_agent_load_smoke():
+    """Tests that the harness drives every scripted turn through the stubbed agent and reports queueing."""
+    report = await run_load(sessions=4, concurrency=2, model_latency_ms=0, api_latency_ms=20)
+
+    assert report["errors"] == 0, report["error_samples"]
+    assert report["turns"] == 4 * len(SCRIPT)
+    # get_now makes one calendars.get, find_free_slots_for_multiple_users a calendars.get and one for the attendee's
+    # time zone, set_calendar_entry a calendars.get and an insert; the attendee's freebusy is fetched once and then cached
+    assert report["api_requests"] == 4 * 5 + 1
+    assert report["admission_wait_ms"]["max"] > 0
+    assert report["mean_turn_breakdown_ms"]["tools"] > 0
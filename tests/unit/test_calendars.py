@@ -0,0 +1,114 @@
+import datetime
+from types import SimpleNamespace
+from urllib.parse import unquote
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from julian_gregory.scopes import AUTHORIZER_NAME
+from julian_gregory.tools import (
+    CALENDARS_STATE_KEY,
+    add_attendees_to_event,
+    find_free_slots,
+    get_upcoming_events,
+    list_calendars,
+    reschedule_event,
+    select_calendars,
+)
+from tests.fakes.fake_calendar_api import FakeCalendarApi
+
+TIME_ZONE = ZoneInfo("America/Los_Angeles")
+USER_EMAIL = "alice@example.com"
+TEAM_CALENDAR = "team@group.calendar.google.com"
+PERSONAL_CALENDAR = "personal@group.calendar.google.com"
+HOLIDAYS_CALENDAR = "en.usa#holiday@group.v.calendar.google.com"
+
+
+def tomorrow_at(hour: int, minute: int = 0) -> datetime.datetime:
+    now = datetime.datetime.now(TIME_ZONE)
+    return datetime.datetime(now.year, now.month, now.day, hour, minute, tzinfo=TIME_ZONE) + datetime.timedelta(days=1)
+
+
+@pytest.fixture
+def tool_context():
+    return SimpleNamespace(state={AUTHORIZER_NAME: "token"})
+
+
+@pytest.fixture
+def api(monkeypatch):
+    with FakeCalendarApi(user_email=USER_EMAIL, time_zone=str(TIME_ZONE)) as api:
+        api.add_calendar(TEAM_CALENDAR, access_role="writer")
+        api.add_calendar(PERSONAL_CALENDAR, access_role="owner", selected=False)
+        api.add_calendar(HOLIDAYS_CALENDAR, access_role="reader")
+        api.add_event("primary", "Standup", tomorrow_at(9), tomorrow_at(9, 30), iCalUID="standup@example.com")
+        api.add_event(TEAM_CALENDAR, "Standup", tomorrow_at(9), tomorrow_at(9, 30), iCalUID="standup@example.com")
+        api.add_event(TEAM_CALENDAR, "Team offsite planning", tomorrow_at(11), tomorrow_at(12))
+        api.add_event(PERSONAL_CALENDAR, "Gym", tomorrow_at(13), tomorrow_at(14))
+        api.add_event(HOLIDAYS_CALENDAR, "Someone's birthday", tomorrow_at(15), tomorrow_at(16))
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        yield api
+
+
+def test_events_from_all_selected_calendars(api, tool_context):
+    """Tests that owned or writable selected calendars are listed in one batch and merged in start order."""
+    events = get_upcoming_events(tool_context, time_delta_in_days=3)
+
+    assert [(event["summary"], event["calendarId"]) for event in events] == [
+        ("Standup", "primary"),
+        ("Team offsite planning", TEAM_CALENDAR),
+    ]
+    assert tool_context.state[CALENDARS_STATE_KEY]["ids"] == ["primary", TEAM_CALENDAR]
+    assert [unquote(path) for method, path in api.requests if "/events" in path] == [
+        "/calendar/v3/calendars/primary/events", f"/calendar/v3/calendars/{TEAM_CALENDAR}/events",
+    ]
+
+
+def test_secondary_calendars_block_free_slots(api, tool_context):
+    """Tests that busy time on a secondary calendar is not offered as a free slot."""
+    starts = [slot["start"] for slot in find_free_slots(tool_context, time_delta_in_days=1)]
+
+    if tomorrow_at(8).weekday() >= 5:
+        pytest.skip("no business hours tomorrow")
+    assert tomorrow_at(11).isoformat() not in starts
+    assert tomorrow_at(13).isoformat() in starts
+
+
+def test_selection_is_cached_and_can_be_changed(api, tool_context):
+    """Tests that calendarList is read once, and that select_calendars replaces the selection."""
+    get_upcoming_events(tool_context)
+    get_upcoming_events(tool_context)
+    assert api.requests.count(("GET", "/calendar/v3/users/me/calendarList")) == 1
+
+    result = select_calendars(tool_context, [PERSONAL_CALENDAR, "unknown@example.com"])
+    assert result == {"in_use": ["primary", PERSONAL_CALENDAR], "unknown": ["unknown@example.com"]}
+    assert [event["summary"] for event in get_upcoming_events(tool_context, time_delta_in_days=3)] == ["Standup", "Gym"]
+    assert {calendar["id"]: calendar["in_use"] for calendar in list_calendars(tool_context)} == {
+        USER_EMAIL: True, TEAM_CALENDAR: False, PERSONAL_CALENDAR: True, HOLIDAYS_CALENDAR: False,
+    }
+
+    assert select_calendars(tool_context, [])["in_use"] == ["primary", TEAM_CALENDAR]
+
+
+def test_paginated_events_across_calendars(api, tool_context):
+    """Tests that every page of every calendar is fetched."""
+    for minute in range(0, 300):
+        start = tomorrow_at(0) + datetime.timedelta(minutes=minute)
+        api.add_event(TEAM_CALENDAR, f"Slot {minute}", start, start + datetime.timedelta(minutes=1))
+
+    events = get_upcoming_events(tool_context, time_delta_in_days=3)
+
+    assert len(events) == 302
+    starts = [event["start"]["dateTime"] for event in events]
+    assert starts == sorted(starts, key=datetime.datetime.fromisoformat)
+
+
+def test_events_on_secondary_calendars_can_be_changed(api, tool_context):
+    """Tests that an event listed from a secondary calendar is rescheduled and joined on that calendar."""
+    event = next(event for event in get_upcoming_events(tool_context, time_delta_in_days=3) if event["summary"] == "Team offsite planning")
+
+    moved = reschedule_event(tool_context, event["id"], tomorrow_at(15).isoformat(), tomorrow_at(16).isoformat(), calendar_id=event["calendarId"])
+    joined = add_attendees_to_event(tool_context, event["id"], ["bob@example.com"], calendar_id=event["calendarId"])
+
+    assert moved["start"]["dateTime"] == tomorrow_at(15).isoformat()
+    assert joined["attendees"] == [{"email": "bob@example.com"}]
+    assert api.events[TEAM_CALENDAR][event["id"]]["attendees"] == [{"email": "bob@example.com"}]
@@ -0,0 +1,171 @@
+import datetime
+import json
+import time
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from julian_gregory import helper_funcs
+from julian_gregory.app_utils import cassette
+from julian_gregory.scopes import AUTHORIZER_NAME
+from julian_gregory.tools import find_events_in_email, find_free_slots_for_multiple_users, get_upcoming_events
+from tests.fakes.fake_calendar_api import FakeCalendarApi
+
+TIME_ZONE = ZoneInfo("America/Los_Angeles")
+USER_EMAIL = "alice@customer.org"
+COLLEAGUE_EMAIL = "bob@customer.org"
+
+
+@pytest.fixture(autouse=True)
+def clear_cassettes():
+    cassette.get_cassette.cache_clear()
+    yield
+    cassette.get_cassette.cache_clear()
+
+
+@pytest.fixture
+def tool_context():
+    return SimpleNamespace(state={AUTHORIZER_NAME: "secret-token"}, user_id="alice")
+
+
+def tomorrow_at(hour: int) -> datetime.datetime:
+    now = datetime.datetime.now(TIME_ZONE)
+    return datetime.datetime(now.year, now.month, now.day, hour, tzinfo=TIME_ZONE) + datetime.timedelta(days=1)
+
+
+def run_tools(tool_context) -> tuple[list, list]:
+    events = get_upcoming_events(tool_context, time_delta_in_days=3)
+    slots = find_free_slots_for_multiple_users(tool_context, [COLLEAGUE_EMAIL], time_delta_in_days=3)["slots"]
+    return events, slots
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch, tool_context):
+    """Records run_tools against the fake API and returns (cassette path, events, slots)."""
+    path = str(tmp_path / "calendar.jsonl.gz")
+    with FakeCalendarApi(user_email=USER_EMAIL, time_zone=str(TIME_ZONE), latency_seconds=0.05) as api:
+        api.add_calendar(COLLEAGUE_EMAIL)
+        api.add_event("primary", "Salary review with Bob", tomorrow_at(9), tomorrow_at(10), attendees=[{"email": COLLEAGUE_EMAIL}])
+        api.add_event(COLLEAGUE_EMAIL, "Dentist", tomorrow_at(13), tomorrow_at(14))
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        monkeypatch.setenv("GOOGLE_API_CASSETTE", path)
+        monkeypatch.setenv("GOOGLE_API_CASSETTE_MODE", "record")
+        events, slots = run_tools(tool_context)
+    cassette.get_cassette.cache_clear()
+    monkeypatch.setenv("GOOGLE_API_CASSETTE_MODE", "replay")
+    return path, events, slots
+
+
+def test_recording_is_scrubbed(recording):
+    """Tests that tokens, emails and free text never reach the cassette."""
+    path, _, _ = recording
+    with cassette.Cassette(path)._open("rt") as f:
+        text = f.read()
+
+    assert "secret-token" not in text
+    assert "customer.org" not in text
+    assert "Salary review" not in text
+    interactions = [json.loads(line) for line in text.splitlines()]
+    assert {interaction["method"] for interaction in interactions} == {"GET", "POST"}
+    assert all(interaction["elapsed_ms"] >= 50 for interaction in interactions)
+
+
+def test_replay_matches_recording(recording, tool_context, monkeypatch):
+    """Tests that replay returns the recorded (scrubbed) responses with no server running."""
+    _, recorded_events, recorded_slots = recording
+    monkeypatch.setenv("GOOGLE_API_CASSETTE_TIMING_SCALE", "0")
+
+    events, slots = run_tools(tool_context)
+
+    assert slots == recorded_slots
+    assert [event["id"] for event in events] == [event["id"] for event in recorded_events]
+    assert events[0]["summary"] == "x" * len("Salary review with Bob")
+    assert events[0]["attendees"][0]["email"].endswith("@example.com")
+
+
+def test_replay_timing_scale(recording, tool_context, monkeypatch):
+    """Tests that replayed latency follows the recording, scaled by GOOGLE_API_CASSETTE_TIMING_SCALE."""
+    monkeypatch.setenv("GOOGLE_API_CASSETTE_TIMING_SCALE", "2")
+    start = time.perf_counter()
+    get_upcoming_events(tool_context, time_delta_in_days=3)
+    # calendars.get and events.list, each recorded at >= 50ms
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_replay_batch(tmp_path, monkeypatch, tool_context):
+    """Tests that batch responses are re-keyed to the Content-IDs of the replayed batch."""
+    path = str(tmp_path / "batch.jsonl")
+    monkeypatch.setenv("GOOGLE_API_CASSETTE", path)
+
+    def get_both(event_ids):
+        service = helper_funcs.get_calendar_service(tool_context)
+        responses = {}
+        batch = service.new_batch_http_request(callback=lambda request_id, response, exception: responses.update({request_id: response}))
+        for event_id in event_ids:
+            batch.add(service.events().get(calendarId="primary", eventId=event_id), request_id=event_id)
+        batch.execute()
+        return responses
+
+    with FakeCalendarApi(user_email=USER_EMAIL) as api:
+        event_ids = [api.add_event("primary", f"Meeting {hour}", tomorrow_at(hour), tomorrow_at(hour + 1))["id"] for hour in (9, 11)]
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        monkeypatch.setenv("GOOGLE_API_CASSETTE_MODE", "record")
+        recorded = get_both(event_ids)
+
+    cassette.get_cassette.cache_clear()
+    monkeypatch.setenv("GOOGLE_API_CASSETTE_MODE", "replay")
+    monkeypatch.setenv("GOOGLE_API_CASSETTE_TIMING_SCALE", "0")
+    replayed = get_both(event_ids)
+
+    assert {request_id: response["id"] for request_id, response in replayed.items()} == {event_id: event_id for event_id in event_ids}
+    assert [response["summary"] for response in replayed.values()] == ["x" * len(response["summary"]) for response in recorded.values()]
+
+
+def test_replay_miss_raises(tmp_path, monkeypatch, tool_context):
+    """Tests that an unrecorded request fails loudly instead of reaching the network."""
+    path = tmp_path / "empty.jsonl"
+    path.write_text("")
+    monkeypatch.setenv("GOOGLE_API_CASSETTE", str(path))
+
+    with pytest.raises(cassette.CassetteMissError):
+        get_upcoming_events(tool_context)
+
+
+def test_form_encoded_secrets_are_scrubbed():
+    """Tests that an OAuth refresh's form-encoded body keeps none of its secrets."""
+    body = "grant_type=refresh_token&client_id=app&client_secret=SECRET123&refresh_token=1//refresh"
+
+    scrubbed = cassette.scrub_body(body, "application/x-www-form-urlencoded")
+
+    assert scrubbed == "grant_type=refresh_token&client_id=app&client_secret=REDACTED&refresh_token=REDACTED"
+    assert cassette.scrub_text("https://oauth2.googleapis.com/token?id_token=abc&alt=json").endswith("id_token=REDACTED&alt=json")
+
+
+def test_replay_email(tmp_path, monkeypatch, tool_context):
+    """Tests that email text is scrubbed from the recording but header names are kept, so the scan replays."""
+    path = str(tmp_path / "gmail.jsonl")
+    monkeypatch.setenv("GMAIL_SYNC_DIR", str(tmp_path / "sync"))
+    monkeypatch.setenv("GOOGLE_API_CASSETTE", path)
+    date = (datetime.datetime.now(TIME_ZONE).date() + datetime.timedelta(days=3)).isoformat()
+    with FakeCalendarApi(user_email=USER_EMAIL, time_zone=str(TIME_ZONE)) as api:
+        api.add_message("Salary negotiation training", f"Join us on {date} at 10:00.\nWhere: Room 4\n", sender=COLLEAGUE_EMAIL)
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        monkeypatch.setenv("GMAIL_API_BASE_URL", api.url)
+        monkeypatch.setenv("GOOGLE_API_CASSETTE_MODE", "record")
+        (recorded,) = find_events_in_email(tool_context, query="training")
+
+    with cassette.Cassette(path)._open("rt") as f:
+        text = f.read()
+    assert "Salary" not in text and "Room 4" not in text and "customer.org" not in text
+    assert "Subject" in text
+
+    cassette.get_cassette.cache_clear()
+    monkeypatch.setenv("GOOGLE_API_CASSETTE_MODE", "replay")
+    monkeypatch.setenv("GOOGLE_API_CASSETTE_TIMING_SCALE", "0")
+    (replayed,) = find_events_in_email(tool_context, query="training")
+
+    assert replayed["message_id"] == recorded["message_id"]
+    assert replayed["subject"] == "xxxxxx xxxxxxxxxxx xxxxxxxx"
+    assert replayed["dates"] == recorded["dates"] == [date]
+    assert replayed["times"] == recorded["times"] == ["10:00"]
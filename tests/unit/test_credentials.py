@@ -0,0 +1,74 @@
+import datetime
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+from julian_gregory import helper_funcs
+from julian_gregory.scopes import AUTHORIZER_NAME
+
+
+def write_token(path, expires_in: datetime.timedelta):
+    expiry = datetime.datetime.now(datetime.UTC).replace(tzinfo=None) + expires_in
+    creds = Credentials(token="old", refresh_token="refresh", client_id="id", client_secret="secret",
+                        token_uri="https://oauth2.googleapis.com/token", expiry=expiry)
+    path.write_text(creds.to_json())
+
+
+@pytest.fixture
+def token_path(tmp_path, monkeypatch):
+    path = tmp_path / "token.json"
+    monkeypatch.setattr(helper_funcs, "TOKEN_PATH", str(path))
+    monkeypatch.setattr(helper_funcs, "_local_creds", None)
+    return path
+
+
+def test_token_creds_are_reused():
+    """Tests that tool calls with the same Gemini Enterprise token share one Credentials."""
+    first = helper_funcs.get_creds(SimpleNamespace(state={AUTHORIZER_NAME: "token-a"}))
+    assert helper_funcs.get_creds(SimpleNamespace(state={AUTHORIZER_NAME: "token-a"})) is first
+    assert helper_funcs.get_creds(SimpleNamespace(state={AUTHORIZER_NAME: "token-b"})).token == "token-b"
+
+
+def test_local_creds_read_once(token_path, monkeypatch):
+    """Tests that valid local credentials are read from the file once and never written back."""
+    write_token(token_path, datetime.timedelta(hours=1))
+    reads = []
+    from_file = Credentials.from_authorized_user_file
+    monkeypatch.setattr(Credentials, "from_authorized_user_file", lambda *args: reads.append(args) or from_file(*args))
+    modified = os.stat(token_path).st_mtime_ns
+
+    creds = [helper_funcs.get_creds(SimpleNamespace(state={})) for _ in range(3)]
+
+    assert creds[0].token == "old" and creds[1] is creds[0] and creds[2] is creds[0]
+    assert len(reads) == 1
+    assert os.stat(token_path).st_mtime_ns == modified
+
+
+def test_concurrent_refreshes_coalesce(token_path, monkeypatch):
+    """Tests that credentials expiring soon are refreshed by one of many threads, and the file replaced whole."""
+    write_token(token_path, datetime.timedelta(minutes=1))
+    refreshes = []
+
+    def refresh(self, request):
+        refreshes.append(threading.current_thread())
+        time.sleep(0.1)
+        self.token = "new"
+        self.expiry = datetime.datetime.now(datetime.UTC).replace(tzinfo=None) + datetime.timedelta(hours=1)
+
+    monkeypatch.setattr(Credentials, "refresh", refresh)
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(helper_funcs.get_local_creds().token)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tokens == ["new"] * 8
+    assert len(refreshes) == 1
+    assert json.loads(token_path.read_text())["token"] == "new"
+    assert os.listdir(token_path.parent) == ["token.json"]
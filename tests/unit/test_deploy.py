@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+from click.testing import CliRunner
+
+from julian_gregory.app_utils.deploy import (
+    deploy_agent_engine_app,
+    hash_source_packages,
+    plan_deployment,
+)
+
+HASHES = {"source": "a", "requirements": "b", "config": "c"}
+
+
+def test_source_hash_ignores_bytecode(tmp_path):
+    """Tests that the source hash changes with the code but not with __pycache__ or .pyc files."""
+    package = tmp_path / "app"
+    package.mkdir()
+    (package / "agent.py").write_text("instruction = 'hello'\n")
+    before = hash_source_packages([str(package)])
+
+    (package / "__pycache__").mkdir()
+    (package / "__pycache__" / "agent.cpython-313.pyc").write_bytes(b"\x00")
+    assert hash_source_packages([str(package)]) == before
+
+    (package / "agent.py").write_text("instruction = 'hello there'\n")
+    assert hash_source_packages([str(package)]) != before
+
+
+def test_plan_deployment():
+    """Tests the create/skip/update_code/update decision."""
+    assert plan_deployment(None, HASHES, exists=False) == "create"
+    assert plan_deployment(None, HASHES, exists=True) == "update"
+    assert plan_deployment(HASHES, HASHES, exists=True) == "skip"
+    assert plan_deployment(HASHES, HASHES, exists=True, force=True) == "update"
+    assert plan_deployment(HASHES, {**HASHES, "source": "x"}, exists=True) == "update_code"
+    assert plan_deployment(HASHES, {**HASHES, "source": "x", "requirements": "y"}, exists=True) == "update"
+    assert plan_deployment(HASHES, {**HASHES, "config": "z"}, exists=True) == "update"
+
+
+def deploy(tmp_path, client, *args):
+    package = tmp_path / "deploy_test_app"
+    package.mkdir(exist_ok=True)
+    if not (package / "entry.py").exists():
+        (package / "entry.py").write_text("agent_engine = object()\n")
+    (tmp_path / "requirements.txt").write_text("google-adk\n")
+    sys.modules.pop("deploy_test_app.entry", None)
+    with patch("julian_gregory.app_utils.deploy.vertexai") as mock_vertexai, \
+            patch("julian_gregory.app_utils.deploy.generate_class_methods_from_agent", return_value=[]):
+        mock_vertexai.Client.return_value = client
+        result = CliRunner().invoke(deploy_agent_engine_app, [
+            "--project", "test-project",
+            f"--source-packages={package}",
+            "--entrypoint-module=deploy_test_app.entry",
+            f"--requirements-file={tmp_path / 'requirements.txt'}",
+            *args,
+        ])
+    assert result.exit_code == 0, result.output
+    return result, "deploy_test_app.entry" in sys.modules
+
+
+def test_unchanged_deploy_is_skipped(tmp_path, monkeypatch):
+    """Tests that a second deploy with the same content doesn't import the agent or upload anything."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    agent = MagicMock()
+    agent.api_resource.name = "projects/1/locations/us-central1/reasoningEngines/2"
+    agent.api_resource.display_name = "julian-gregory"
+    client = MagicMock()
+    client.agent_engines.list.return_value = [agent]
+    client.agent_engines.update.return_value = agent
+
+    deploy(tmp_path, client)
+    metadata = json.loads((tmp_path / "deployment_metadata.json").read_text())
+    assert set(metadata["content_hashes"]) == {"source", "requirements", "config"}
+    assert client.agent_engines.update.call_count == 1
+
+    result, imported = deploy(tmp_path, client)
+    assert "skipping upload" in result.output
+    assert "Deployment timing" in result.output
+    assert not imported
+    assert client.agent_engines.update.call_count == 1
+
+    (tmp_path / "deploy_test_app" / "entry.py").write_text("agent_engine = object()  # changed\n")
+    deploy(tmp_path, client)
+    config = client.agent_engines.update.call_args.kwargs["config"]
+    assert config.requirements_file is None
+    assert config.min_instances is None
+    assert config.source_packages
+
+    deploy(tmp_path, client, "--set-env-vars=WARMUP_ENABLED=false")
+    config = client.agent_engines.update.call_args.kwargs["config"]
+    assert config.requirements_file is not None
+    assert config.min_instances == 1
+
+
+def test_sizing_file_sets_unspecified_options(tmp_path, monkeypatch):
+    """Tests that --sizing-file fills in scaling options that weren't passed on the command line."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    client = MagicMock()
+    client.agent_engines.list.return_value = []
+    agent = MagicMock()
+    agent.api_resource.name = "projects/1/locations/us-central1/reasoningEngines/2"
+    client.agent_engines.create.return_value = agent
+    sizing_file = tmp_path / "deployment_sizing.json"
+    sizing_file.write_text(json.dumps({
+        "min_instances": 2, "max_instances": 6, "container_concurrency": 5, "cpu": "2", "num_workers": 2,
+        "prediction": {"p95_ms": 1000},
+    }))
+
+    deploy(tmp_path, client, f"--sizing-file={sizing_file}", "--max-instances=8")
+
+    config = client.agent_engines.create.call_args.kwargs["config"]
+    assert (config.min_instances, config.max_instances, config.container_concurrency) == (2, 8, 5)
+    assert config.resource_limits == {"cpu": "2", "memory": "8Gi"}
+    assert config.env_vars["NUM_WORKERS"] == "2"
+
+
+def test_bundle_deploy_uploads_from_bundle(tmp_path, monkeypatch):
+    """Tests that --bundle uploads the compiled bundle, with package paths relative to it."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    client = MagicMock()
+    client.agent_engines.list.return_value = []
+    upload_dirs = []
+    agent = MagicMock()
+    agent.api_resource.name = "projects/1/locations/us-central1/reasoningEngines/2"
+    client.agent_engines.create.side_effect = lambda config: upload_dirs.append(os.getcwd()) or agent
+    (tmp_path / "deploy_test_app").mkdir()
+    (tmp_path / "deploy_test_app" / "deploy_script.py").write_text("import click\n")
+
+    deploy(tmp_path, client, "--bundle")
+
+    config = client.agent_engines.create.call_args.kwargs["config"]
+    assert config.source_packages == ["deploy_test_app"]
+    assert upload_dirs == [str(tmp_path / ".bundle")]
+    assert os.getcwd() == str(tmp_path)
+    assert (tmp_path / ".bundle" / "requirements.txt").exists()
+    assert not (tmp_path / ".bundle" / "deploy_test_app" / "deploy_script.py").exists()
+    manifest = json.loads((tmp_path / ".bundle" / "startup_manifest.json").read_text())
+    assert manifest["modules"] == ["deploy_test_app.entry"]
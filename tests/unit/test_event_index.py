@@ -0,0 +1,100 @@
+import datetime
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from julian_gregory import event_index
+from julian_gregory.scopes import AUTHORIZER_NAME
+from julian_gregory.tools import search_events
+from tests.fakes.fake_calendar_api import FakeCalendarApi
+
+TIME_ZONE = ZoneInfo("America/Los_Angeles")
+USER_EMAIL = "me@example.com"
+TEAM = "team@example.com"
+LIST_EVENTS = ("GET", "/calendar/v3/calendars/primary/events")
+
+
+def at(days: int, hour: int) -> datetime.datetime:
+    today = datetime.datetime.now(TIME_ZONE).date()
+    return datetime.datetime(today.year, today.month, today.day, hour, tzinfo=TIME_ZONE) + datetime.timedelta(days=days)
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setenv("EVENT_INDEX_DIR", str(tmp_path))
+    monkeypatch.setenv("EVENT_INDEX_SYNC_INTERVAL_SECONDS", "0")
+    event_index.get_event_index.cache_clear()
+    with FakeCalendarApi(user_email=USER_EMAIL, time_zone=str(TIME_ZONE)) as api:
+        api.add_calendar(TEAM, time_zone=str(TIME_ZONE), access_role="writer")
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        yield api
+    event_index.get_event_index.cache_clear()
+
+
+@pytest.fixture
+def tool_context():
+    return SimpleNamespace(state={AUTHORIZER_NAME: "token"}, user_id="alice")
+
+
+def test_search_by_text_attendee_and_range(api, tool_context):
+    """Tests text, attendee and date range searches, and that a copy of an event on two calendars is returned once."""
+    brad = [{"email": "Brad@example.com", "displayName": "Brad Pitt"}]
+    api.add_event(USER_EMAIL, "1:1 with Brad", at(-30, 10), at(-30, 11), attendees=brad)
+    api.add_event(USER_EMAIL, "Quarterly planning", at(-7, 13), at(-7, 15), attendees=brad, description="Roadmap review")
+    api.add_event(USER_EMAIL, "Dentist appointment", at(3, 9), at(3, 10), location="Main St")
+    api.add_event(USER_EMAIL, "1:1 with Brad", at(5, 10), at(5, 11), attendees=brad, iCalUID="shared")
+    api.add_event(TEAM, "1:1 with Brad", at(5, 10), at(5, 11), attendees=brad, iCalUID="shared")
+
+    assert [event["summary"] for event in search_events(tool_context, text="dent")] == ["Dentist appointment"]
+    assert [event["summary"] for event in search_events(tool_context, text="roadmap")] == ["Quarterly planning"]
+    assert search_events(tool_context, text='"unbalanced AND (') == []
+
+    last = search_events(tool_context, attendee="brad", end_date=at(0, 0).date().isoformat(), latest_first=True, max_results=1)
+    assert [event["summary"] for event in last] == ["Quarterly planning"]
+    assert last[0]["attendees"] == [USER_EMAIL, "brad@example.com"]
+    assert datetime.datetime.fromisoformat(last[0]["start"]) == at(-7, 13)
+
+    upcoming = search_events(tool_context, attendee="Pitt", start_date=at(0, 0).date().isoformat())
+    assert [event["start"] for event in upcoming] == [at(5, 10).isoformat()]
+
+
+def test_incremental_and_full_sync(api, tool_context, monkeypatch):
+    """Tests that later searches only fetch changes, deletions included, and that an expired sync token resyncs in full."""
+    dentist = api.add_event(USER_EMAIL, "Dentist", at(1, 9), at(1, 10))
+    gym = api.add_event(USER_EMAIL, "Gym", at(1, 18), at(1, 19))
+    assert [event["summary"] for event in search_events(tool_context)] == ["Dentist", "Gym"]
+
+    api.update_event(USER_EMAIL, dentist["id"], summary="Orthodontist")
+    api.delete_event(USER_EMAIL, gym["id"])
+    api.requests.clear()
+    queries = []
+    list_events = api._list_events
+    monkeypatch.setattr(api, "_list_events", lambda calendar_id, query: queries.append(query) or list_events(calendar_id, query))
+
+    assert [event["summary"] for event in search_events(tool_context)] == ["Orthodontist"]
+    assert search_events(tool_context, text="dentist") == []
+    assert api.requests.count(LIST_EVENTS) == 2
+    assert queries and all("syncToken" in query for query in queries)
+
+    api.expire_sync_tokens()
+    api.add_event(USER_EMAIL, "Haircut", at(2, 12), at(2, 13))
+
+    assert [event["summary"] for event in search_events(tool_context)] == ["Orthodontist", "Haircut"]
+
+
+def test_full_sync_window_and_literal_attendee(api, tool_context, monkeypatch):
+    """Tests that a full sync only reads the window around now, and that % and _ in an attendee match themselves."""
+    monkeypatch.setenv("EVENT_INDEX_WINDOW_DAYS", "30")
+    api.add_event(USER_EMAIL, "Ancient history", at(-400, 10), at(-400, 11))
+    api.add_event(USER_EMAIL, "Standup", at(1, 9), at(1, 10), attendees=[{"email": "j_doe@example.com"}])
+    api.add_event(USER_EMAIL, "Review", at(2, 9), at(2, 10), attendees=[{"email": "jxdoe@example.com"}])
+    queries = []
+    list_events = api._list_events
+    monkeypatch.setattr(api, "_list_events", lambda calendar_id, query: queries.append(query) or list_events(calendar_id, query))
+
+    assert [event["summary"] for event in search_events(tool_context)] == ["Standup", "Review"]
+    assert all("timeMin" in query and "timeMax" in query for query in queries)
+    assert [event["summary"] for event in search_events(tool_context, attendee="j_doe")] == ["Standup"]
+    assert search_events(tool_context, attendee="%") == []
+    assert all("syncToken" in query for query in queries[2:])
@@ -0,0 +1,112 @@
+import datetime
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from julian_gregory import helper_funcs
+from julian_gregory.scopes import AUTHORIZER_NAME
+from julian_gregory.tools import find_free_slots_for_multiple_users, get_upcoming_events, set_calendar_entry
+from tests.fakes.fake_calendar_api import FakeCalendarApi
+
+TIME_ZONE = ZoneInfo("America/Los_Angeles")
+
+
+@pytest.fixture
+def api(monkeypatch):
+    with FakeCalendarApi(time_zone=str(TIME_ZONE)) as api:
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        monkeypatch.setenv("OAUTH2_API_BASE_URL", api.url)
+        yield api
+
+
+@pytest.fixture
+def tool_context():
+    return SimpleNamespace(state={AUTHORIZER_NAME: "fake-token"}, user_id="alice")
+
+
+def tomorrow_at(hour: int) -> datetime.datetime:
+    now = datetime.datetime.now(TIME_ZONE)
+    return datetime.datetime(now.year, now.month, now.day, hour, tzinfo=TIME_ZONE) + datetime.timedelta(days=1)
+
+
+def test_tools_talk_to_fake_server(api, tool_context):
+    """Tests that the tools run unchanged against the fake server via the *_API_BASE_URL overrides."""
+    api.add_event("primary", "Standup", tomorrow_at(9), tomorrow_at(10))
+
+    created = set_calendar_entry("Room 1", "Planning", "", tomorrow_at(11).isoformat(), tomorrow_at(12).isoformat(), tool_context)
+    events = get_upcoming_events(tool_context, time_delta_in_days=3)
+
+    assert [event["summary"] for event in events] == ["Standup", "Planning"]
+    assert created["id"] == events[1]["id"]
+    assert helper_funcs.get_user_info(tool_context)["email"] == api.user_email
+    assert ("POST", "/calendar/v3/calendars/primary/events") in api.requests
+
+
+def test_freebusy_covers_other_calendars(api, tool_context):
+    """Tests that freebusy reports the busy blocks of every requested calendar."""
+    api.add_calendar("colleague@example.com", time_zone="Europe/London")
+    api.add_event("colleague@example.com", "Busy", tomorrow_at(9), tomorrow_at(17))
+
+    slots = find_free_slots_for_multiple_users(tool_context, ["colleague@example.com"], time_delta_in_days=2)["slots"]
+
+    tomorrows_slots = [slot for slot in slots if slot["start"].startswith(tomorrow_at(8).date().isoformat())]
+    assert tomorrows_slots in ([], [{"start": tomorrow_at(8).isoformat(), "end": tomorrow_at(9).isoformat()}])
+
+
+def test_events_list_paginates(api, tool_context):
+    """Tests that maxResults/pageToken behave like the real API."""
+    for hour in range(9, 14):
+        api.add_event("primary", f"Meeting {hour}", tomorrow_at(hour), tomorrow_at(hour) + datetime.timedelta(minutes=30))
+    service = helper_funcs.get_calendar_service(tool_context)
+
+    first = service.events().list(calendarId="primary", maxResults=3).execute()
+    second = service.events().list(calendarId="primary", maxResults=3, pageToken=first["nextPageToken"]).execute()
+
+    assert len(first["items"]) == 3
+    assert len(second["items"]) == 2
+    assert "nextPageToken" not in second
+
+
+def test_batch_requests(api, tool_context):
+    """Tests that a googleapiclient batch is split into parts and answered per request."""
+    event = api.add_event("primary", "Standup", tomorrow_at(9), tomorrow_at(10))
+    service = helper_funcs.get_calendar_service(tool_context)
+    responses = {}
+
+    batch = service.new_batch_http_request(callback=lambda request_id, response, exception: responses.update({request_id: (response, exception)}))
+    batch.add(service.events().get(calendarId="primary", eventId=event["id"]), request_id="found")
+    batch.add(service.events().get(calendarId="primary", eventId="missing"), request_id="missing")
+    batch.execute()
+
+    assert responses["found"][0]["summary"] == "Standup"
+    assert responses["missing"][1].resp.status == 404
+    assert ("POST", "/calendar/v3/freeBusy") not in api.requests
+
+
+def test_error_injection_and_quota(api, tool_context):
+    """Tests scheduled failures and quota exhaustion surface as HttpError."""
+    service = helper_funcs.get_calendar_service(tool_context)
+
+    api.fail_next(status=503)
+    with pytest.raises(HttpError) as error:
+        service.calendars().get(calendarId="primary").execute()
+    assert error.value.resp.status == 503
+    assert service.calendars().get(calendarId="primary").execute()["timeZone"] == str(TIME_ZONE)
+
+    api.quota_total = api._request_count
+    with pytest.raises(HttpError) as error:
+        service.calendars().get(calendarId="primary").execute()
+    assert error.value.resp.status == 403
+    assert error.value.reason == "quotaExceeded"
+
+
+def test_requests_without_token_are_rejected(api):
+    """Tests that the fake, like the real API, requires a bearer token."""
+    import urllib.error
+    import urllib.request
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(api.url + "calendar/v3/calendars/primary")
+    assert error.value.code == 401
@@ -154,5 +154,69 @@ class TestFindFreeSlots(unittest.TestCase):
         }
         self.assertIn(expected_slot_after, free_slots)
 
+    def slot_days(self, free_slots):
+        """The dates of the slots, with their start hours."""
+        days = {}
+        for slot in free_slots:
+            slot_start = datetime.datetime.fromisoformat(slot['start'])
+            days.setdefault(slot_start.date(), []).append(slot_start.hour + slot_start.minute / 60)
+        return days
+
+    @patch('julian_gregory.tools.get_upcoming_events')
+    @patch('julian_gregory.tools._get_calendar_and_time_info')
+    def test_all_day_and_out_of_office_events(self, mock_get_calendar_info, mock_get_upcoming_events):
+        """Tests that all-day events and out-of-office time block slots."""
+        mock_get_calendar_info.return_value = (None, self.time_zone, self.now)
+        tuesday = self.now.date() + datetime.timedelta(days=1)
+        wednesday = tuesday + datetime.timedelta(days=1)
+        thursday = tuesday + datetime.timedelta(days=2)
+        mock_get_upcoming_events.return_value = [
+            {'summary': 'Offsite', 'start': {'date': tuesday.isoformat()}, 'end': {'date': wednesday.isoformat()}},
+            {
+                'summary': 'Dentist', 'eventType': 'outOfOffice', 'transparency': 'transparent',
+                'start': {'dateTime': datetime.datetime(wednesday.year, wednesday.month, wednesday.day, 12, tzinfo=self.time_zone).isoformat()},
+                'end': {'dateTime': datetime.datetime(thursday.year, thursday.month, thursday.day, 12, tzinfo=self.time_zone).isoformat()},
+            },
+        ]
+
+        days = self.slot_days(find_free_slots(MagicMock(), time_delta_in_days=3))
+
+        self.assertNotIn(tuesday, days)
+        self.assertEqual(days[wednesday], [8, 8.5, 9, 9.5, 10, 10.5, 11])
+        self.assertEqual(days[thursday], [12, 12.5, 13, 13.5, 14, 14.5, 15, 15.5, 16])
+
+    @patch('julian_gregory.tools.get_upcoming_events')
+    @patch('julian_gregory.tools._get_calendar_and_time_info')
+    def test_free_declined_and_holiday_events(self, mock_get_calendar_info, mock_get_upcoming_events):
+        """Tests that free, declined and working-location events don't block slots, while public holidays do."""
+        mock_get_calendar_info.return_value = (None, self.time_zone, self.now)
+        tuesday = self.now.date() + datetime.timedelta(days=1)
+        wednesday = tuesday + datetime.timedelta(days=1)
+        thursday = tuesday + datetime.timedelta(days=2)
+        friday = tuesday + datetime.timedelta(days=3)
+        holidays = 'en.usa#holiday@group.v.calendar.google.com'
+
+        def tuesday_at(hour):
+            return {'dateTime': datetime.datetime(tuesday.year, tuesday.month, tuesday.day, hour, tzinfo=self.time_zone).isoformat()}
+
+        mock_get_upcoming_events.return_value = [
+            {'summary': 'Office', 'eventType': 'workingLocation', 'start': {'date': tuesday.isoformat()}, 'end': {'date': wednesday.isoformat()}},
+            {'summary': 'Optional talk', 'transparency': 'transparent', 'start': tuesday_at(9), 'end': tuesday_at(10)},
+            {'summary': 'Sync', 'start': tuesday_at(11), 'end': tuesday_at(12),
+             'attendees': [{'email': 'bob@example.com', 'responseStatus': 'accepted'}, {'email': 'me@example.com', 'self': True, 'responseStatus': 'declined'}]},
+            {'summary': 'Review', 'start': tuesday_at(13), 'end': tuesday_at(17),
+             'attendees': [{'email': 'bob@example.com', 'responseStatus': 'declined'}, {'email': 'me@example.com', 'self': True, 'responseStatus': 'accepted'}]},
+            {'summary': 'Holiday', 'calendarId': holidays, 'description': 'Public holiday', 'transparency': 'transparent',
+             'start': {'date': wednesday.isoformat()}, 'end': {'date': thursday.isoformat()}},
+            {'summary': 'Observance', 'calendarId': holidays, 'description': 'Observance\nTo hide observances, go to Google Calendar Settings',
+             'transparency': 'transparent', 'start': {'date': thursday.isoformat()}, 'end': {'date': friday.isoformat()}},
+        ]
+
+        days = self.slot_days(find_free_slots(MagicMock(), time_delta_in_days=3))
+
+        self.assertEqual(days[tuesday], [8, 8.5, 9, 9.5, 10, 10.5, 11, 11.5, 12])
+        self.assertNotIn(wednesday, days)
+        self.assertEqual(len(days[thursday]), 17)
+
 if __name__ == '__main__':
     unittest.main()
@@ -37,7 +37,7 @@ def test_find_free_slots_for_multiple_users_with_free_slots(mock_get_calendar_an
     calendar_service.freebusy.return_value.query.return_value.execute.return_value = freebusy_result
 
     # Call the function
-    free_slots = find_free_slots_for_multiple_users(tool_context, user_emails, slot_duration_minutes=60, time_delta_in_days=1, business_hours_start=9, business_hours_end=17)
+    free_slots = find_free_slots_for_multiple_users(tool_context, user_emails, slot_duration_minutes=60, time_delta_in_days=1, business_hours_start=9, business_hours_end=17)["slots"]
 
     # Assertions
     assert len(free_slots) > 0
@@ -78,7 +78,7 @@ def test_find_free_slots_for_multiple_users_no_free_slots(mock_get_calendar_and_
     calendar_service.freebusy.return_value.query.return_value.execute.return_value = freebusy_result
 
     # Call the function
-    free_slots = find_free_slots_for_multiple_users(tool_context, user_emails, slot_duration_minutes=60, time_delta_in_days=1, business_hours_start=9, business_hours_end=17)
+    free_slots = find_free_slots_for_multiple_users(tool_context, user_emails, slot_duration_minutes=60, time_delta_in_days=1, business_hours_start=9, business_hours_end=17)["slots"]
 
     # Assertions
     assert len(free_slots) == 0
@@ -110,7 +110,7 @@ def test_find_free_slots_for_multiple_users_duration_too_long(mock_get_calendar_
     calendar_service.freebusy.return_value.query.return_value.execute.return_value = freebusy_result
 
     # Call the function
-    free_slots = find_free_slots_for_multiple_users(tool_context, user_emails, slot_duration_minutes=120, time_delta_in_days=1, business_hours_start=9, business_hours_end=10)
+    free_slots = find_free_slots_for_multiple_users(tool_context, user_emails, slot_duration_minutes=120, time_delta_in_days=1, business_hours_start=9, business_hours_end=10)["slots"]
 
     # Assertions
     assert len(free_slots) == 0
@@ -142,7 +142,7 @@ def test_find_free_slots_for_multiple_users_no_busy_slots(mock_get_calendar_and_
     calendar_service.freebusy.return_value.query.return_value.execute.return_value = freebusy_result
 
     # Call the function
-    free_slots = find_free_slots_for_multiple_users(tool_context, user_emails, slot_duration_minutes=60, time_delta_in_days=1, business_hours_start=9, business_hours_end=17)
+    free_slots = find_free_slots_for_multiple_users(tool_context, user_emails, slot_duration_minutes=60, time_delta_in_days=1, business_hours_start=9, business_hours_end=17)["slots"]
 
     # Assertions
     assert len(free_slots) == 15 # 8 hours, 30 min increment, 60 min slot
@@ -174,7 +174,7 @@ def test_find_free_slots_for_multiple_users_weekend(mock_get_calendar_and_time_i
     calendar_service.freebusy.return_value.query.return_value.execute.return_value = freebusy_result
 
     # Call the function
-    free_slots = find_free_slots_for_multiple_users(tool_context, user_emails, slot_duration_minutes=60, time_delta_in_days=1, business_hours_start=9, business_hours_end=17)
+    free_slots = find_free_slots_for_multiple_users(tool_context, user_emails, slot_duration_minutes=60, time_delta_in_days=1, business_hours_start=9, business_hours_end=17)["slots"]
 
     # Assertions
     assert len(free_slots) == 0
@@ -209,7 +209,42 @@ def test_find_free_slots_for_multiple_users_multiple_busy_slots(mock_get_calenda
     calendar_service.freebusy.return_value.query.return_value.execute.return_value = freebusy_result
 
     # Call the function
-    free_slots = find_free_slots_for_multiple_users(tool_context, user_emails, slot_duration_minutes=60, time_delta_in_days=1, business_hours_start=9, business_hours_end=17)
+    free_slots = find_free_slots_for_multiple_users(tool_context, user_emails, slot_duration_minutes=60, time_delta_in_days=1, business_hours_start=9, business_hours_end=17)["slots"]
 
     # Assertions
     assert len(free_slots) == 9
+
+
+@patch('julian_gregory.tools._get_calendar_and_time_info')
+def test_find_free_slots_for_multiple_users_unreadable_attendee(mock_get_calendar_and_time_info):
+    """Tests that an attendee whose calendar can't be read is reported with every slot."""
+    tool_context = MagicMock()
+    calendar_service = MagicMock()
+    mock_get_calendar_and_time_info.return_value = (
+        calendar_service,
+        ZoneInfo("UTC"),
+        datetime.datetime(2025, 12, 14, 12, 0, 0, tzinfo=ZoneInfo("UTC"))
+    )
+
+    user_emails = ["user1@example.com", "private@example.com"]
+
+    freebusy_result = {
+        "calendars": {
+            "user1@example.com": {
+                "busy": [
+                    {"start": "2025-12-15T10:00:00Z", "end": "2025-12-15T11:00:00Z"}
+                ]
+            },
+            "private@example.com": {
+                "errors": [{"domain": "global", "reason": "notFound"}],
+                "busy": []
+            }
+        }
+    }
+    calendar_service.freebusy.return_value.query.return_value.execute.return_value = freebusy_result
+
+    result = find_free_slots_for_multiple_users(tool_context, user_emails, slot_duration_minutes=60, time_delta_in_days=1, business_hours_start=9, business_hours_end=17)
+
+    assert len(result["slots"]) == 12
+    assert result["unchecked_calendars"] == ["private@example.com"]
+    assert not any("unchecked_calendars" in slot for slot in result["slots"])
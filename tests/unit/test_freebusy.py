@@ -0,0 +1,107 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from julian_gregory import helper_funcs
+from julian_gregory.freebusy import MemoryBusyCache, busy_cache, query_busy
+from julian_gregory.scopes import AUTHORIZER_NAME
+from julian_gregory.time_utils import to_epoch
+from julian_gregory.tools import find_free_slots_for_multiple_users, set_calendar_entry
+from tests.fakes.fake_calendar_api import FakeCalendarApi
+
+MANAGER = "manager@example.com"
+LEAD = "lead@example.com"
+USER = "alice"
+FREEBUSY = ("POST", "/calendar/v3/freeBusy")
+
+
+def day(offset: int, hour: int = 0) -> datetime.datetime:
+    today = datetime.datetime.now(datetime.UTC).date()
+    return datetime.datetime(today.year, today.month, today.day, hour, tzinfo=datetime.UTC) + datetime.timedelta(days=offset)
+
+
+def epochs(*bounds: datetime.datetime) -> list[tuple[int, int]]:
+    return [(int(start.timestamp()), int(end.timestamp())) for start, end in zip(bounds[::2], bounds[1::2])]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def api(request, tmp_path, monkeypatch):
+    monkeypatch.setenv("FREEBUSY_CACHE_BACKEND", request.param)
+    monkeypatch.setenv("FREEBUSY_CACHE_PATH", str(tmp_path / "freebusy.sqlite3"))
+    with FakeCalendarApi() as api:
+        api.add_calendar(MANAGER)
+        api.add_calendar(LEAD)
+        # Across midnight, so it is cached in two day buckets
+        api.add_event(MANAGER, "Late call", day(1, 22), day(2, 2))
+        api.add_event(LEAD, "Offsite", day(3, 9), day(3, 17))
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        yield api
+
+
+@pytest.fixture
+def calendar_service(api):
+    return helper_funcs.get_calendar_service(SimpleNamespace(state={AUTHORIZER_NAME: "token"}))
+
+
+def test_cached_days_are_not_fetched_again(api, calendar_service):
+    """Tests that covered windows come from the cache and only missing days are fetched, for both backends."""
+    first = query_busy(calendar_service, [MANAGER, LEAD], day(1).isoformat(), day(3).isoformat(), user_id=USER)
+    assert first == {MANAGER: epochs(day(1, 22), day(2, 2)), LEAD: []}
+    assert api.requests.count(FREEBUSY) == 1
+
+    inside = query_busy(calendar_service, [MANAGER, LEAD], day(1, 23).isoformat(), day(2, 12).isoformat(), user_id=USER)
+    assert inside == {MANAGER: epochs(day(1, 23), day(2, 2)), LEAD: []}
+    assert api.requests.count(FREEBUSY) == 1
+
+    longer = query_busy(calendar_service, [MANAGER, LEAD], day(2).isoformat(), day(4).isoformat(), user_id=USER)
+    assert longer == {MANAGER: epochs(day(2), day(2, 2)), LEAD: epochs(day(3, 9), day(3, 17))}
+    assert api.requests.count(FREEBUSY) == 2
+
+
+def test_cache_is_kept_per_user(api, calendar_service):
+    """Tests that busy time fetched for one user isn't served to another, while a change drops it for everyone."""
+    query_busy(calendar_service, [MANAGER], day(1).isoformat(), day(2).isoformat(), user_id=USER)
+    query_busy(calendar_service, [MANAGER], day(1).isoformat(), day(2).isoformat(), user_id="bob")
+    assert api.requests.count(FREEBUSY) == 2
+
+    busy_cache().invalidate(MANAGER)
+    query_busy(calendar_service, [MANAGER], day(1).isoformat(), day(2).isoformat(), user_id=USER)
+    query_busy(calendar_service, [MANAGER], day(1).isoformat(), day(2).isoformat(), user_id="bob")
+    assert api.requests.count(FREEBUSY) == 4
+
+
+def test_booking_drops_cached_busy_time(api):
+    """Tests that a slot booked with set_calendar_entry isn't offered again while the cache would still hold it."""
+    tool_context = SimpleNamespace(state={AUTHORIZER_NAME: "token"}, user_id=USER)
+    slots = find_free_slots_for_multiple_users(tool_context, [api.user_email, MANAGER], time_delta_in_days=3)["slots"]
+
+    set_calendar_entry("", "Planning", "", slots[0]["start"], slots[0]["end"], tool_context)
+
+    assert slots[0] not in find_free_slots_for_multiple_users(tool_context, [api.user_email, MANAGER], time_delta_in_days=3)["slots"]
+    assert api.requests.count(FREEBUSY) == 2
+
+
+def test_errors_and_expired_days_are_fetched_again(api, calendar_service, monkeypatch):
+    """Tests that unreadable calendars aren't cached, and that cached days expire after the TTL."""
+    assert query_busy(calendar_service, ["unknown@example.com"], day(1).isoformat(), day(2).isoformat(), user_id=USER) == {"unknown@example.com": None}
+    assert query_busy(calendar_service, ["unknown@example.com"], day(1).isoformat(), day(2).isoformat(), user_id=USER) == {"unknown@example.com": None}
+    assert api.requests.count(FREEBUSY) == 2
+
+    monkeypatch.setenv("FREEBUSY_CACHE_TTL_SECONDS", "0")
+    query_busy(calendar_service, [MANAGER], day(1).isoformat(), day(2).isoformat(), user_id=USER)
+    query_busy(calendar_service, [MANAGER], day(1).isoformat(), day(2).isoformat(), user_id=USER)
+    assert api.requests.count(FREEBUSY) == 4
+
+
+def test_memory_cache_is_bounded():
+    """Tests that the least recently used days are dropped first."""
+    cache = MemoryBusyCache(max_entries=2)
+    cache.put(USER, MANAGER, {1: [], 2: [(to_epoch("1970-01-03T01:00:00Z"), to_epoch("1970-01-03T02:00:00Z"))]}, expires=100)
+    assert set(cache.get(USER, MANAGER, 1, 1, now=0)) == {1}
+
+    cache.put(USER, LEAD, {1: []}, expires=100)
+
+    assert set(cache.get(USER, MANAGER, 1, 2, now=0)) == {1}
+    assert cache.get(USER, LEAD, 1, 1, now=0) == {1: []}
+    assert cache.get(USER, LEAD, 1, 1, now=100) == {}
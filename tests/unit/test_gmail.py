@@ -0,0 +1,81 @@
+import base64
+import datetime
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from julian_gregory import gmail
+from julian_gregory.gmail import EventScanner, scan_text_part
+from julian_gregory.scopes import AUTHORIZER_NAME
+from julian_gregory.tools import find_events_in_email
+from tests.fakes.fake_calendar_api import FakeCalendarApi
+
+TIME_ZONE = ZoneInfo("America/Los_Angeles")
+
+
+def encode(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def test_scanner_reads_chunks(monkeypatch):
+    """Tests that details split across decoded chunks and HTML tags are found, and that scripts are skipped."""
+    monkeypatch.setattr(gmail, "CHUNK_CHARS", 8)
+    html = (
+        "<html><style>p { margin: 10:00am }</style><p>Café onboarding on <b>Tuesday, Nov 3</b></p>"
+        "<p>9:30 - 11 a.m. (ET)</p><p>Where: Building 4, Room 201</p>"
+        '<p><a href="https://meet.google.com/abc-defg-hij">Join</a></p></html>'
+    )
+    scanner = EventScanner(datetime.date(2026, 10, 19))
+
+    scan_text_part(scanner, "text/html", encode(html))
+
+    assert scanner.dates == [datetime.date(2026, 11, 3)]
+    assert scanner.times == [((9, 30), (11, 0))]
+    assert scanner.time_zone == "America/New_York"
+    assert scanner.locations == ["Building 4, Room 201"]
+    assert scanner.links == ["https://meet.google.com/abc-defg-hij"]
+
+
+@pytest.mark.parametrize("text, times", [
+    ("2-4pm", [((14, 0), (16, 0))]),
+    ("11 to 1 p.m.", [((11, 0), (13, 0))]),
+    ("at 14:00, call 555-1234 on 2026-12-01", [((14, 0), None)]),
+])
+def test_scanner_times(text, times):
+    scanner = EventScanner(datetime.date(2026, 10, 19))
+    scanner.feed(text)
+    scanner.close()
+    assert scanner.times == times
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setenv("GMAIL_SYNC_DIR", str(tmp_path))
+    with FakeCalendarApi(time_zone=str(TIME_ZONE)) as api:
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        monkeypatch.setenv("GMAIL_API_BASE_URL", api.url)
+        yield api
+
+
+def test_find_events_in_email(api):
+    """Tests that messages are fetched in batches, bodies only for those that look like events, and the candidate."""
+    next_week = datetime.datetime.now(TIME_ZONE).date() + datetime.timedelta(days=7)
+    api.add_message("Weekly newsletter", "Nothing to attend here, just news about our training culture.")
+    training = api.add_message(
+        "You're registered: Security training",
+        "Thanks for registering.\n\nThe course runs on " + next_week.strftime("%B %d, %Y") + ", 1:00-3:30pm PT.\nLocation: HQ, Room 7\n",
+    )
+    api.add_message("Lunch?", "Are you free for lunch?")
+
+    candidates = find_events_in_email(SimpleNamespace(state={AUTHORIZER_NAME: "token"}, user_id="alice"), query="{training lunch}")
+
+    assert [candidate["message_id"] for candidate in candidates] == [training["id"]]
+    entry = candidates[0]["set_calendar_entry"]
+    start = datetime.datetime(next_week.year, next_week.month, next_week.day, 13, tzinfo=TIME_ZONE)
+    assert datetime.datetime.fromisoformat(entry["start_datetime_isoformat"]) == start
+    assert datetime.datetime.fromisoformat(entry["end_datetime_isoformat"]) == start + datetime.timedelta(hours=2, minutes=30)
+    assert entry["location"] == "HQ, Room 7"
+    assert entry["summary"] == "You're registered: Security training"
+    # Metadata of every message, then the text of the two that mention training
+    assert api.batches == [3, 2]
@@ -0,0 +1,129 @@
+import datetime
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from julian_gregory import gmail_sync
+from julian_gregory.app_utils.telemetry import TracedHttpRequest
+from julian_gregory.scopes import AUTHORIZER_NAME
+from julian_gregory.tools import find_events_in_email, set_calendar_entry
+from tests.fakes.fake_calendar_api import FakeCalendarApi
+
+TIME_ZONE = ZoneInfo("America/Los_Angeles")
+USER_EMAIL = "me@example.com"
+HISTORY = ("GET", "/gmail/v1/users/me/history")
+LIST_MESSAGES = ("GET", "/gmail/v1/users/me/messages")
+
+
+def training(api: FakeCalendarApi, name: str, days: int) -> dict:
+    date = datetime.datetime.now(TIME_ZONE).date() + datetime.timedelta(days=days)
+    return api.add_message(f"{name} training", f"Join us on {date.isoformat()} at 10:00am.\nWhere: Room {days}\n")
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setenv("GMAIL_SYNC_DIR", str(tmp_path))
+    gmail_sync.get_gmail_sync_store.cache_clear()
+    with FakeCalendarApi(user_email=USER_EMAIL, time_zone=str(TIME_ZONE)) as api:
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        monkeypatch.setenv("GMAIL_API_BASE_URL", api.url)
+        yield api
+    gmail_sync.get_gmail_sync_store.cache_clear()
+
+
+@pytest.fixture
+def tool_context():
+    return SimpleNamespace(state={AUTHORIZER_NAME: "token"}, user_id="alice")
+
+
+def test_only_new_mail_is_scanned(api, tool_context):
+    """Tests that later scans read history and fetch only new messages, and that expired history scans in full again."""
+    first = training(api, "Security", 3)
+    assert [candidate["message_id"] for candidate in find_events_in_email(tool_context)] == [first["id"]]
+    assert api.requests.count(LIST_MESSAGES) == 1
+    assert api.batches == [1, 1]
+
+    second = training(api, "Safety", 5)
+    removed = training(api, "Cancelled", 6)
+    api.delete_message(removed["id"])
+    training_in_the_past = training(api, "Old", -2)
+
+    candidates = find_events_in_email(tool_context)
+
+    assert [candidate["message_id"] for candidate in candidates] == [second["id"], first["id"]]
+    assert api.requests.count(HISTORY) == 1
+    assert api.requests.count(LIST_MESSAGES) == 1
+    # The deleted message isn't fetched; the one in the past is scanned but not proposed
+    assert api.batches[2:] == [2, 2]
+    assert training_in_the_past["id"] not in {candidate["message_id"] for candidate in candidates}
+
+    api.expire_gmail_history()
+    third = training(api, "Privacy", 4)
+    assert [candidate["message_id"] for candidate in find_events_in_email(tool_context)] == [third["id"], second["id"], first["id"]]
+    assert api.requests.count(LIST_MESSAGES) == 2
+    assert api.batches[4:] == [1, 1]
+
+
+def test_an_email_is_booked_once(api, tool_context, tmp_path, monkeypatch):
+    """Tests that booking a candidate twice, even after the local store is lost, creates one event."""
+    training(api, "Security", 3)
+    (candidate,) = find_events_in_email(tool_context)
+
+    created = set_calendar_entry(**candidate["set_calendar_entry"], tool_context=tool_context)
+    again = set_calendar_entry(**candidate["set_calendar_entry"], tool_context=tool_context)
+
+    assert "already_booked" not in created
+    assert again["already_booked"] and again["id"] == created["id"]
+    assert find_events_in_email(tool_context) == []
+
+    monkeypatch.setenv("GMAIL_SYNC_DIR", str(tmp_path / "lost"))
+    lost = set_calendar_entry(**candidate["set_calendar_entry"], tool_context=tool_context)
+
+    assert lost["already_booked"] and lost["id"] == created["id"]
+    assert len(api.events[USER_EMAIL]) == 1
+
+
+def test_a_failed_booking_releases_the_email(api, tool_context, monkeypatch):
+    """Tests that an email whose booking failed on something other than an API error can be booked again."""
+    training(api, "Security", 3)
+    (candidate,) = find_events_in_email(tool_context)
+    execute = TracedHttpRequest.execute
+
+    def timing_out_insert(self, *args, **kwargs):
+        if self.methodId == "calendar.events.insert":
+            raise TimeoutError("timed out")
+        return execute(self, *args, **kwargs)
+
+    monkeypatch.setattr(TracedHttpRequest, "execute", timing_out_insert)
+    with pytest.raises(TimeoutError):
+        set_calendar_entry(**candidate["set_calendar_entry"], tool_context=tool_context)
+    monkeypatch.setattr(TracedHttpRequest, "execute", execute)
+
+    created = set_calendar_entry(**candidate["set_calendar_entry"], tool_context=tool_context)
+
+    assert "already_booked" not in created
+    assert len(api.events[USER_EMAIL]) == 1
+
+
+def test_stale_claims_and_deleted_events_are_booked_again(api, tool_context, tmp_path, monkeypatch):
+    """Tests that a claim left by a dead booking lapses, and that an email whose event was deleted is booked again."""
+    training(api, "Security", 3)
+    (candidate,) = find_events_in_email(tool_context)
+    store = gmail_sync.get_gmail_sync_store(gmail_sync.gmail_sync_path(tool_context.user_id))
+    assert store.claim(candidate["message_id"]) is None
+
+    assert set_calendar_entry(**candidate["set_calendar_entry"], tool_context=tool_context)["already_booked"]
+    monkeypatch.setattr(gmail_sync, "CLAIM_TIMEOUT_SECONDS", -1)
+    created = set_calendar_entry(**candidate["set_calendar_entry"], tool_context=tool_context)
+    assert "already_booked" not in created
+
+    api.delete_event("primary", created["id"])
+    rebooked = set_calendar_entry(**candidate["set_calendar_entry"], tool_context=tool_context)
+    assert "already_booked" not in rebooked and rebooked["status"] == "confirmed"
+
+    api.delete_event("primary", created["id"])
+    monkeypatch.setenv("GMAIL_SYNC_DIR", str(tmp_path / "lost"))
+    lost = set_calendar_entry(**candidate["set_calendar_entry"], tool_context=tool_context)
+    assert "already_booked" not in lost and lost["status"] == "confirmed"
+    assert list(api.events[USER_EMAIL]) == [created["id"]]
@@ -0,0 +1,110 @@
+import threading
+
+from julian_gregory.app_utils.log_writer import BatchLogWriter, InMemorySink
+
+
+def test_flushes_on_batch_size():
+    """Tests that full batches are handed to the sink without waiting for the interval."""
+    sink = InMemorySink()
+    writer = BatchLogWriter(sink, max_batch_size=3, flush_interval_seconds=60)
+
+    for i in range(7):
+        writer.write({"score": i})
+    writer.flush()
+    writer.close()
+
+    assert [len(batch) for batch in sink.batches] == [3, 3, 1]
+    assert [entry["score"] for entry in sink.entries] == list(range(7))
+
+
+def test_flushes_on_interval():
+    """Tests that a partial batch is written once the flush interval passes."""
+    written = threading.Event()
+    sink = InMemorySink()
+
+    def sink_and_signal(entries):
+        sink(entries)
+        written.set()
+
+    writer = BatchLogWriter(sink_and_signal, max_batch_size=100, flush_interval_seconds=0.05)
+    writer.write({"score": 1})
+
+    assert written.wait(timeout=5)
+    assert sink.entries == [{"score": 1}]
+    writer.close()
+
+
+def test_close_flushes_pending_entries():
+    """Tests that entries still buffered at shutdown are written."""
+    sink = InMemorySink()
+    writer = BatchLogWriter(sink, max_batch_size=100, flush_interval_seconds=60)
+    writer.write({"score": 1})
+    writer.write({"score": 2})
+
+    writer.close()
+
+    assert len(sink.entries) == 2
+    assert writer.write({"score": 3}) is False
+
+
+def test_drops_when_queue_full():
+    """Tests that entries are dropped and counted when the sink cannot keep up."""
+    release = threading.Event()
+    sink = InMemorySink()
+
+    def blocking_sink(entries):
+        release.wait(timeout=5)
+        sink(entries)
+
+    writer = BatchLogWriter(blocking_sink, max_batch_size=1, flush_interval_seconds=60, max_queue_size=2)
+    results = [writer.write({"score": i}) for i in range(10)]
+    release.set()
+    writer.close()
+
+    assert writer.dropped == results.count(False)
+    assert writer.dropped > 0
+    assert len(sink.entries) == results.count(True)
+
+
+def test_sink_failure_is_counted():
+    """Tests that a failing sink doesn't kill the writer thread."""
+    calls = []
+
+    def failing_sink(entries):
+        calls.append(entries)
+        if len(calls) == 1:
+            raise RuntimeError("logging unavailable")
+
+    writer = BatchLogWriter(failing_sink, max_batch_size=1, flush_interval_seconds=60)
+    writer.write({"score": 1})
+    writer.write({"score": 2})
+    writer.close()
+
+    assert writer.failed == 1
+    assert len(calls) == 2
+
+
+def test_writes_after_close_are_dropped(caplog):
+    """Tests that entries written after close, or queued behind its stop marker, are counted as dropped."""
+    release = threading.Event()
+    sink = InMemorySink()
+
+    def blocking_sink(entries):
+        release.wait(timeout=5)
+        sink(entries)
+
+    writer = BatchLogWriter(blocking_sink, max_batch_size=1, flush_interval_seconds=60)
+    writer.write({"score": 1})
+    closing = threading.Thread(target=writer.close)
+    closing.start()
+    while writer._queue.qsize() < 1:
+        pass
+    # A write that got past the closed check just before close() queued its stop marker
+    writer._queue.put({"score": 2})
+    release.set()
+    closing.join(timeout=5)
+
+    assert writer.write({"score": 3}) is False
+    assert sink.entries == [{"score": 1}]
+    assert writer.dropped == 2
+    assert "dropped" in caplog.text
@@ -0,0 +1,116 @@
+import datetime
+import os
+import time
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from julian_gregory import event_index, helper_funcs, notifications
+from julian_gregory.freebusy import query_busy
+from julian_gregory.notifications import WebhookReceiver, channel_registry, handle_notification, start_webhook_receiver, watch_calendars
+from julian_gregory.scopes import AUTHORIZER_NAME
+from julian_gregory.tools import search_events
+from tests.fakes.fake_calendar_api import FakeCalendarApi
+
+TIME_ZONE = ZoneInfo("America/Los_Angeles")
+USER_EMAIL = "me@example.com"
+LIST_EVENTS = ("GET", "/calendar/v3/calendars/primary/events")
+FREEBUSY = ("POST", "/calendar/v3/freeBusy")
+
+
+def at(days: int, hour: int) -> datetime.datetime:
+    today = datetime.datetime.now(TIME_ZONE).date()
+    return datetime.datetime(today.year, today.month, today.day, hour, tzinfo=TIME_ZONE) + datetime.timedelta(days=days)
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setenv("EVENT_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setenv("WATCH_CHANNELS_PATH", str(tmp_path / "channels.sqlite3"))
+    event_index.get_event_index.cache_clear()
+    notifications.get_channel_registry.cache_clear()
+    with FakeCalendarApi(user_email=USER_EMAIL, time_zone=str(TIME_ZONE)) as api, WebhookReceiver(channel_registry()) as receiver:
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        monkeypatch.setenv("WATCH_WEBHOOK_URL", receiver.url)
+        yield api
+    event_index.get_event_index.cache_clear()
+    notifications.get_channel_registry.cache_clear()
+
+
+@pytest.fixture
+def tool_context():
+    return SimpleNamespace(state={AUTHORIZER_NAME: "token"}, user_id="alice")
+
+
+def test_notifications_mark_caches_dirty(api, tool_context):
+    """Tests that a watched calendar is only synced again, and its busy time fetched again, after it changes."""
+    dentist = api.add_event(USER_EMAIL, "Dentist", at(1, 9), at(1, 10))
+    calendar_service = helper_funcs.get_calendar_service(tool_context)
+    assert [event["summary"] for event in search_events(tool_context)] == ["Dentist"]
+    query_busy(calendar_service, [USER_EMAIL], at(1, 0).isoformat(), at(2, 0).isoformat(), user_id=tool_context.user_id)
+    assert len(api.channels) == 1
+
+    search_events(tool_context)
+    query_busy(calendar_service, [USER_EMAIL], at(1, 0).isoformat(), at(2, 0).isoformat(), user_id=tool_context.user_id)
+    assert api.requests.count(LIST_EVENTS) == 1
+    assert api.requests.count(FREEBUSY) == 1
+
+    api.update_event(USER_EMAIL, dentist["id"], summary="Orthodontist")
+
+    assert api.notifications[-1][1:] == ("exists", 200)
+    assert [event["summary"] for event in search_events(tool_context)] == ["Orthodontist"]
+    query_busy(calendar_service, [USER_EMAIL], at(1, 0).isoformat(), at(2, 0).isoformat(), user_id=tool_context.user_id)
+    assert api.requests.count(LIST_EVENTS) == 2
+    assert api.requests.count(FREEBUSY) == 2
+
+
+def test_channels_are_renewed_and_checked(api, tool_context):
+    """Tests that expiring channels are replaced and stopped, and that notifications need the channel's token."""
+    calendar_service = helper_funcs.get_calendar_service(tool_context)
+    registry = channel_registry()
+    assert watch_calendars(registry, calendar_service, "alice", ["primary"], os.environ["WATCH_WEBHOOK_URL"]) == {"primary"}
+    (old,) = registry.live("alice", time.time()).values()
+    assert old.resolved_id == USER_EMAIL
+
+    assert watch_calendars(registry, calendar_service, "alice", ["primary"], os.environ["WATCH_WEBHOOK_URL"], now=old.expiration - 60) == {"primary"}
+
+    (new,) = registry.live("alice", time.time()).values()
+    assert new.channel_id != old.channel_id
+    assert list(api.channels) == [new.channel_id]
+    assert handle_notification(registry, {"X-Goog-Channel-ID": new.channel_id, "X-Goog-Channel-Token": old.token}) == 404
+    assert handle_notification(registry, {"X-Goog-Channel-ID": old.channel_id, "X-Goog-Channel-Token": old.token}) == 404
+    assert handle_notification(registry, {"X-Goog-Channel-ID": new.channel_id, "X-Goog-Channel-Token": new.token,
+                                          "X-Goog-Resource-State": "exists"}) == 200
+
+
+def test_registry_is_read_only_when_channels_need_renewal(api, tool_context, monkeypatch):
+    """Tests that watching the same calendars again only reads the registry once a channel is due for renewal."""
+    calendar_service = helper_funcs.get_calendar_service(tool_context)
+    registry = channel_registry()
+    address = os.environ["WATCH_WEBHOOK_URL"]
+    watch_calendars(registry, calendar_service, "alice", ["primary"], address)
+    (channel,) = registry.live("alice", time.time()).values()
+    reads = []
+    live = registry.live
+    monkeypatch.setattr(registry, "live", lambda *args: reads.append(args) or live(*args))
+
+    assert watch_calendars(registry, calendar_service, "alice", ["primary"], address) == {"primary"}
+    assert reads == []
+    assert watch_calendars(registry, calendar_service, "alice", ["primary"], address, now=channel.expiration - 60) == {"primary"}
+    assert len(reads) == 1
+
+
+def test_receiver_in_several_workers(tmp_path, monkeypatch):
+    """Tests that a worker finding the port taken goes on without a receiver, and that workers share the freebusy cache."""
+    monkeypatch.setenv("WATCH_CHANNELS_PATH", str(tmp_path / "channels.sqlite3"))
+    monkeypatch.setenv("WATCH_RECEIVER_HOST", "127.0.0.1")
+    monkeypatch.setenv("NUM_WORKERS", "2")
+    monkeypatch.setenv("FREEBUSY_CACHE_BACKEND", "memory")
+    notifications.get_channel_registry.cache_clear()
+    with WebhookReceiver(channel_registry()) as first:
+        monkeypatch.setenv("WATCH_RECEIVER_PORT", first.url.split(":")[-1].split("/")[0])
+
+        assert start_webhook_receiver() is None
+    assert os.environ["FREEBUSY_CACHE_BACKEND"] == "sqlite"
+    notifications.get_channel_registry.cache_clear()
@@ -0,0 +1,97 @@
+import datetime
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from julian_gregory.recurring import WeekGrid, bits
+from julian_gregory.scopes import AUTHORIZER_NAME
+from julian_gregory.time_utils import local_to_epoch, to_isoformat
+from julian_gregory.tools import find_recurring_slots
+from tests.fakes.fake_calendar_api import FakeCalendarApi
+
+TIME_ZONE = ZoneInfo("America/Los_Angeles")
+ALICE = "alice@example.com"
+BOB = "bob@example.com"
+GRID = WeekGrid(9, 12)  # 12 cells a day
+
+
+def test_busy_mask_and_free_starts():
+    """Tests busy cells rounded outwards, starts on the half hour, and meetings kept within the day."""
+    monday = datetime.date(2025, 12, 8)
+    ten = local_to_epoch(monday, 10, TIME_ZONE)
+    # Monday 10:10-10:20 and Tuesday 9:00-9:30
+    tuesday_nine = local_to_epoch(monday + datetime.timedelta(days=1), 9, TIME_ZONE)
+    busy = [(ten + 600, ten + 1200), (tuesday_nine, tuesday_nine + 1800)]
+
+    mask = GRID.busy_mask(busy, monday, TIME_ZONE)
+    assert list(bits(mask)) == [4, 5, 12, 13]
+
+    starts = GRID.free_starts(mask, 60)
+    monday_starts = [GRID.wall_time(bit)[1] for bit in bits(starts) if bit < 12]
+    tuesday_starts = [GRID.wall_time(bit)[1] for bit in bits(starts) if 12 <= bit < 24]
+    assert monday_starts == ["09:00", "10:30", "11:00"]
+    assert tuesday_starts == ["09:30", "10:00", "10:30", "11:00"]
+    assert GRID.free_starts(0, 4 * 60) == 0
+
+
+def test_occurrences_keep_wall_time_across_dst():
+    """Tests that a weekly slot stays at the same local time when DST ends."""
+    bit = 1 * GRID.cells_per_day + 4  # Tuesday 10:00
+    before = GRID.occurrence(bit, datetime.date(2025, 10, 27), TIME_ZONE)
+    after = GRID.occurrence(bit, datetime.date(2025, 11, 3), TIME_ZONE)
+
+    assert to_isoformat(before[1], TIME_ZONE) == "2025-10-28T10:00:00-07:00"
+    assert to_isoformat(after[1], TIME_ZONE) == "2025-11-04T10:00:00-08:00"
+    assert GRID.wall_time(bit, 90) == (1, "11:30")
+
+
+@pytest.fixture
+def api(monkeypatch):
+    with FakeCalendarApi(user_email=ALICE, time_zone=str(TIME_ZONE)) as api:
+        api.add_calendar(BOB, time_zone=str(TIME_ZONE))
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        yield api
+
+
+def week_dates(weeks: int) -> list[datetime.date]:
+    first = datetime.datetime.now(TIME_ZONE).date() + datetime.timedelta(days=1)
+    return [first + datetime.timedelta(days=day) for day in range(weeks * 7)]
+
+
+def at(date: datetime.date, hour: int, minute: int = 0) -> datetime.datetime:
+    return datetime.datetime(date.year, date.month, date.day, hour, minute, tzinfo=TIME_ZONE)
+
+
+def test_find_recurring_slots(api):
+    """Tests that only times free for everyone every week are returned, from one freebusy query."""
+    dates = week_dates(8)
+    for date in dates:
+        if date.weekday() >= 5:
+            continue
+        # Alice is busy every morning but 11-12 on Tuesdays, Bob every afternoon but 14-15 on Thursdays
+        for hour in (8, 9, 10, 11):
+            if not (date.weekday() == 1 and hour == 11):
+                api.add_event(ALICE, "Focus", at(date, hour), at(date, hour + 1))
+        for hour in (12, 13, 14, 15, 16):
+            if not (date.weekday() == 3 and hour == 14):
+                api.add_event(BOB, "Busy", at(date, hour), at(date, hour + 1))
+    # One Tuesday clashes
+    clash = next(date for date in dates[21:] if date.weekday() == 1)
+    api.add_event(BOB, "Offsite", at(clash, 11), at(clash, 12))
+    tool_context = SimpleNamespace(state={AUTHORIZER_NAME: "token"}, user_id="alice")
+
+    slots = find_recurring_slots(tool_context, [ALICE, BOB], weeks=8)["slots"]
+
+    assert [(slot["weekday"], slot["start_time"], slot["end_time"]) for slot in slots] == [("Thursday", "14:00", "15:00")]
+    assert slots[0]["weeks_free"] == 8
+    assert slots[0]["busy_weeks"] == []
+    first_thursday = next(date for date in dates if date.weekday() == 3)
+    assert slots[0]["first_start"] == at(first_thursday, 14).isoformat()
+    assert api.requests.count(("POST", "/calendar/v3/freeBusy")) == 1
+
+    ranked = find_recurring_slots(tool_context, [ALICE, BOB], weeks=8, min_weeks_free=7)["slots"]
+    assert [(slot["weekday"], slot["start_time"], slot["weeks_free"]) for slot in ranked] == [
+        ("Thursday", "14:00", 8), ("Tuesday", "11:00", 7),
+    ]
+    assert ranked[1]["busy_weeks"] == [clash.isoformat()]
@@ -0,0 +1,98 @@
+import datetime
+import json
+import os
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from julian_gregory.rooms import availability_matrix, filter_rooms, load_room_directory
+from julian_gregory.scopes import AUTHORIZER_NAME
+from julian_gregory.tools import find_available_rooms
+from tests.fakes.fake_calendar_api import FakeCalendarApi
+
+TIME_ZONE = ZoneInfo("America/Los_Angeles")
+DAY = datetime.datetime(2025, 12, 9, tzinfo=TIME_ZONE)
+
+
+def room(index: int, capacity: int, building: str = "SFO-1") -> dict:
+    return {
+        "resourceEmail": f"room{index}@resource.calendar.google.com",
+        "resourceName": f"Room {index}",
+        "capacity": capacity,
+        "buildingId": building,
+        "floorName": str(index % 5),
+        "resourceCategory": "CONFERENCE_ROOM",
+    }
+
+
+def at(hour: int, minute: int = 0) -> datetime.datetime:
+    return DAY.replace(hour=hour, minute=minute)
+
+
+def test_availability_matrix():
+    """Tests free-room bitmasks for unsorted, overlapping slots, with an unreadable calendar never free."""
+    slots = [(30, 40), (0, 10), (5, 15), (40, 50)]
+    busy = [[(8, 12), (35, 36)], [], None, [(10, 40)]]
+
+    free = availability_matrix(slots, busy)
+
+    assert [[room for room in range(4) if mask >> room & 1] for mask in free] == [[1], [1, 3], [1], [0, 1, 3]]
+
+
+def test_room_directory(tmp_path, monkeypatch):
+    """Tests loading the directory as a list or an Admin SDK response, and filtering it."""
+    path = tmp_path / "rooms.json"
+    monkeypatch.setenv("ROOM_DIRECTORY_PATH", str(path))
+    assert load_room_directory() == ()
+
+    path.write_text(json.dumps([room(1, 4), room(2, 12, "NYC-9"), {**room(3, 50), "resourceCategory": "OTHER"}]))
+    assert len(load_room_directory()) == 2
+
+    path.write_text(json.dumps({"kind": "admin#directory#resources#calendars#calendarResourcesList",
+                                "items": [room(1, 4), room(2, 12, "NYC-9"), room(4, 8)]}))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    rooms = load_room_directory()
+    assert [r["resourceName"] for r in filter_rooms(rooms, min_capacity=5)] == ["Room 4", "Room 2"]
+    assert [r["resourceName"] for r in filter_rooms(rooms, building="nyc")] == ["Room 2"]
+
+
+@pytest.fixture
+def rooms_api(tmp_path, monkeypatch):
+    rooms = [room(index, capacity=4 + index % 10) for index in range(120)]
+    path = tmp_path / "rooms.json"
+    path.write_text(json.dumps(rooms))
+    monkeypatch.setenv("ROOM_DIRECTORY_PATH", str(path))
+    with FakeCalendarApi(time_zone=str(TIME_ZONE)) as api:
+        for r in rooms:
+            api.add_calendar(r["resourceEmail"])
+        # Every room but two is booked from 10 to 11
+        for r in rooms[2:]:
+            api.add_event(r["resourceEmail"], "Booked", at(10), at(11))
+        api.add_event(rooms[0]["resourceEmail"], "Booked", at(14), at(15))
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        yield api, rooms
+
+
+def test_find_available_rooms(rooms_api):
+    """Tests slot and room pairs for 120 rooms, answered by one batch of three freebusy queries."""
+    api, rooms = rooms_api
+    slots = [{"start": at(10).isoformat(), "end": at(11).isoformat()},
+             {"start": at(14, 30).isoformat(), "end": at(15, 30).isoformat()}]
+
+    results = find_available_rooms(SimpleNamespace(state={AUTHORIZER_NAME: "token"}, user_id="alice"), slots, min_capacity=4, max_rooms_per_slot=5)
+
+    assert [result["start"] for result in results] == [slot["start"] for slot in slots]
+    assert {r["email"] for r in results[0]["rooms"]} == {rooms[0]["resourceEmail"], rooms[1]["resourceEmail"]}
+    assert rooms[0]["resourceEmail"] not in {r["email"] for r in results[1]["rooms"]}
+    assert len(results[1]["rooms"]) == 5
+    assert [r["capacity"] for r in results[1]["rooms"]] == sorted(r["capacity"] for r in results[1]["rooms"])
+    assert api.requests.count(("POST", "/calendar/v3/freeBusy")) == 3
+
+
+def test_find_available_rooms_without_directory(tmp_path, monkeypatch):
+    """Tests that no directory means no rooms, without calling the API."""
+    monkeypatch.setenv("ROOM_DIRECTORY_PATH", str(tmp_path / "missing.json"))
+    slots = [{"start": at(10).isoformat(), "end": at(11).isoformat()}]
+
+    assert find_available_rooms(SimpleNamespace(state={}), slots) == [{**slots[0], "rooms": []}]
@@ -0,0 +1,140 @@
+import os
+from unittest.mock import patch
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import Status, StatusCode
+
+from julian_gregory.app_utils.sampling import TailSamplingSpanProcessor, install_tail_sampling
+from julian_gregory.app_utils.telemetry import setup_telemetry
+
+TELEMETRY_ENV_VARS = [
+    "TELEMETRY_PROFILE",
+    "TELEMETRY_SAMPLING_MODE",
+    "TELEMETRY_SAMPLE_RATIO",
+    "TELEMETRY_SLOW_TRACE_MS",
+    "OTEL_BSP_MAX_QUEUE_SIZE",
+    "OTEL_BSP_MAX_EXPORT_BATCH_SIZE",
+    "OTEL_BSP_SCHEDULE_DELAY",
+    "OTEL_TRACES_SAMPLER",
+    "OTEL_TRACES_SAMPLER_ARG",
+    "OTEL_INSTRUMENTATION_GENAI_COMPLETION_HOOK",
+    "GOOGLE_CLOUD_AGENT_ENGINE_ENABLE_TELEMETRY",
+    "LOGS_BUCKET_NAME",
+]
+
+
+@pytest.fixture
+def clean_env():
+    """Restores the whole environment afterwards, including variables setup_telemetry adds."""
+    with patch.dict(os.environ):
+        for name in TELEMETRY_ENV_VARS:
+            os.environ.pop(name, None)
+        yield os.environ
+
+
+def make_tracer(sample_ratio, slow_trace_ms=1000):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(
+        TailSamplingSpanProcessor(SimpleSpanProcessor(exporter), sample_ratio, slow_trace_ms)
+    )
+    return provider.get_tracer("test"), exporter
+
+
+def test_drops_ordinary_traces_at_zero_ratio():
+    """Tests that fast, successful traces are dropped with their children."""
+    tracer, exporter = make_tracer(sample_ratio=0.0)
+    with tracer.start_as_current_span("turn"):
+        with tracer.start_as_current_span("tool"):
+            pass
+
+    assert exporter.get_finished_spans() == ()
+
+
+def test_keeps_every_trace_at_full_ratio():
+    """Tests that a ratio of 1 exports the whole trace."""
+    tracer, exporter = make_tracer(sample_ratio=1.0)
+    with tracer.start_as_current_span("turn"):
+        with tracer.start_as_current_span("tool"):
+            pass
+
+    assert {span.name for span in exporter.get_finished_spans()} == {"turn", "tool"}
+
+
+def test_keeps_traces_with_errors():
+    """Tests that an error in any child span keeps the whole trace."""
+    tracer, exporter = make_tracer(sample_ratio=0.0)
+    with tracer.start_as_current_span("turn"):
+        with tracer.start_as_current_span("tool") as span:
+            span.set_status(Status(StatusCode.ERROR))
+
+    assert len(exporter.get_finished_spans()) == 2
+
+
+def test_keeps_slow_traces():
+    """Tests that a root span longer than the threshold keeps the trace."""
+    tracer, exporter = make_tracer(sample_ratio=0.0, slow_trace_ms=1000)
+    span = tracer.start_span("turn", start_time=0)
+    span.end(end_time=2_000_000_000)
+
+    assert len(exporter.get_finished_spans()) == 1
+
+
+def test_low_overhead_profile(clean_env):
+    """Tests that the low overhead profile samples, batches more and skips completion upload."""
+    clean_env["TELEMETRY_PROFILE"] = "low_overhead"
+    clean_env["LOGS_BUCKET_NAME"] = "bucket"
+
+    setup_telemetry()
+
+    assert os.environ["TELEMETRY_SAMPLE_RATIO"] == "0.1"
+    assert os.environ["OTEL_BSP_MAX_QUEUE_SIZE"] == "8192"
+    assert "OTEL_INSTRUMENTATION_GENAI_COMPLETION_HOOK" not in os.environ
+
+
+def test_head_sampling_sets_otel_sampler(clean_env):
+    """Tests that head sampling is delegated to the OpenTelemetry SDK sampler."""
+    clean_env["TELEMETRY_SAMPLING_MODE"] = "head"
+    clean_env["TELEMETRY_SAMPLE_RATIO"] = "0.25"
+
+    setup_telemetry()
+
+    assert os.environ["OTEL_TRACES_SAMPLER"] == "parentbased_traceidratio"
+    assert os.environ["OTEL_TRACES_SAMPLER_ARG"] == "0.25"
+
+
+def test_off_profile_disables_telemetry(clean_env):
+    """Tests that the off profile turns Agent Engine telemetry off."""
+    clean_env["TELEMETRY_PROFILE"] = "off"
+
+    setup_telemetry()
+
+    assert os.environ["GOOGLE_CLOUD_AGENT_ENGINE_ENABLE_TELEMETRY"] == "false"
+
+
+def test_install_wraps_export_processors(clean_env):
+    """Tests that installing tail sampling wraps the processors of the global provider."""
+    clean_env["TELEMETRY_SAMPLE_RATIO"] = "0.0"
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+    with patch("opentelemetry.trace.get_tracer_provider", return_value=provider):
+        assert install_tail_sampling()
+    with provider.get_tracer("test").start_as_current_span("turn"):
+        pass
+
+    assert exporter.get_finished_spans() == ()
+
+
+def test_install_falls_back_without_sdk_internals(clean_env):
+    """Tests that an SDK without the private processor list is left exporting everything instead of failing."""
+    clean_env["TELEMETRY_SAMPLE_RATIO"] = "0.0"
+    provider = TracerProvider(shutdown_on_exit=False)
+    provider._active_span_processor = object()
+
+    with patch("opentelemetry.trace.get_tracer_provider", return_value=provider):
+        assert install_tail_sampling() is False
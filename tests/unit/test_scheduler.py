@@ -0,0 +1,125 @@
+import datetime
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from julian_gregory.scheduler import Meeting, solve
+from julian_gregory.scopes import AUTHORIZER_NAME
+from julian_gregory.tools import schedule_meetings
+from tests.fakes.fake_calendar_api import FakeCalendarApi
+
+TIME_ZONE = ZoneInfo("America/Los_Angeles")
+USER_EMAIL = "pm@example.com"
+CANDIDATE = "candidate@example.com"
+INTERVIEWERS = ["ana@example.com", "ben@example.com", "chen@example.com"]
+
+
+def test_solve_backtracks_and_orders():
+    """Tests backtracking out of a first choice that leaves no room, and after/min_gap ordering."""
+    meetings = [
+        Meeting(frozenset({"a"}), 10, (0, 10)),
+        Meeting(frozenset({"a"}), 10, (0, 5)),
+        Meeting(frozenset({"b"}), 10, (0, 15, 30, 45), after=(0, 1), min_gap=15),
+    ]
+
+    assert solve(meetings) == [10, 0, 45]
+
+
+def test_solve_partial_and_invalid():
+    """Tests leaving out what doesn't fit, and the meetings that must follow it, and rejecting circular constraints."""
+    meetings = [Meeting(frozenset({"a"}), 10, (0,)), Meeting(frozenset({"a"}), 10, (5,)), Meeting(frozenset({"b"}), 10, (0,))]
+    assert solve(meetings) == [0, None, 0]
+    assert solve(meetings + [Meeting(frozenset({"c"}), 10, (20,), after=(1,))]) == [0, None, 0, None]
+
+    with pytest.raises(ValueError):
+        solve([Meeting(frozenset({"a"}), 10, (0,), after=(1,)), Meeting(frozenset({"a"}), 10, (0,), after=(0,))])
+
+
+@pytest.fixture
+def api(monkeypatch):
+    with FakeCalendarApi(user_email=USER_EMAIL, time_zone=str(TIME_ZONE)) as api:
+        for email in INTERVIEWERS:
+            api.add_calendar(email, time_zone=str(TIME_ZONE))
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        yield api
+
+
+def interview_loop() -> list[dict]:
+    interviews = [{"summary": f"Interview with {email}", "attendees": [CANDIDATE, email], "duration_minutes": 45} for email in INTERVIEWERS]
+    debrief = {"summary": "Debrief", "attendees": INTERVIEWERS, "duration_minutes": 30, "after": [0, 1, 2], "min_gap_minutes": 30}
+    return interviews + [debrief]
+
+
+def test_schedule_interview_loop(api):
+    """Tests that the loop avoids busy time and double-booking, keeps the debrief last, and is booked in one batch."""
+    first_day = datetime.datetime.now(TIME_ZONE).date() + datetime.timedelta(days=1)
+    busy = []
+    for day in range(7):
+        date = first_day + datetime.timedelta(days=day)
+        start = datetime.datetime(date.year, date.month, date.day, 8, tzinfo=TIME_ZONE)
+        busy.append((INTERVIEWERS[0], start, start + datetime.timedelta(hours=6)))
+        busy.append((INTERVIEWERS[1], start + datetime.timedelta(hours=5), start + datetime.timedelta(hours=7)))
+    for email, start, end in busy:
+        api.add_event(email, "Busy", start, end)
+    tool_context = SimpleNamespace(state={AUTHORIZER_NAME: "token"}, user_id="alice")
+
+    result = schedule_meetings(tool_context, interview_loop(), time_delta_in_days=7)
+
+    assert result["unscheduled"] == []
+    slots = [(set(slot["attendees"]), datetime.datetime.fromisoformat(slot["start"]), datetime.datetime.fromisoformat(slot["end"]))
+             for slot in result["scheduled"]]
+    for attendees, start, end in slots:
+        assert start.weekday() < 5 and start.hour >= 8 and (end.hour, end.minute) <= (17, 0)
+        assert not any(email in attendees and start < busy_end and busy_start < end for email, busy_start, busy_end in busy)
+    for i, (attendees, start, end) in enumerate(slots):
+        assert not any(attendees & other and start < other_end and other_start < end for j, (other, other_start, other_end) in enumerate(slots) if i != j)
+    assert slots[3][1] >= max(end for _, _, end in slots[:3]) + datetime.timedelta(minutes=30)
+    assert api.requests.count(("POST", "/calendar/v3/freeBusy")) == 1
+    assert ("POST", "/calendar/v3/calendars/primary/events") not in api.requests
+
+    booked = schedule_meetings(tool_context, interview_loop(), time_delta_in_days=7, create_events=True)
+
+    assert [slot["start"] for slot in booked["scheduled"]] == [slot["start"] for slot in result["scheduled"]]
+    assert all(slot["event_id"] for slot in booked["scheduled"])
+    assert api.requests.count(("POST", "/calendar/v3/calendars/primary/events")) == 4
+    events = api.events[USER_EMAIL]
+    assert sorted(event["summary"] for event in events.values()) == sorted(meeting["summary"] for meeting in interview_loop())
+
+
+def test_nothing_booked_unless_everything_fits(api):
+    """Tests that a meeting past its deadline is reported and nothing is created."""
+    meetings = interview_loop()
+    meetings[3]["deadline"] = (datetime.datetime.now(TIME_ZONE).date() + datetime.timedelta(days=1)).isoformat()
+    meetings[0]["deadline"] = datetime.datetime.now(TIME_ZONE).date().isoformat()
+
+    result = schedule_meetings(SimpleNamespace(state={AUTHORIZER_NAME: "token"}, user_id="alice"), meetings, time_delta_in_days=7, create_events=True)
+
+    assert {slot["index"]: slot["reason"] for slot in result["unscheduled"]}[0] == "no time before the deadline is free for all attendees"
+    assert 3 in {slot["index"] for slot in result["unscheduled"]}
+    assert ("POST", "/calendar/v3/calendars/primary/events") not in api.requests
+
+
+def test_circular_after_and_partial_booking(api, monkeypatch):
+    """Tests that circular constraints are an error result, and that a failed insert deletes the events already created."""
+    tool_context = SimpleNamespace(state={AUTHORIZER_NAME: "token"}, user_id="alice")
+    meetings = interview_loop()
+    meetings[0]["after"] = [3]
+
+    assert "circular" in schedule_meetings(tool_context, meetings, time_delta_in_days=7)["error"]
+
+    handle = api.handle
+
+    def failing_debrief(method, raw_path, headers, body):
+        if method == "POST" and raw_path.startswith("/calendar/v3/calendars/primary/events") and b'"Debrief"' in body:
+            return 503, {"error": {"code": 503, "message": "backendError"}}
+        return handle(method, raw_path, headers, body)
+
+    monkeypatch.setattr(api, "handle", failing_debrief)
+    result = schedule_meetings(tool_context, interview_loop(), time_delta_in_days=7, create_events=True)
+
+    assert "error" in result
+    assert [slot.get("error") for slot in result["scheduled"]] == [None, None, None, "the event could not be created"]
+    assert not any("event_id" in slot for slot in result["scheduled"])
+    assert all(event["status"] == "cancelled" for event in api.events[USER_EMAIL].values())
+    assert len(api.events[USER_EMAIL]) == 3
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from julian_gregory.app_utils.sizing import (
+    ServiceProfile,
+    erlang_c,
+    histogram_percentile,
+    predict,
+    profile_from_load_reports,
+    recommend,
+    sizing,
+)
+
+
+def load_report(concurrency: int, mean_ms: float, p95_ms: float) -> dict:
+    return {
+        "config": {"sessions": 10, "concurrency": concurrency},
+        "turns": 20,
+        "cpu_ms_per_session": 100.0,
+        "service_time_ms": {"mean": mean_ms, "p95": p95_ms},
+    }
+
+
+def test_erlang_c():
+    """Tests the wait probability against the closed form for two servers."""
+    assert erlang_c(2, 1.0) == pytest.approx(1 / 3)
+    assert erlang_c(1, 0.5) == pytest.approx(0.5)
+    assert erlang_c(4, 0.0) == 0.0
+    assert erlang_c(4, 4.0) == 1.0
+
+
+def test_histogram_percentile():
+    """Tests interpolation within buckets and the overflow bucket."""
+    bounds = [100.0, 200.0, 400.0]
+    assert histogram_percentile(bounds, [0, 10, 0, 0], 0.5) == pytest.approx(150.0)
+    assert histogram_percentile(bounds, [50, 40, 10, 0], 0.95) == pytest.approx(300.0)
+    assert histogram_percentile(bounds, [0, 0, 0, 5], 0.95) == 400.0
+
+
+def test_service_time_interpolation():
+    """Tests that service time is interpolated between load tests and held beyond them."""
+    profile = profile_from_load_reports([load_report(8, 1200, 2400), load_report(4, 1000, 2000)])
+    assert profile.points[0][0] == 4
+    assert profile.cpu_seconds_per_request == pytest.approx(0.05)
+    assert profile.service_time(2) == (1.0, 2.0)
+    assert profile.service_time(6) == pytest.approx((1.1, 2.2))
+    assert profile.service_time(12) == (1.2, 2.4)
+    assert profile.max_concurrency == 8
+
+
+def test_recommend_meets_target():
+    """Tests that the recommendation keeps up with the peak rate within the p95 target and CPU ceiling."""
+    profile = ServiceProfile(points=[(1, 1.0, 2.0), (40, 1.0, 2.0)], cpu_seconds_per_request=0.1)
+
+    recommendation = recommend(profile, request_rate=30.0, target_p95_ms=2500, cpu="4", num_workers=1, headroom=1.5)
+
+    instances = recommendation["instances_at_peak"]
+    # One core per instance at 60%: at most 6 turns/s each
+    assert instances >= 5
+    assert recommendation["prediction"]["p95_ms"] <= 2500
+    assert recommendation["prediction"]["cpu_utilisation"] <= 0.6
+    assert instances * recommendation["container_concurrency"] >= 30
+    assert recommendation["max_instances"] == -(-instances * 3 // 2)
+    assert recommendation["min_instances"] == 1
+
+    more_workers = recommend(profile, request_rate=30.0, target_p95_ms=2500, cpu="4", num_workers=4)
+    assert more_workers["instances_at_peak"] < instances
+
+
+def test_recommend_avoids_contention():
+    """Tests that concurrency stops where the measured service time would break the target."""
+    profile = profile_from_load_reports([load_report(1, 500, 800), load_report(10, 900, 1500), load_report(20, 1500, 3000)])
+
+    recommendation = recommend(profile, request_rate=5.0, target_p95_ms=2000)
+
+    assert recommendation["container_concurrency"] < 15
+    assert recommend(profile, request_rate=50.0, target_p95_ms=5000)["container_concurrency"] <= 20
+    prediction = predict(profile, 5.0, recommendation["instances_at_peak"], recommendation["container_concurrency"], 1.0)
+    assert prediction == recommendation["prediction"]
+
+    with pytest.raises(ValueError, match="can't be met"):
+        recommend(profile, request_rate=5.0, target_p95_ms=700)
+
+
+def test_sizing_command(tmp_path):
+    """Tests that the command writes the deploy settings from a load report."""
+    report = tmp_path / "load.json"
+    report.write_text(json.dumps(load_report(9, 1000, 1800)))
+    output = tmp_path / "deployment_sizing.json"
+
+    result = CliRunner().invoke(sizing, [
+        f"--load-report={report}", "--target-p95-ms=3000", "--request-rate=20", f"--output={output}",
+    ])
+
+    assert result.exit_code == 0, result.output
+    written = json.loads(output.read_text())
+    assert {"min_instances", "max_instances", "container_concurrency", "cpu", "num_workers"} <= set(written)
+    assert f"--sizing-file={output}" in result.output
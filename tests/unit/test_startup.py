@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from julian_gregory.app_utils.importtime import parse_importtime
+
+# Budget for importing the Agent Engine entrypoint, in seconds. Override with
+# STARTUP_IMPORT_BUDGET_SECONDS on slower CI machines.
+STARTUP_IMPORT_BUDGET_SECONDS = float(os.environ.get("STARTUP_IMPORT_BUDGET_SECONDS", "15"))
+
+# AdkApp() resolves the GCP project at construction, so fake ADC in the child process
+IMPORT_ENTRYPOINT = """
+import sys
+import google.auth
+import google.auth.credentials
+google.auth.default = lambda *args, **kwargs: (google.auth.credentials.AnonymousCredentials(), "test-project")
+import julian_gregory.agent_engine_app
+print(",".join(sorted(name for name in sys.modules if name.startswith("google.cloud.logging"))))
+"""
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="module")
+def entrypoint_import():
+    """Imports the entrypoint once per module in a fresh interpreter with -X importtime."""
+    env = {k: v for k, v in os.environ.items() if not k.startswith("GOOGLE_CLOUD_PROJECT")}
+    env["PYTHONPATH"] = ROOT_DIR
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_ENTRYPOINT],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+
+def test_entrypoint_import_within_budget(entrypoint_import):
+    """Checks the entrypoint import against the cold-start budget and prints the slowest modules."""
+    result = entrypoint_import
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    rows = parse_importtime(result.stderr)
+    total_us = next(cumulative for name, _, cumulative in rows if name == "julian_gregory.agent_engine_app")
+
+    print(f"\nImport of julian_gregory.agent_engine_app: {total_us / 1e6:.2f}s")
+    print("Slowest modules (cumulative):")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:15]:
+        print(f"  {cumulative_us / 1e3:10.1f} ms  {self_us / 1e3:8.1f} ms self  {name}")
+
+    assert total_us / 1e6 < STARTUP_IMPORT_BUDGET_SECONDS
+
+
+def test_cloud_logging_not_imported_at_startup(entrypoint_import):
+    """Cloud Logging is only needed once set_up runs, so importing the entrypoint must not load it."""
+    result = entrypoint_import
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip() == ""
@@ -0,0 +1,110 @@
+import pytest
+from googleapiclient.discovery import build_from_document
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpMockSequence
+from opentelemetry import metrics, trace
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from julian_gregory.app_utils.telemetry import TracedHttpRequest, traced_tool
+from julian_gregory.helper_funcs import get_discovery_document
+
+span_exporter = InMemorySpanExporter()
+metric_reader = InMemoryMetricReader()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def telemetry_providers():
+    """Routes the module-level tracer and meter to in-memory exporters."""
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(SimpleSpanProcessor(span_exporter))
+    trace.set_tracer_provider(tracer_provider)
+    metrics.set_meter_provider(MeterProvider(metric_readers=[metric_reader]))
+
+
+@pytest.fixture(autouse=True)
+def clear_spans():
+    span_exporter.clear()
+
+
+def metric_points(name):
+    data = metric_reader.get_metrics_data()
+    return [
+        point
+        for resource_metrics in data.resource_metrics
+        for scope_metrics in resource_metrics.scope_metrics
+        for metric in scope_metrics.metrics
+        if metric.name == name
+        for point in metric.data.data_points
+    ]
+
+
+def build_calendar(responses):
+    return build_from_document(
+        get_discovery_document("calendar", "v3"),
+        http=HttpMockSequence(responses),
+        requestBuilder=TracedHttpRequest,
+    )
+
+
+def test_execute_span_records_method_status_and_size():
+    """Tests that a successful request records the API method, status and body size."""
+    body = '{"timeZone": "UTC"}'
+    calendar_service = build_calendar([({"status": "200"}, body)])
+
+    calendar_service.calendars().get(calendarId="primary").execute()
+
+    (span,) = span_exporter.get_finished_spans()
+    assert span.name == "google_api calendar.calendars.get"
+    assert span.attributes["http.response.status_code"] == 200
+    assert span.attributes["http.response.body.size"] == len(body)
+    assert span.attributes["google_api.retries"] == 0
+    assert any(
+        point.attributes["google_api.method"] == "calendar.calendars.get"
+        for point in metric_points("julian_gregory.google_api.duration")
+    )
+
+
+def test_execute_span_counts_retries():
+    """Tests that retried requests report the number of retries."""
+    calendar_service = build_calendar([({"status": "503"}, ""), ({"status": "200"}, "{}")])
+    request = calendar_service.calendars().get(calendarId="primary")
+    request._sleep = lambda seconds: None
+
+    request.execute(num_retries=2)
+
+    (span,) = span_exporter.get_finished_spans()
+    assert span.attributes["google_api.retries"] == 1
+
+
+def test_execute_span_marks_http_errors():
+    """Tests that HTTP errors are recorded on the span and re-raised."""
+    calendar_service = build_calendar([({"status": "404"}, '{"error": {"message": "Not Found"}}')])
+
+    with pytest.raises(HttpError):
+        calendar_service.events().get(calendarId="primary", eventId="missing").execute()
+
+    (span,) = span_exporter.get_finished_spans()
+    assert span.attributes["http.response.status_code"] == 404
+    assert span.status.is_ok is False
+
+
+def test_traced_tool_records_span_and_duration():
+    """Tests that tools keep their name and record a span per call."""
+
+    @traced_tool
+    def my_tool(tool_context, value: int = 1) -> int:
+        return value * 2
+
+    assert my_tool.__name__ == "my_tool"
+    assert my_tool(None, value=3) == 6
+
+    (span,) = span_exporter.get_finished_spans()
+    assert span.name == "tool my_tool"
+    assert any(
+        point.attributes == {"julian_gregory.tool": "my_tool", "status": "ok"}
+        for point in metric_points("julian_gregory.tool.duration")
+    )
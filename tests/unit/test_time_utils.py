@@ -0,0 +1,70 @@
+import datetime
+from unittest.mock import MagicMock, patch
+from zoneinfo import ZoneInfo
+
+from julian_gregory.time_utils import local_to_epoch, merge_intervals, to_epoch, to_isoformat
+from julian_gregory.tools import find_free_slots, find_free_slots_for_multiple_users
+
+LOS_ANGELES = ZoneInfo("America/Los_Angeles")
+# Egypt starts DST at midnight on a Friday, so the gap falls on a working day
+CAIRO = ZoneInfo("Africa/Cairo")
+
+
+def test_to_epoch():
+    """Tests that offsets, Z and naive timestamps all map to the same instant."""
+    instant = to_epoch("2025-11-03T17:00:00Z")
+    assert to_epoch("2025-11-03T09:00:00-08:00") == instant
+    assert to_epoch("2025-11-03T17:00:00.000Z") == instant
+    assert to_epoch("2025-11-03T09:00:00", LOS_ANGELES) == instant
+    assert to_epoch("2025-11-03T17:00:00") == instant
+
+
+def test_local_to_epoch_across_dst():
+    """Tests wall-clock hours on either side of a DST change, and inside a skipped hour."""
+    friday, monday = datetime.date(2025, 10, 31), datetime.date(2025, 11, 3)
+    assert to_isoformat(local_to_epoch(friday, 8, LOS_ANGELES), LOS_ANGELES) == "2025-10-31T08:00:00-07:00"
+    assert to_isoformat(local_to_epoch(monday, 8, LOS_ANGELES), LOS_ANGELES) == "2025-11-03T08:00:00-08:00"
+    assert local_to_epoch(monday, 8, LOS_ANGELES) - local_to_epoch(friday, 8, LOS_ANGELES) == (3 * 24 + 1) * 3600
+
+    gap_day = datetime.date(2025, 4, 25)
+    assert to_isoformat(local_to_epoch(gap_day, 0, CAIRO), CAIRO) == "2025-04-25T01:00:00+03:00"
+    assert local_to_epoch(gap_day, 4, CAIRO) - local_to_epoch(gap_day, 0, CAIRO) == 3 * 3600
+
+
+def test_merge_intervals():
+    """Tests sorting, merging and dropping empty intervals."""
+    assert merge_intervals([(5, 8), (1, 3), (2, 4), (8, 9), (6, 6), (7, 7)]) == [(1, 4), (5, 8), (8, 9)]
+
+
+def test_free_slots_across_fall_back():
+    """Tests that slots keep their local hours and offsets across the end of DST and that UTC events block the right slot."""
+    now = datetime.datetime(2025, 10, 30, 10, 0, tzinfo=LOS_ANGELES)  # Thursday
+    events = [{"start": {"dateTime": "2025-11-03T17:00:00Z"}, "end": {"dateTime": "2025-11-03T18:00:00Z"}}]
+
+    with patch("julian_gregory.tools._get_calendar_and_time_info", return_value=(None, LOS_ANGELES, now)), \
+            patch("julian_gregory.tools.get_upcoming_events", return_value=events):
+        free_slots = find_free_slots(MagicMock(), time_delta_in_days=4)
+
+    starts = [slot["start"] for slot in free_slots]
+    assert starts[0] == "2025-10-31T08:00:00-07:00"
+    assert "2025-11-03T08:00:00-08:00" in starts
+    # 9am PST is 17:00 UTC
+    assert not any(start.startswith(("2025-11-03T08:30", "2025-11-03T09:00", "2025-11-03T09:30")) for start in starts)
+    assert "2025-11-03T10:00:00-08:00" in starts
+    assert {slot["end"] for slot in free_slots if slot["start"] == "2025-11-03T16:00:00-08:00"} == {"2025-11-03T17:00:00-08:00"}
+
+
+def test_free_slots_in_spring_forward_gap():
+    """Tests that business hours spanning a skipped hour only yield slots that exist."""
+    now = datetime.datetime(2025, 4, 24, 12, 0, tzinfo=CAIRO)  # Thursday
+    calendar_service = MagicMock()
+    calendar_service.freebusy.return_value.query.return_value.execute.return_value = {"calendars": {"a@example.com": {"busy": []}}}
+
+    with patch("julian_gregory.tools._get_calendar_and_time_info", return_value=(calendar_service, CAIRO, now)):
+        free_slots = find_free_slots_for_multiple_users(
+            MagicMock(), ["a@example.com"], time_delta_in_days=1, business_hours_start=0, business_hours_end=4)["slots"]
+
+    assert [slot["start"] for slot in free_slots] == [
+        "2025-04-25T01:00:00+03:00", "2025-04-25T01:30:00+03:00", "2025-04-25T02:00:00+03:00",
+        "2025-04-25T02:30:00+03:00", "2025-04-25T03:00:00+03:00",
+    ]
@@ -0,0 +1,38 @@
+from unittest.mock import patch
+
+from julian_gregory import helper_funcs
+from julian_gregory.app_utils.warmup import warm_up
+
+
+def test_warm_up_disabled(monkeypatch):
+    """Tests that no phase runs when WARMUP_ENABLED is false."""
+    monkeypatch.setenv("WARMUP_ENABLED", "false")
+    with patch("julian_gregory.app_utils.warmup.warm_discovery_documents") as mock_discovery:
+        assert warm_up() == {}
+    mock_discovery.assert_not_called()
+
+
+@patch("julian_gregory.app_utils.warmup.warm_model_clients")
+def test_warm_up_preloads_discovery_documents(mock_warm_model_clients, monkeypatch):
+    """Tests that the discovery documents end up in the helper_funcs cache and phases are timed."""
+    monkeypatch.delenv("WARMUP_ENABLED", raising=False)
+    monkeypatch.delenv("WARMUP_CONNECTIONS", raising=False)
+    helper_funcs.get_discovery_document.cache_clear()
+
+    timings = warm_up()
+
+    assert set(timings) == {"discovery_documents", "time_zones", "model_clients"}
+    assert helper_funcs.get_discovery_document.cache_info().currsize == 3
+    mock_warm_model_clients.assert_called_once()
+
+
+@patch("julian_gregory.app_utils.warmup.warm_model_clients", side_effect=RuntimeError("no credentials"))
+@patch("julian_gregory.app_utils.warmup.warm_connections")
+def test_warm_up_survives_failing_phase(mock_warm_connections, mock_warm_model_clients, monkeypatch):
+    """Tests that a failing phase is logged rather than raised, and connections are opt-in."""
+    monkeypatch.setenv("WARMUP_CONNECTIONS", "true")
+
+    timings = warm_up()
+
+    assert "model_clients" in timings
+    mock_warm_connections.assert_called_once()
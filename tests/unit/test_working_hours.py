@@ -0,0 +1,98 @@
+import datetime
+from types import SimpleNamespace
+from urllib.parse import unquote
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from julian_gregory.scopes import AUTHORIZER_NAME
+from julian_gregory.time_utils import to_epoch
+from julian_gregory.tools import WORKING_HOURS_STATE_KEY, find_free_slots_for_multiple_users
+from julian_gregory.working_hours import WorkingHours, intersect_windows
+from tests.fakes.fake_calendar_api import FakeCalendarApi
+
+TIME_ZONE = ZoneInfo("America/Los_Angeles")
+NEW_YORK = ZoneInfo("America/New_York")
+USER_EMAIL = "alice@example.com"
+BOB = "bob@example.com"
+CAROL = "carol@example.com"
+
+
+def test_intersect_windows():
+    """Tests intersecting sorted interval lists, including touching and nested intervals."""
+    assert intersect_windows([(0, 10), (20, 30), (40, 50)], [(5, 20), (25, 45)]) == [(5, 10), (25, 30), (40, 45)]
+    assert intersect_windows([(0, 100)], [(10, 20), (30, 40)]) == [(10, 20), (30, 40)]
+    assert intersect_windows([(0, 10)], []) == []
+
+
+def test_windows_follow_workdays_and_time_zone():
+    """Tests a Sunday to Thursday week in Dubai seen from a Monday to Sunday range."""
+    hours = WorkingHours.from_dict({"time_zone": "Asia/Dubai", "start_hour": 9, "end_hour": 18, "workdays": ["Sunday", "mon", "TUE", "Wednesday", 3]},
+                                   WorkingHours("UTC", 8, 17))
+
+    windows = hours.windows(to_epoch("2025-12-08T00:00:00Z"), to_epoch("2025-12-15T00:00:00Z"))
+
+    assert hours.workdays == (0, 1, 2, 3, 6)
+    assert [datetime.datetime.fromtimestamp(start, datetime.UTC).strftime("%a %H:%M") for start, _ in windows] == [
+        "Mon 05:00", "Tue 05:00", "Wed 05:00", "Thu 05:00", "Sun 05:00",
+    ]
+    assert all(end - start == 9 * 3600 for start, end in windows)
+    with pytest.raises(ValueError):
+        WorkingHours.from_dict({"time_zone": "Mars/Olympus_Mons"}, hours)
+    with pytest.raises(ValueError):
+        WorkingHours.from_dict({"workdays": ["Caturday"]}, hours)
+    for start_hour, end_hour in [(9, 25), (17, 9), (-1, 8), (9, 9)]:
+        with pytest.raises(ValueError):
+            WorkingHours.from_dict({"start_hour": start_hour, "end_hour": end_hour}, hours)
+    all_day = WorkingHours.from_dict({"time_zone": "UTC", "start_hour": 0, "end_hour": 24}, hours)
+    assert all_day.windows(to_epoch("2025-12-08T00:00:00Z"), to_epoch("2025-12-09T00:00:00Z")) == [
+        (to_epoch("2025-12-08T00:00:00Z"), to_epoch("2025-12-09T00:00:00Z")),
+    ]
+
+
+@pytest.fixture
+def api(monkeypatch):
+    with FakeCalendarApi(user_email=USER_EMAIL, time_zone=str(TIME_ZONE)) as api:
+        api.add_calendar(BOB, time_zone=str(NEW_YORK))
+        monkeypatch.setenv("CALENDAR_API_BASE_URL", api.url)
+        yield api
+
+
+def local_hours(slots: list[dict], time_zone: ZoneInfo) -> list[tuple[str, float, float]]:
+    hours = []
+    for slot in slots:
+        start = datetime.datetime.fromisoformat(slot["start"]).astimezone(time_zone)
+        end = datetime.datetime.fromisoformat(slot["end"]).astimezone(time_zone)
+        hours.append((start.strftime("%A"), start.hour + start.minute / 60, end.hour + end.minute / 60))
+    return hours
+
+
+def test_slots_within_every_attendees_working_hours(api):
+    """Tests that attendees' hours apply in their calendar's time zone, which is read once."""
+    tool_context = SimpleNamespace(state={AUTHORIZER_NAME: "token"}, user_id="alice")
+
+    slots = find_free_slots_for_multiple_users(tool_context, [BOB], time_delta_in_days=7)["slots"]
+
+    # Bob's 8:00-17:00 in New York ends at 14:00 in Los Angeles
+    assert slots
+    assert min(start for _, start, _ in local_hours(slots, TIME_ZONE)) == 8
+    assert max(end for _, _, end in local_hours(slots, TIME_ZONE)) == 14
+    assert all(8 <= start and end <= 17 for _, start, end in local_hours(slots, NEW_YORK))
+
+    find_free_slots_for_multiple_users(tool_context, [BOB], time_delta_in_days=7)
+    assert [unquote(path) for _, path in api.requests].count(f"/calendar/v3/calendars/{BOB}") == 1
+
+
+def test_given_working_hours_are_remembered(api):
+    """Tests that working hours passed for an attendee with an unreadable calendar narrow the slots and are kept for later calls."""
+    tool_context = SimpleNamespace(state={AUTHORIZER_NAME: "token"}, user_id="alice")
+    carol_hours = {"email": CAROL, "time_zone": "America/New_York", "start_hour": 12, "workdays": ["Tuesday"]}
+
+    slots = find_free_slots_for_multiple_users(tool_context, [BOB, CAROL], time_delta_in_days=7, attendee_working_hours=[carol_hours])["slots"]
+
+    assert {(weekday, start) for weekday, start, _ in local_hours(slots, TIME_ZONE)} == {
+        ("Tuesday", 9), ("Tuesday", 9.5), ("Tuesday", 10), ("Tuesday", 10.5), ("Tuesday", 11), ("Tuesday", 11.5), ("Tuesday", 12), ("Tuesday", 12.5), ("Tuesday", 13),
+    }
+    assert tool_context.state[WORKING_HOURS_STATE_KEY] == {CAROL: {"time_zone": "America/New_York", "start_hour": 12, "workdays": ["Tuesday"]}}
+    assert find_free_slots_for_multiple_users(tool_context, [BOB, CAROL], time_delta_in_days=7)["slots"] == slots
+    assert not any(unquote(path).endswith(CAROL) for _, path in api.requests)